@@ -0,0 +1,60 @@
+"""Compare FeedItem normalization with the old repr-splitting extractors.
+
+    python benchmarks/bench_item_records.py [--items 2000] [--body-kb 50]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from freshrss_api import Item
+
+from scraper.feed_item import FeedItem
+
+
+def legacy_extract(item):
+    """What process_items did per item before FeedItem: two full reprs."""
+    item_id = str(item).split("id=")[1].split(",")[0]
+    xml_url = str(item).split(r'<br>\n <a href="')[1].split('">XML</a>')[0]
+    return item_id, xml_url
+
+
+def make_items(count, body_kb):
+    filler = "<p>" + "Lorem ipsum dolor sit amet. " * (body_kb * 1024 // 28) + "</p>"
+    return [
+        Item(
+            id=1_700_000_000_000_000 + i, feed_id=2, title=f"Rule {i}", author="",
+            url=f"https://www.federalregister.gov/d/{i}",
+            html=filler + f'<br>\n <a href="https://www.federalregister.gov/xml/{i}.xml">XML</a>',
+            is_saved=False, is_read=False, created_on_time=1_700_000_000,
+        )
+        for i in range(count)
+    ]
+
+
+def timed(fn, items):
+    start = time.perf_counter()
+    out = [fn(item) for item in items]
+    return time.perf_counter() - start, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=2000)
+    parser.add_argument("--body-kb", type=int, default=50)
+    args = parser.parse_args()
+
+    items = make_items(args.items, args.body_kb)
+    legacy, expected = timed(legacy_extract, items)
+    records, out = timed(FeedItem.from_item, items)
+    assert [(str(r.id), r.xml_url) for r in out] == expected
+
+    print(f"{args.items} items, {args.body_kb} KB bodies")
+    print(f"legacy repr split: {legacy * 1e6 / args.items:8.1f} us/item")
+    print(f"FeedItem records:  {records * 1e6 / args.items:8.1f} us/item  ({legacy / records:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
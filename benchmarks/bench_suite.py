@@ -0,0 +1,294 @@
+"""End-to-end benchmark suite against a synthetic corpus and local stub services.
+
+    python benchmarks/bench_suite.py [--terms 10 100 1000] [--items 200]
+        [--doc-kb 50] [--hit-rate 0.05] [--repeat 3] [--output results.json]
+        [--compare baseline.json]
+
+Scenarios:
+    match        compiled matcher over every document's text, per term count
+    parse        XML parse of every document (full text and streaming search)
+    cycle        process_items(False) on all unread items, including fetches
+                 from the stub server, mark-as-read and webhook delivery
+    rescan_full  process_items(True) over the whole history (fills the index)
+    rescan_index rescan() answered from the index after one term is added
+
+FreshRSS, federalregister.gov and Discord are replaced by the servers in
+stub_services, so nothing leaves the machine. Settings come from the
+environment as usual, e.g. MATCHER_PROCESSES=4 benchmarks the process pool. Every cycle runs in a fresh
+temporary data directory (cold document cache and index). Results are
+written as JSON; --compare prints each scenario's time against an earlier
+results file.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from corpus import Corpus, make_terms
+from stub_services import FeverStub, WebhookStub
+
+
+class MemoryFetcher:
+    """DocumentFetcher stand-in serving the corpus from memory (parse only)."""
+
+    class _Response:
+        def __init__(self, body):
+            self.body = body
+
+        def iter_content(self, chunk_size=1):
+            for i in range(0, len(self.body), chunk_size):
+                yield self.body[i:i + chunk_size]
+
+    def __init__(self, documents):
+        self.documents = documents
+
+    def get(self, url):
+        return self.documents[url]
+
+    @contextmanager
+    def open(self, url):
+        yield self._Response(self.documents[url])
+
+
+def best_of(repeat, fn):
+    """Run fn repeat times; returns (seconds of each run, last result)."""
+    runs, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        runs.append(time.perf_counter() - start)
+    return runs, result
+
+
+def record(results, scenario, runs, terms=None, items=0, nbytes=0, **extra):
+    best = min(runs)
+    entry = {
+        "scenario": scenario,
+        "terms": terms,
+        "seconds": round(best, 6),
+        "runs": [round(r, 6) for r in runs],
+        "items": items,
+        "bytes": nbytes,
+        "items_per_s": round(items / best, 1) if best and items else None,
+        "mb_per_s": round(nbytes / best / 1e6, 2) if best and nbytes else None,
+    }
+    entry.update(extra)
+    results.append(entry)
+    label = scenario if terms is None else f"{scenario} ({terms} terms)"
+    rate = f"{entry['items_per_s']} items/s" if entry["items_per_s"] else ""
+    print(f"{label:32} {best:9.3f} s  {rate}", file=sys.stderr)
+
+
+@contextmanager
+def data_dir():
+    """Run in a fresh directory; the searcher keeps its data under ./data."""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="rss-bench-") as tmp:
+        os.chdir(tmp)
+        try:
+            yield Path(tmp)
+        finally:
+            os.chdir(cwd)
+
+
+def configure(fever, webhook):
+    """Point the settings at the stubs; must run before scraper is imported."""
+    os.environ.update({
+        "FRESHRSS_HOST": fever.url,
+        "FRESHRSS_USERNAME": "bench",
+        "FRESHRSS_PASSWORD": "bench",
+        "DISCORD_WEBHOOK_URL": webhook.url + "/api/webhooks/0/bench",
+        "DISCORD_QUEUE": "true",
+        "DISCORD_QUEUE_LINGER": "0",
+        "FEED_HANDLERS": "2:linked,3:title",
+        "DOC_INDEX_ENABLED": "true",
+    })
+
+
+def bench_match(results, terms, texts, term_counts, repeat):
+    from scraper.query import compile_terms
+
+    nbytes = sum(map(len, texts))
+    for count in term_counts:
+        matcher = compile_terms(terms[:count])
+        runs, found = best_of(repeat, lambda: [matcher.find_all(text) for text in texts])
+        record(results, "match", runs, count, len(texts), nbytes, matched=sum(1 for f in found if f))
+
+
+def bench_parse(results, corpus, terms, repeat):
+    from scraper.query import compile_terms
+    from scraper.xml_parser import XMLContentParser
+
+    parser = XMLContentParser(fetcher=MemoryFetcher(corpus.documents))
+    urls = list(corpus.documents)
+    nbytes = corpus.document_bytes
+    runs, texts = best_of(repeat, lambda: [parser.extract_text(url) for url in urls])
+    record(results, "parse_text", runs, None, len(urls), nbytes)
+
+    matcher = compile_terms(terms[:10])
+    runs, _ = best_of(repeat, lambda: [parser.stream_search(url, matcher) for url in urls])
+    record(results, "parse_stream_search", runs, 10, len(urls), nbytes)
+    return texts
+
+
+def _searcher(terms):
+    from scraper.search_engine import FederalRegisterSearcher
+
+    return FederalRegisterSearcher(search_terms=terms)
+
+
+def _close(searcher):
+    for pipeline in searcher._pipelines.values():
+        pipeline.shutdown()
+    if searcher.matcher_pool is not None:
+        searcher.matcher_pool.close()
+
+
+def stage_seconds():
+    """Seconds recorded per pipeline stage since the last metrics reset."""
+    from scraper.metrics import metrics
+
+    return {stage: round(seconds, 6) for stage, (_, seconds) in sorted(metrics.stage_totals().items())}
+
+
+def bench_cycle(results, corpus, terms, fever, webhook, term_counts, repeat):
+    from scraper.metrics import metrics
+
+    items = len(corpus.items)
+    for count in term_counts:
+        runs, matched, posts = [], 0, 0
+        for _ in range(repeat):
+            fever.reset()
+            webhook.reset()
+            metrics.reset()
+            with data_dir():
+                searcher = _searcher(terms[:count])
+                start = time.perf_counter()
+                found = searcher.process_items(False)
+                searcher.notifier.flush()
+                runs.append(time.perf_counter() - start)
+                _close(searcher)
+            matched, posts = len(found), webhook.posts
+            if fever.unread:
+                print(f"warning: {len(fever.unread)} item(s) left unread", file=sys.stderr)
+        record(results, "cycle", runs, count, items, fever.bytes_sent,
+               matched=matched, planted=len(corpus.expected), webhook_posts=posts, fever_calls=dict(fever.calls),
+               stages=stage_seconds())
+
+
+def bench_rescan(results, corpus, terms, fever, term_counts, repeat):
+    items = len(corpus.items)
+    for count in term_counts:
+        full_runs, index_runs, matched = [], [], 0
+        for _ in range(repeat):
+            fever.reset()
+            with data_dir():
+                searcher = _searcher(terms[:count])
+                start = time.perf_counter()
+                matched = len(searcher.process_items(True))
+                full_runs.append(time.perf_counter() - start)
+
+                # One new term: the index only has to be checked for it
+                searcher.add_search_term(terms[count])
+                start = time.perf_counter()
+                searcher.rescan()
+                index_runs.append(time.perf_counter() - start)
+                _close(searcher)
+        record(results, "rescan_full", full_runs, count, items, fever.bytes_sent, matched=matched)
+        record(results, "rescan_index", index_runs, count, items)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    baseline = json.loads(Path(baseline_path).read_text(encoding="utf-8"))
+    before = {(r["scenario"], r["terms"]): r["seconds"] for r in baseline["results"]}
+    print(f"\nvs {baseline_path} ({baseline.get('commit')}):", file=sys.stderr)
+    for r in results:
+        old = before.get((r["scenario"], r["terms"]))
+        if old:
+            label = r["scenario"] if r["terms"] is None else f"{r['scenario']} ({r['terms']} terms)"
+            print(f"{label:32} {old:9.3f} -> {r['seconds']:9.3f} s  ({old / r['seconds']:.2f}x)", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--terms", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--items", type=int, default=200, help="feed items (half FR rules, half SEC filings)")
+    parser.add_argument("--doc-kb", type=int, default=50, help="size of each FR XML document")
+    parser.add_argument("--hit-rate", type=float, default=0.05, help="share of items with a planted term")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scenarios", nargs="+", default=["match", "parse", "cycle", "rescan"])
+    parser.add_argument("--output", help="write JSON results here instead of stdout")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    terms = make_terms(max(args.terms) + 1, random.Random(args.seed))
+    # Hits come from the smallest term set, so every term count sees all of them
+    corpus = Corpus(args.items, terms[:min(args.terms)], args.doc_kb, args.hit_rate, seed=args.seed)
+    fever = FeverStub(corpus).start()
+    webhook = WebhookStub().start()
+    configure(fever, webhook)
+
+    from loguru import logger
+    import scraper.freshrss_client  # noqa: F401  (installs its own log sink first)
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    print(f"{len(corpus.items)} items, {len(corpus.documents)} documents, "
+          f"{corpus.document_bytes / 1e6:.1f} MB XML", file=sys.stderr)
+    results = []
+    try:
+        texts = bench_parse(results, corpus, terms, args.repeat) if {"parse", "match"} & set(args.scenarios) else []
+        if "parse" not in args.scenarios:
+            results.clear()
+        if "match" in args.scenarios:
+            bench_match(results, terms, texts, args.terms, args.repeat)
+        if "cycle" in args.scenarios:
+            bench_cycle(results, corpus, terms, fever, webhook, args.terms, args.repeat)
+        if "rescan" in args.scenarios:
+            bench_rescan(results, corpus, terms, fever, args.terms, args.repeat)
+    finally:
+        fever.stop()
+        webhook.stop()
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "params": {
+            "terms": args.terms, "items": args.items, "doc_kb": args.doc_kb,
+            "hit_rate": args.hit_rate, "repeat": args.repeat, "seed": args.seed,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Compare TermMatcher with the per-term ``in`` loop it replaced.
+
+    python benchmarks/bench_term_matcher.py [--size-mb 5] [--repeat 3]
+"""
+import argparse
+import random
+import string
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from scraper.term_matcher import TermMatcher
+
+
+def legacy_search(text, search_terms):
+    """The loop used by search_xml_content before TermMatcher."""
+    low = (text or "").lower()
+    found_terms = []
+    for term in search_terms:
+        if term.lower() in low:
+            found_terms.append(term)
+    return found_terms
+
+
+def make_corpus(size_mb, rng):
+    vocab = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10)))
+             for _ in range(5000)]
+    words = []
+    length = 0
+    while length < size_mb * 1_000_000:
+        word = rng.choice(vocab)
+        words.append(word)
+        length += len(word) + 1
+    return vocab, " ".join(words)
+
+
+def best_of(repeat, fn, *args):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=float, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--terms", type=int, nargs="+", default=[10, 100, 300, 1000])
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    vocab, text = make_corpus(args.size_mb, rng)
+    print(f"corpus: {len(text) / 1e6:.1f} MB")
+    print(f"{'terms':>6} {'legacy':>9} {'matcher':>9} {'build':>8}  mode")
+
+    for count in args.terms:
+        terms = [" ".join(rng.choices(vocab, k=2)).title() for _ in range(count)]
+        build, matcher = best_of(1, TermMatcher, terms)
+        legacy, expected = best_of(args.repeat, legacy_search, text, terms)
+        compiled, found = best_of(args.repeat, matcher.find_all, text)
+        assert found == expected, "matcher disagrees with legacy loop"
+        mode = "automaton" if matcher.uses_automaton else "substring"
+        print(f"{count:>6} {legacy:>8.3f}s {compiled:>8.3f}s {build:>7.3f}s  {mode}")
+
+
+if __name__ == "__main__":
+    main()
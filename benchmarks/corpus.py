@@ -0,0 +1,161 @@
+"""Synthetic Federal Register and SEC content for the benchmark suite.
+
+Everything is derived from a seeded random.Random, so the same arguments
+always produce the same corpus and results stay comparable across commits.
+"""
+import random
+import string
+
+FR_FEED = 2
+SEC_FEED = 3
+FIRST_ITEM_ID = 1_700_000_000_000_000  # FreshRSS ids are microsecond timestamps
+
+_REG_WORDS = (
+    "agency", "rule", "notice", "comment", "regulation", "environmental", "impact",
+    "statement", "mining", "seabed", "permit", "license", "fisheries", "marine",
+    "protected", "species", "offshore", "energy", "lease", "exploration", "mineral",
+    "resources", "critical", "habitat", "authorization", "incidental", "take",
+    "public", "hearing", "docket", "amendment", "compliance", "enforcement",
+    "emissions", "standards", "safety", "zone", "navigation", "coastal", "management",
+)
+_AGENCIES = (
+    "National Oceanic and Atmospheric Administration", "Bureau of Ocean Energy Management",
+    "Environmental Protection Agency", "Coast Guard", "Department of the Interior",
+    "Securities and Exchange Commission", "Department of Energy",
+)
+_FORMS = ("8-K", "10-K", "10-Q", "S-1", "6-K", "DEF 14A", "SC 13G")
+
+
+def _word(rng, shortest=3):
+    return "".join(rng.choices(string.ascii_lowercase, k=rng.randint(shortest, 10)))
+
+
+def make_terms(count, rng):
+    """count distinct search terms.
+
+    Each generated term contains a made-up word of at least seven letters,
+    so it practically never occurs in a document by chance and the hit
+    rate stays what was asked for.
+    """
+    terms = ["Deep Sea Mining", "Critical Minerals", "Incidental Take Authorization"]
+    seen = {t.lower() for t in terms}
+    while len(terms) < count:
+        rare = _word(rng, 7)
+        if rng.random() < 0.5:
+            term = " ".join(rng.sample(_REG_WORDS, rng.randint(1, 2)) + [rare]).title()
+        else:
+            term = rare if rng.random() < 0.5 else f"{_word(rng)} {rare}"
+        if term.lower() not in seen:
+            seen.add(term.lower())
+            terms.append(term)
+    return terms[:count]
+
+
+def _sentence(rng, vocab):
+    words = [rng.choice(vocab) for _ in range(rng.randint(8, 24))]
+    words[0] = words[0].capitalize()
+    return " ".join(words) + "."
+
+
+def _wrap(text, rng, width=72):
+    """Hard-wrap like FR XML, sometimes hyphenating a word across the break."""
+    lines, line = [], ""
+    for word in text.split(" "):
+        if line and len(line) + len(word) + 1 > width:
+            if len(word) > 6 and rng.random() < 0.2:
+                cut = rng.randint(3, len(word) - 3)
+                lines.append(f"{line} {word[:cut]}-")
+                line = word[cut:]
+                continue
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}" if line else word
+    lines.append(line)
+    return "\n".join(lines)
+
+
+def _escape(text):
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def make_document(size_kb, terms, hit_rate, rng):
+    """Return (xml bytes, terms planted) for one FR-style rule of about size_kb.
+
+    With probability hit_rate one to three of terms are planted in the body.
+    """
+    vocab = list(_REG_WORDS) + [_word(rng) for _ in range(200)]
+    planted = rng.sample(terms, min(len(terms), rng.randint(1, 3))) if terms and rng.random() < hit_rate else []
+    paragraphs = []
+    length = 0
+    while length < size_kb * 1024:
+        text = " ".join(_sentence(rng, vocab) for _ in range(rng.randint(3, 8)))
+        paragraphs.append(text)
+        length += len(text) + 12
+    for term in planted:
+        i = rng.randrange(len(paragraphs))
+        paragraphs[i] = f"{paragraphs[i]} The {term} program applies."
+
+    agency = rng.choice(_AGENCIES)
+    body = "\n".join(f"<P>{_escape(_wrap(p, rng))}</P>" for p in paragraphs)
+    xml = (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        "<RULE><PREAMB>"
+        f"<AGENCY TYPE=\"S\">{_escape(agency)}</AGENCY>"
+        f"<SUBJECT>{_escape(_sentence(rng, vocab))}</SUBJECT>"
+        "</PREAMB><SUPLINF><HD SOURCE=\"HD1\">Supplementary Information</HD>\n"
+        f"{body}\n</SUPLINF></RULE>\n"
+    )
+    return xml.encode("utf-8"), planted
+
+
+def make_sec_title(terms, hit_rate, rng):
+    """Return (title, terms planted) for one SEC filing item."""
+    company = " ".join(_word(rng).capitalize() for _ in range(rng.randint(1, 3)))
+    title = f"{rng.choice(_FORMS)} - {company} Corp ({rng.randint(10**9, 10**10 - 1):010d}) (Filer)"
+    planted = []
+    if terms and rng.random() < hit_rate:
+        planted = [rng.choice(terms)]
+        title += f" - {planted[0]}"
+    return title, planted
+
+
+class Corpus:
+    """A feed history: Fever item dicts plus the XML documents they link.
+
+    ``fr_share`` of the items are Federal Register rules (feed 2) whose XML
+    is served under ``/xml/<n>.xml``; the rest are SEC filings (feed 3).
+    """
+
+    def __init__(self, items, terms, doc_kb=50, hit_rate=0.05, fr_share=0.5, seed=0):
+        rng = random.Random(seed)
+        self.terms = terms
+        self.items = []
+        self.documents = {}  # path -> xml bytes
+        self.expected = {}  # item id -> planted terms
+        for n in range(items):
+            item_id = FIRST_ITEM_ID + n * 1000
+            if rng.random() < fr_share:
+                path = f"/xml/{n}.xml"
+                self.documents[path], planted = make_document(doc_kb, terms, hit_rate, rng)
+                self.items.append(self._item(item_id, FR_FEED, f"Rule {n}",
+                                             f'<p>Summary of rule {n}.</p><br>\n <a href="{{base}}{path}">XML</a>',
+                                             f"{{base}}/d/{n}"))
+            else:
+                title, planted = make_sec_title(terms, hit_rate, rng)
+                self.items.append(self._item(item_id, SEC_FEED, title, f"<p>{_escape(title)}</p>",
+                                             f"{{base}}/sec/{n}"))
+            if planted:
+                self.expected[item_id] = planted
+
+    @staticmethod
+    def _item(item_id, feed_id, title, html, url):
+        return {
+            "id": item_id, "feed_id": feed_id, "title": title, "author": "",
+            "html": html, "url": url, "is_saved": 0, "is_read": 0,
+            "created_on_time": item_id // 1_000_000,
+        }
+
+    @property
+    def document_bytes(self) -> int:
+        return sum(map(len, self.documents.values()))
@@ -0,0 +1,198 @@
+"""Replay recorded FreshRSS traffic through process_items, offline.
+
+    python benchmarks/replay.py data/traffic.sqlite3 [--terms "deep sea" ...]
+        [--terms-file terms.json] [--pace] [--speed 10] [--batches 100]
+        [--output results.json]
+
+Record an archive by running the bot with RECORD_PATH set: every unread batch
+and every linked document it fetched are kept there. Replay feeds each batch
+to process_items(False) in a fresh temporary data directory. Documents come
+from the archive, marks succeed instantly and notifications go to the local
+webhook stub, so nothing leaves the machine.
+
+By default batches run back to back (maximum throughput); --pace waits out the
+recorded gaps between them, divided by --speed. Items/s is computed over the
+time spent in process_items. Reported stages come from the metrics registry.
+Handlers and the other settings come from the environment as usual.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from bench_suite import _close, data_dir, git_commit, stage_seconds
+from stub_services import WebhookStub
+
+
+class ReplayFreshRSS:
+    """FreshRSSManager stand-in that serves one recorded batch per cycle."""
+
+    body_feeds = frozenset()
+    feed_ids = None
+    recorder = None
+
+    def __init__(self):
+        self.batch = []
+        self.pending_marks = {}
+        self.unread_fetched_at = None
+        self.last_fetch_failed = False
+        self.history_complete = True
+        self.history_total = None
+        self.marked = 0
+
+    def get_unread_items(self):
+        self.unread_fetched_at = time.time()
+        return [item for item in self.batch if self.feed_ids is None or item.feed_id in self.feed_ids]
+
+    def get_all_items(self, since_id=0):
+        return iter(self.batch)
+
+    def read_batch(self):
+        from scraper.freshrss_client import ReadBatch
+
+        return ReadBatch(self)
+
+    def mark_as_read(self, item_id):
+        self.marked += 1
+        return True
+
+    def mark_feed_read_before(self, feed_id, before):
+        return True
+
+
+def configure(webhook):
+    """Settings for the replay; must run before scraper is imported."""
+    os.environ.update({
+        "DISCORD_WEBHOOK_URL": webhook.url + "/api/webhooks/0/replay",
+        "DISCORD_QUEUE": "true",
+        "DISCORD_QUEUE_LINGER": "0",
+        "RECORD_PATH": "",  # never record the replay itself
+        "METRICS_PORT": "0",
+    })
+
+
+def load_terms(args):
+    if args.terms_file:
+        return json.loads(Path(args.terms_file).read_text(encoding="utf-8"))
+    if args.terms:
+        return args.terms
+    from config.settings import DEFAULT_SEARCH_TERMS
+
+    return list(DEFAULT_SEARCH_TERMS)
+
+
+def replay(archive_path, terms, pace=False, speed=1.0, max_batches=None, webhook=None):
+    """Run the archive through a fresh searcher; returns the result dict."""
+    from scraper.metrics import metrics
+    from scraper.recording import ArchiveFetcher, TrafficArchive
+    from scraper.search_engine import FederalRegisterSearcher
+
+    archive = TrafficArchive(Path(archive_path).resolve())
+    metrics.reset()
+    with data_dir():
+        freshrss = ReplayFreshRSS()
+        searcher = FederalRegisterSearcher(search_terms=terms, freshrss=freshrss)
+        fetcher = searcher.xml_parser.fetcher = ArchiveFetcher(archive)
+
+        batches = items = matched = 0
+        busy = lag = 0.0
+        started = time.perf_counter()
+        first = None
+        try:
+            for recorded_at, batch in archive.batches():
+                if max_batches is not None and batches >= max_batches:
+                    break
+                if pace:
+                    first = recorded_at if first is None else first
+                    delay = (recorded_at - first) / speed - (time.perf_counter() - started)
+                    if delay > 0:
+                        time.sleep(delay)
+                    else:
+                        lag = max(lag, -delay)
+                freshrss.batch = batch
+                start = time.perf_counter()
+                matched += len(searcher.process_items(False))
+                busy += time.perf_counter() - start
+                items += len(batch)
+                batches += 1
+            start = time.perf_counter()
+            searcher.notifier.flush()
+            busy += time.perf_counter() - start
+        finally:
+            _close(searcher)
+            archive.close()
+
+    return {
+        "batches": batches,
+        "items": items,
+        "matched": matched,
+        "marked": freshrss.marked,
+        "documents_served": fetcher.stats["served"],
+        "documents_missing": fetcher.stats["missing"],
+        "webhook_posts": webhook.posts if webhook is not None else None,
+        "busy_seconds": round(busy, 6),
+        "wall_seconds": round(time.perf_counter() - started, 6),
+        "items_per_s": round(items / busy, 1) if busy and items else None,
+        "max_lag_seconds": round(lag, 3) if pace else None,
+        "stages": stage_seconds(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("archive", help="archive recorded with RECORD_PATH")
+    parser.add_argument("--terms", nargs="+", help="search terms (default: DEFAULT_SEARCH_TERMS)")
+    parser.add_argument("--terms-file", help="JSON list of terms, e.g. data/search_terms.json")
+    parser.add_argument("--pace", action="store_true", help="keep the recorded gaps between batches")
+    parser.add_argument("--speed", type=float, default=1.0, help="with --pace, replay this many times faster")
+    parser.add_argument("--batches", type=int, help="stop after this many batches")
+    parser.add_argument("--output", help="write JSON results here instead of stdout")
+    args = parser.parse_args()
+    if not Path(args.archive).exists():
+        parser.error(f"no archive at {args.archive}")
+
+    webhook = WebhookStub().start()
+    configure(webhook)
+
+    from loguru import logger
+    import scraper.freshrss_client  # noqa: F401  (installs its own log sink first)
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    from scraper.recording import TrafficArchive
+
+    archive = TrafficArchive(Path(args.archive).resolve())
+    print(f"archive: {archive.stats()}", file=sys.stderr)
+    archive.close()
+    terms = load_terms(args)
+    try:
+        result = replay(args.archive, terms, args.pace, args.speed, args.batches, webhook)
+    finally:
+        webhook.stop()
+
+    print(f"{result['items']} items in {result['batches']} batches, {result['matched']} matches: "
+          f"{result['busy_seconds']:.3f} s busy, {result['items_per_s']} items/s", file=sys.stderr)
+    for stage, seconds in result["stages"].items():
+        print(f"  {stage:12} {seconds:9.3f} s", file=sys.stderr)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "params": {"archive": args.archive, "terms": len(terms), "pace": args.pace,
+                   "speed": args.speed, "batches": args.batches},
+        "result": result,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""Local stand-ins for FreshRSS (Fever API), federalregister.gov and Discord.
+
+Both servers run on 127.0.0.1 in daemon threads, so a benchmark exercises
+the real HTTP clients without touching the network.
+"""
+import json
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, handler):
+        super().__init__(("127.0.0.1", 0), handler)
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real servers
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=b"", content_type="application/json", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+
+class FeverStub(_Server):
+    """Fever API over a Corpus, plus the XML documents its items link to.
+
+    Supports the calls FreshRSSManager makes: auth, ``items`` (since_id,
+    with_ids, total_items), ``unread_item_ids`` and ``mark`` for items and
+    feeds. ``reset()`` marks everything unread again between runs.
+    """
+
+    PAGE_SIZE = 50  # Fever's item page limit
+
+    def __init__(self, corpus):
+        super().__init__(_FeverHandler)
+        self.corpus = corpus
+        base = self.url
+        self.items = {}
+        for item in corpus.items:
+            item = dict(item, html=item["html"].replace("{base}", base), url=item["url"].replace("{base}", base))
+            self.items[item["id"]] = item
+        self.ids = sorted(self.items)
+        self.documents = corpus.documents
+        self.calls = Counter()
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.unread = set(self.ids)
+            self.calls.clear()
+            self.bytes_sent = 0
+
+    def count(self, call, sent=0):
+        with self._lock:
+            self.calls[call] += 1
+            self.bytes_sent += sent
+
+    def fever(self, params) -> dict:
+        response = {"api_version": 3, "auth": 1}
+        if "items" in params:
+            response.update(self._items(params))
+        elif "unread_item_ids" in params:
+            with self._lock:
+                response["unread_item_ids"] = ",".join(map(str, sorted(self.unread)))
+        elif params.get("mark") == "item":
+            with self._lock:
+                self.unread.discard(int(params["id"]))
+            response["read_item_ids"] = ""
+        elif params.get("mark") == "feed":
+            feed_id, before = int(params["id"]), int(params["before"])
+            with self._lock:
+                self.unread.difference_update(
+                    i for i in self.ids
+                    if self.items[i]["feed_id"] == feed_id and self.items[i]["created_on_time"] < before
+                )
+            response["read_item_ids"] = ""
+        return response
+
+    def _items(self, params) -> dict:
+        if "with_ids" in params:
+            ids = [int(i) for i in params["with_ids"].split(",") if i][:self.PAGE_SIZE]
+        else:
+            since = int(params.get("since_id") or 0)
+            ids = [i for i in self.ids if i > since][:self.PAGE_SIZE]
+        with self._lock:
+            items = [dict(self.items[i], is_read=int(i not in self.unread)) for i in ids if i in self.items]
+        return {"items": items, "total_items": len(self.ids)}
+
+
+class _FeverHandler(_Handler):
+    def do_POST(self):
+        self._read_body()  # api_key; any key is accepted
+        query = {k: v[0] for k, v in parse_qs(urlsplit(self.path).query, keep_blank_values=True).items()}
+        body = json.dumps(self.server.fever(query)).encode()
+        call = next((c for c in ("items", "unread_item_ids", "mark") if c in query), "api")
+        self.server.count(call, len(body))
+        self._send(200, body)
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        doc = self.server.documents.get(path)
+        if doc is None:
+            self._send(404, b"not found", "text/plain")
+            return
+        etag = f'"{hash(doc) & 0xffffffff:x}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.server.count("xml_304")
+            self._send(304, headers={"ETag": etag})
+            return
+        self.server.count("xml", len(doc))
+        self._send(200, doc, "application/xml", {"ETag": etag})
+
+
+class WebhookStub(_Server):
+    """Discord webhook endpoint that accepts everything with 204."""
+
+    def __init__(self):
+        super().__init__(_WebhookHandler)
+        self.posts = 0
+        self.embeds = 0
+        self._lock = threading.Lock()
+
+    def record(self, payload):
+        with self._lock:
+            self.posts += 1
+            self.embeds += len(payload.get("embeds", ()))
+
+    def reset(self):
+        with self._lock:
+            self.posts = self.embeds = 0
+
+
+class _WebhookHandler(_Handler):
+    def do_POST(self):
+        try:
+            payload = json.loads(self._read_body() or b"{}")
+        except ValueError:
+            payload = {}
+        self.server.record(payload)
+        self._send(204)
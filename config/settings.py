@@ -8,11 +8,78 @@ FRESHRSS_HOST = os.getenv('FRESHRSS_HOST')
 FRESHRSS_USERNAME = os.getenv('FRESHRSS_USERNAME')
 FRESHRSS_PASSWORD = os.getenv('FRESHRSS_PASSWORD')
 
+# Mark-as-read batching
+MARK_BATCH_SIZE = int(os.getenv('MARK_BATCH_SIZE', 100))
+MARK_CONCURRENCY = int(os.getenv('MARK_CONCURRENCY', 4))
+MARK_FEED_BEFORE = os.getenv('MARK_FEED_BEFORE', 'true').lower() in ('1', 'true', 'yes')
+
 # Discord Settings
 DISCORD_WEBHOOK_URL = os.getenv('DISCORD_WEBHOOK_URL')
 DISCORD_TOKEN = os.getenv('DISCORD_TOKEN')
 GUILD_ID = int(os.getenv("GUILD_ID", 0))
+DISCORD_QUEUE = os.getenv('DISCORD_QUEUE', 'true').lower() in ('1', 'true', 'yes')
+DISCORD_QUEUE_LINGER = float(os.getenv('DISCORD_QUEUE_LINGER', 2))
+DISCORD_MAX_RETRIES = int(os.getenv('DISCORD_MAX_RETRIES', 5))
+
+# Notification Outbox Settings (matches are committed locally, then delivered)
+OUTBOX_ENABLED = os.getenv('OUTBOX_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+OUTBOX_PATH = os.getenv('OUTBOX_PATH', 'data/notification_outbox.sqlite3')
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', 10))
+OUTBOX_RETRY_SECONDS = float(os.getenv('OUTBOX_RETRY_SECONDS', 30))
 
 # Scraper Settings
 REFRESH_INTERVAL = int(os.getenv('REFRESH_INTERVAL', 60))
+POLL_MIN_INTERVAL = int(os.getenv('POLL_MIN_INTERVAL', 20))
+POLL_MAX_INTERVAL = int(os.getenv('POLL_MAX_INTERVAL', 900))
 DEFAULT_SEARCH_TERMS = ["Deep Sea Mining"]
+# feed id:handler[:workers]; handlers are linked (fetch the XML link), title, body
+FEED_HANDLERS = os.getenv('FEED_HANDLERS', '2:linked,3:title')
+# Seconds between /alerts rescan progress edits
+RESCAN_PROGRESS_INTERVAL = float(os.getenv('RESCAN_PROGRESS_INTERVAL', 3))
+
+# XML Settings
+XML_STREAMING = os.getenv('XML_STREAMING', 'true').lower() in ('1', 'true', 'yes')
+
+# Worker processes that parse and match linked documents (0: in threads)
+MATCHER_PROCESSES = int(os.getenv('MATCHER_PROCESSES', 0))
+
+# Fetch Settings
+FETCH_WORKERS = int(os.getenv('FETCH_WORKERS', 8))
+FETCH_PER_HOST = int(os.getenv('FETCH_PER_HOST', 4))
+FETCH_TIMEOUT = float(os.getenv('FETCH_TIMEOUT', 30))
+FETCH_CONNECT_TIMEOUT = float(os.getenv('FETCH_CONNECT_TIMEOUT', 10))
+FETCH_RETRIES = int(os.getenv('FETCH_RETRIES', 3))
+FETCH_BACKOFF = float(os.getenv('FETCH_BACKOFF', 0.5))
+
+# Document Cache Settings (DOC_CACHE_MAX_BYTES=0 disables the cache)
+DOC_CACHE_PATH = os.getenv('DOC_CACHE_PATH', 'data/document_cache.sqlite3')
+DOC_CACHE_MAX_BYTES = int(os.getenv('DOC_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+DOC_CACHE_FRESH_SECONDS = int(os.getenv('DOC_CACHE_FRESH_SECONDS', 24 * 60 * 60))
+
+# Document Index Settings
+DOC_INDEX_ENABLED = os.getenv('DOC_INDEX_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+DOC_INDEX_PATH = os.getenv('DOC_INDEX_PATH', 'data/document_index.sqlite3')
+DOC_INDEX_MAX_DOCUMENTS = int(os.getenv('DOC_INDEX_MAX_DOCUMENTS', 100_000))
+
+# Subscription Settings
+SUBSCRIPTIONS_PATH = os.getenv('SUBSCRIPTIONS_PATH', 'data/subscriptions.sqlite3')
+
+# Seen-document Settings (documents already notified are skipped before fetching)
+SEEN_ENABLED = os.getenv('SEEN_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+SEEN_PATH = os.getenv('SEEN_PATH', 'data/seen_documents.sqlite3')
+SEEN_BLOOM_CAPACITY = int(os.getenv('SEEN_BLOOM_CAPACITY', 1_000_000))
+
+# Lease Settings (instances sharing one FreshRSS account split its items
+# through a lease file they all open; leave disabled for a single instance)
+LEASES_ENABLED = os.getenv('LEASES_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+LEASE_PATH = os.getenv('LEASE_PATH', 'data/item_leases.sqlite3')
+LEASE_SECONDS = int(os.getenv('LEASE_SECONDS', 600))
+INSTANCE_ID = os.getenv('INSTANCE_ID', '')
+
+# Recording Settings (RECORD_PATH keeps FreshRSS batches and fetched documents
+# for benchmarks/replay.py; empty disables recording)
+RECORD_PATH = os.getenv('RECORD_PATH', '')
+
+# Metrics Settings (METRICS_PORT=0 disables the /metrics endpoint)
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', 9108))
@@ -8,11 +8,16 @@ import discord
 from discord.ext import commands
 from discord.commands import SlashCommandGroup, Option, AutocompleteContext
 
+from config.settings import RESCAN_PROGRESS_INTERVAL
+from scraper.metrics import metrics
+from scraper.rescan_jobs import RescanManager
+
 # ---- build the bot (no network I/O here) ----
 def build_bot(searcher, guild_id: Optional[int] = None) -> commands.Bot:
     intents = discord.Intents.default()
     intents.message_content = True
     bot = commands.Bot(command_prefix="!", intents=intents)
+    jobs = RescanManager(searcher)
 
     def _format_url_list(urls, limit=5):
         lines = [f"• {u}" for u in urls[:limit]]
@@ -65,11 +70,19 @@ def build_bot(searcher, guild_id: Optional[int] = None) -> commands.Bot:
 
     # add /alerts add|remove later…
 
-    @alerts.command(name="add", description="Add a search term")
+    @alerts.command(name="add", description="Add a search term (start it with q: for a query)")
     async def add_(ctx, term: str):
         await ctx.defer(ephemeral=True)  # instant ACK so no timeout
         ok = searcher.add_search_term(term)  # synchronous; quick
         msg = f'Added "{term}".' if ok else f'"{term}" was already tracked.'
+        if ok and searcher.index_ready():
+            # Delta rescan: only the new term is checked against history
+            matches = await asyncio.to_thread(searcher.delta_rescan, [term])
+            if matches:
+                urls = [m["url"] for m in matches]
+                msg += f" Found in {len(urls)} earlier document(s):\n" + _format_url_list(urls, limit=5)
+            else:
+                msg += " No earlier documents mention it."
         await ctx.followup.send(msg, ephemeral=True)
 
     async def get_current_search_terms(ctx: discord.AutocompleteContext):
@@ -85,33 +98,88 @@ def build_bot(searcher, guild_id: Optional[int] = None) -> commands.Bot:
         searcher.remove_search_term(term)
         await ctx.followup.send("Search term: \"" + term + "\" removed from the list.", ephemeral=True)
 
-    @alerts.command(name="rescan", description="Rescan all items in RSS feed with current search terms")
-    async def rescan_(ctx: discord.ApplicationContext):
+    async def _channel_webhook(channel):
+        """URL of the webhook used to post this channel's subscription matches.
+
+        Returns None (matches then go to the default webhook) when the bot may
+        not manage webhooks there.
+        """
+        try:
+            for hook in await channel.webhooks():
+                if hook.name == "RSSNotifier" and hook.token:
+                    return hook.url
+            return (await channel.create_webhook(name="RSSNotifier")).url
+        except (discord.Forbidden, discord.HTTPException, AttributeError):
+            return None
+
+    def _subscriber(ctx, scope):
+        return ("channel", ctx.channel_id) if scope == "channel" else ("user", ctx.author.id)
+
+    scope_option = Option(str, "Who owns the subscription", choices=["me", "channel"], default="me")
+
+    @alerts.command(name="subscribe", description="Get notified in this channel when a term matches")
+    async def subscribe_(ctx: discord.ApplicationContext, term: str, scope: scope_option = "me"):
         await ctx.defer(ephemeral=True)
+        kind, discord_id = _subscriber(ctx, scope)
+        webhook_url = await _channel_webhook(ctx.channel)
+        ok = searcher.subscribe(kind, discord_id, term, webhook_url)
+        owner = "This channel is" if kind == "channel" else "You are"
+        msg = f'{owner} now subscribed to "{term}".' if ok else f'{owner} already subscribed to "{term}".'
+        if webhook_url is None:
+            msg += " (No permission to create a webhook here; matches go to the default channel.)"
+        await ctx.followup.send(msg, ephemeral=True)
 
-        terms = searcher.get_search_terms()
-        terms_text = ", ".join(terms) if terms else "—"
+    @alerts.command(name="unsubscribe", description="Stop notifications for a term")
+    async def unsubscribe_(ctx: discord.ApplicationContext, term: str, scope: scope_option = "me"):
+        kind, discord_id = _subscriber(ctx, scope)
+        ok = searcher.unsubscribe(kind, discord_id, term)
+        await ctx.respond(f'Unsubscribed from "{term}".' if ok else f'No subscription to "{term}".', ephemeral=True)
+
+    @alerts.command(name="subscriptions", description="List your (or this channel's) subscriptions")
+    async def subscriptions_(ctx: discord.ApplicationContext, scope: scope_option = "me"):
+        terms = searcher.get_subscriptions(*_subscriber(ctx, scope))
+        if not terms:
+            await ctx.respond("No subscriptions yet.", ephemeral=True)
+            return
+        await ctx.respond("Subscribed terms: " + ", ".join(terms), ephemeral=True)
 
-        # progress message + spinner
-        progress = await ctx.followup.send(f"⏳ Scanning all items for: {terms_text}", ephemeral=True)
-        stop = asyncio.Event()
+    @alerts.command(name="schedule", description="Show when each feed will be polled next")
+    async def schedule_(ctx: discord.ApplicationContext):
+        if searcher.scheduler is None:
+            await ctx.respond("The polling loop is not running.", ephemeral=True)
+            return
+        await ctx.respond("\n".join(searcher.scheduler.describe().split("; ")), ephemeral=True)
 
-        async def animate():
-            frames = "⠋⠙⠹⠸⠼⠴⠦⠧⠇⠏"
-            i = 0
-            while not stop.is_set():
-                await progress.edit(content=f"{frames[i % len(frames)]} Scanning all items for: {terms_text}")
-                i += 1
-                await asyncio.sleep(0.2)
+    @alerts.command(name="stats", description="Show pipeline timings, throughput and error counts")
+    async def stats_(ctx: discord.ApplicationContext):
+        await ctx.respond("```\n" + metrics.summary() + "\n```", ephemeral=True)
 
-        spinner_task = asyncio.create_task(animate())
+    @alerts.command(name="rescan", description="Rescan all items in RSS feed with current search terms")
+    async def rescan_(ctx: discord.ApplicationContext):
+        await ctx.defer(ephemeral=True)
 
-        # run the blocking scan off the event loop
-        try:
-            matches = await asyncio.to_thread(searcher.process_items, True) #Was searcher.find_matches
-        finally:
-            stop.set()
-            await spinner_task  # wait for spinner to exit cleanly
+        job, created = jobs.start()
+        terms_text = ", ".join(job.terms) if job.terms else "—"
+        joined = "" if created else " (joined a rescan already running)"
+
+        # Progress message, edited only every RESCAN_PROGRESS_INTERVAL seconds
+        # and only when the counters changed
+        shown = f"⏳ Scanning all items for: {terms_text}{joined}\n{job.describe()}"
+        progress = await ctx.followup.send(shown, ephemeral=True)
+        while not await asyncio.to_thread(job.wait, RESCAN_PROGRESS_INTERVAL):
+            text = f"⏳ Scanning all items for: {terms_text}{joined}\n{job.describe()}"
+            if text != shown:
+                shown = text
+                await progress.edit(content=text)
+
+        if job.state == "failed":
+            await progress.edit(content=f"⚠️ Rescan failed: {job.error}")
+            return
+        matches = job.result
+        if job.state == "cancelled":
+            await progress.edit(content=f"🛑 Cancelled. {job.describe()}")
+            if not matches:
+                return
 
         if not matches:
             await progress.edit(content="✅ Done. No matches found.")
@@ -131,7 +199,7 @@ def build_bot(searcher, guild_id: Optional[int] = None) -> commands.Bot:
         total = sum(len(v) for v in by_term.values())
 
         embed = discord.Embed(
-            title="Rescan complete",
+            title="Rescan complete" if job.state == "done" else "Rescan cancelled (partial results)",
             description=f"Found **{total}** matches across **{len(by_term)}** term(s).",
             color=0x2ecc71,
         )
@@ -150,7 +218,8 @@ def build_bot(searcher, guild_id: Optional[int] = None) -> commands.Bot:
         if includeTXT and len(by_term) > 5:
             embed.set_footer(text=f"+ {len(by_term) - 5} more term(s) in the attached file")
 
-        await progress.edit(content="✅ Done. Found matches:")
+        if job.state == "done":
+            await progress.edit(content="✅ Done. Found matches:")
 
         if includeTXT:
             text = "\n".join(all_lines) or "No results"
@@ -160,6 +229,15 @@ def build_bot(searcher, guild_id: Optional[int] = None) -> commands.Bot:
         else:
             await ctx.followup.send(embed=embed, ephemeral=True)
 
+    @alerts.command(name="cancel", description="Cancel a running rescan")
+    async def cancel_(ctx: discord.ApplicationContext,
+                      job_id: Option(int, "Job id (default: every running rescan)", required=False) = None):
+        cancelled = jobs.cancel(job_id)
+        if not cancelled:
+            await ctx.respond("No matching rescan is running.", ephemeral=True)
+            return
+        await ctx.respond("Cancelling " + ", ".join(f"job {job.id}" for job in cancelled) + ".", ephemeral=True)
+
     return bot
 
 
@@ -4,11 +4,17 @@ from threading import Thread
 from loguru import logger
 
 from scraper.search_engine import FederalRegisterSearcher
-from config.settings import REFRESH_INTERVAL, GUILD_ID
+from scraper.scheduler import PollScheduler
+from scraper.metrics import start_metrics_server
+from config.settings import REFRESH_INTERVAL, POLL_MIN_INTERVAL, POLL_MAX_INTERVAL, GUILD_ID
 from discord_bot import run_bot
 
 def main():
     searcher = FederalRegisterSearcher()
+    scheduler = PollScheduler(searcher.handlers.feed_ids())
+    searcher.scheduler = scheduler
+    searcher.notifier.start()  # deliver what the outbox kept from the last run
+    start_metrics_server()
 
     # Start Discord bot in the background
     t = Thread(target=run_bot, args=(searcher, GUILD_ID), daemon=True)
@@ -17,19 +23,29 @@ def main():
 
     logger.info("Starting Federal Register monitoring...")
     logger.info(f"Search terms: {searcher.get_search_terms()}")
-    logger.info(f"Refresh interval: {REFRESH_INTERVAL} seconds")
+    logger.info(f"Refresh interval: {REFRESH_INTERVAL} seconds "
+                f"(adaptive, {POLL_MIN_INTERVAL}-{POLL_MAX_INTERVAL}s)")
 
     while True:
         try:
-            found = searcher.process_items(False)
-            if found:
-                logger.info(f"Processing complete. Found {len(found)} matching articles.")
+            due = scheduler.due()
+            if due:
+                failed = False
+                try:
+                    found = searcher.process_items(False, feed_ids=due)
+                    failed = searcher.freshrss.last_fetch_failed
+                    if found:
+                        logger.info(f"Processing complete. Found {len(found)} matching articles.")
+                except Exception as e:
+                    failed = True
+                    logger.error(f"Error in main loop: {e}")
+                for feed_id in due:
+                    scheduler.record(feed_id, searcher.last_cycle.get(feed_id, 0), error=failed)
+                logger.info(f"Next polls: {scheduler.describe()}")
+            time.sleep(scheduler.sleep_seconds())
         except KeyboardInterrupt:
             logger.info("Monitoring stopped by user")
             break
-        except Exception as e:
-            logger.error(f"Error in main loop: {e}")
-        time.sleep(REFRESH_INTERVAL)
 
 if __name__ == "__main__":
     main()
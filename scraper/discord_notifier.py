@@ -1,28 +1,281 @@
+import queue
+import threading
+import time
+
+import requests
 from discord_webhook import DiscordWebhook
-from config.settings import DISCORD_WEBHOOK_URL
+from config.settings import (
+    DISCORD_WEBHOOK_URL, DISCORD_QUEUE, DISCORD_QUEUE_LINGER, DISCORD_MAX_RETRIES,
+)
 from loguru import logger
 
+from scraper.metrics import metrics
+
 
 class DiscordNotifier:
-    def __init__(self, webhook_url=None):
+    """Posts match notifications to a Discord webhook.
+
+    In background mode (the default), send_notification only enqueues the
+    match. A worker thread then coalesces queued matches into messages of up
+    to ``MAX_EMBEDS`` embeds (and ``MAX_MESSAGE_CHARS`` of embed text) and posts them over one reused HTTP session. It
+    waits out 429 responses using Retry-After, so delivery never blocks
+    matching and rate limits no longer drop notifications. With
+    ``background=False`` each match is posted synchronously, as before.
+
+    A notification can name its own ``webhook_url`` (a subscriber's channel)
+    and a ``mention``; matches are coalesced per webhook.
+
+    With an ``outbox`` (a NotificationOutbox), send_notification returns once
+    the match is committed to it, and the worker drains the outbox instead
+    of an in-memory queue: undelivered matches survive restarts and are
+    retried until the outbox gives up on them.
+    """
+
+    MAX_EMBEDS = 10  # Discord's per-message limit
+    MAX_MESSAGE_CHARS = 6000  # Discord's limit on the text of all embeds in a message
+
+    def __init__(self, webhook_url=None, background=None, linger=None, max_retries=None, outbox=None):
         self.webhook_url = webhook_url or DISCORD_WEBHOOK_URL
+        self.background = DISCORD_QUEUE if background is None else background
+        self.linger = DISCORD_QUEUE_LINGER if linger is None else linger
+        self.max_retries = DISCORD_MAX_RETRIES if max_retries is None else max_retries
+        self.session = requests.Session()
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        self.outbox = outbox
+        self._wake = threading.Event()
+        metrics.gauge("notification_queue_depth", lambda: self.pending)
+
+    @staticmethod
+    def _message(found_terms, xml_url, item_id=None):
+        terms_text = ", ".join(found_terms)
+        message = f"{terms_text} was found in this document!"
+        if item_id:
+            message += f" (Article ID: {item_id})"
+        return terms_text, message
 
-    def send_notification(self, found_terms, xml_url, item_id=None):
+    def send_notification(self, found_terms, xml_url, item_id=None, webhook_url=None, mention=None):
         """Send a Discord notification about found articles"""
+        webhook_url = webhook_url or self.webhook_url
+        if self.outbox is not None:
+            # Raises if the commit fails, so the item is not marked read
+            self.outbox.add(found_terms, xml_url, item_id, webhook_url, mention)
+            self._ensure_worker()
+            self._wake.set()
+            return
+        if self.background:
+            self._ensure_worker()
+            self._queue.put((list(found_terms), xml_url, item_id, webhook_url, mention))
+            return
         try:
-            terms_text = ", ".join(found_terms)
-            message = f"{terms_text} was found in this document!"
-            if item_id:
-                message += f" (Article ID: {item_id})"
+            terms_text, message = self._message(found_terms, xml_url, item_id)
             message += f"\n{xml_url}"
+            if mention:
+                message = f"{mention} {message}"
 
-            webhook = DiscordWebhook(url=self.webhook_url, content=message)
-            response = webhook.execute()
+            webhook = DiscordWebhook(url=webhook_url, content=message)
+            with metrics.timer("notify"):
+                response = webhook.execute()
 
             if response.status_code == 200:
                 logger.info(f"Discord notification sent for terms: {terms_text}")
+                metrics.inc("notifications_total", result="sent")
             else:
                 logger.error(f"Failed to send Discord notification: {response.status_code}")
+                metrics.inc("notifications_total", result="failed")
+
+        except Exception as e:
+            logger.error(f"Error sending Discord notification: {e}")
+            metrics.inc("notifications_total", result="failed")
+
+    @property
+    def pending(self) -> int:
+        """Number of notifications waiting to be delivered."""
+        if self.outbox is not None:
+            return self.outbox.pending()
+        return self._queue.unfinished_tasks
+
+    def start(self):
+        """Resume delivering what the outbox still holds from a previous run."""
+        if self.outbox is not None and self.outbox.pending():
+            self._ensure_worker()
+
+    def _unfinished(self):
+        if self.outbox is not None:
+            # Entries waiting for a later retry have had their attempt
+            return self.outbox.pending(due_only=True)
+        return self._queue.unfinished_tasks
+
+    def flush(self, timeout=None) -> bool:
+        """Wait until every queued notification has been handled."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._unfinished():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def _ensure_worker(self):
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                target = self._run if self.outbox is None else self._drain
+                self._worker = threading.Thread(target=target, name="discord-notifier", daemon=True)
+                self._worker.start()
+
+    def _next_batch(self):
+        """Block for one match, then gather more for up to ``linger`` seconds."""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.linger
+        while len(batch) < self.MAX_EMBEDS:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
 
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            # Messages go per destination webhook
+            groups = {}
+            for found_terms, xml_url, item_id, webhook_url, mention in batch:
+                groups.setdefault(webhook_url, []).append((found_terms, xml_url, item_id, mention))
+            try:
+                for webhook_url, group in groups.items():
+                    for run in self._split(group):
+                        mentions = list(dict.fromkeys(m[3] for m in run if m[3]))
+                        try:
+                            with metrics.timer("notify"):
+                                sent = self._deliver([m[:3] for m in run], webhook_url, mentions)
+                        except Exception as e:
+                            logger.error(f"Error sending Discord notification: {e}")
+                            sent = False
+                        metrics.inc("notifications_total", result="sent" if sent else "failed")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _drain(self):
+        """Worker loop in outbox mode: deliver due entries, then sleep until
+        the next retry is due or a new match is committed."""
+        while True:
+            try:
+                entries = self.outbox.due(self.MAX_EMBEDS * 10)
+                if not entries:
+                    self._wake.clear()
+                    next_due = self.outbox.next_due_in()
+            except Exception as e:
+                logger.error(f"Failed to read the notification outbox: {e}")
+                time.sleep(5)
+                continue
+            if not entries:
+                self._wake.wait(60 if next_due is None else min(next_due, 60))
+                time.sleep(self.linger)  # let a cycle's matches coalesce
+                continue
+            groups = {}
+            for entry in entries:
+                groups.setdefault(entry.webhook_url, []).append(entry)
+            for webhook_url, group in groups.items():
+                for run in self._split(group, lambda e: (e.terms, e.url, e.item_id)):
+                    self._deliver_entries(webhook_url, run)
+
+    def _deliver_entries(self, webhook_url, entries):
+        mentions = list(dict.fromkeys(e.mention for e in entries if e.mention))
+        keys = [e.key for e in entries]
+        try:
+            with metrics.timer("notify"):
+                sent = self._deliver([(e.terms, e.url, e.item_id) for e in entries], webhook_url, mentions)
+            error = "" if sent else "delivery failed"
+        except Exception as e:
+            logger.error(f"Error sending Discord notification: {e}")
+            sent, error = False, str(e)
+        metrics.inc("notifications_total", result="sent" if sent else "failed")
+        try:
+            if sent:
+                self.outbox.sent(keys)
+            else:
+                dropped = self.outbox.failed(keys, error)
+                if dropped:
+                    logger.error(f"Giving up on {len(dropped)} notification(s) after repeated failures")
+                    metrics.inc("notifications_total", len(dropped), result="dropped")
         except Exception as e:
-            logger.error(f"Error sending Discord notification: {e}")
\ No newline at end of file
+            logger.error(f"Failed to update the notification outbox: {e}")
+
+    def _embed(self, found_terms, xml_url, item_id) -> dict:
+        terms_text, message = self._message(found_terms, xml_url, item_id)
+        return {"title": terms_text[:256], "description": message[:4096], "url": xml_url}
+
+    def _split(self, items, match=lambda item: item[:3]):
+        """Cut items into runs that fit one message: at most MAX_EMBEDS
+        embeds with at most MAX_MESSAGE_CHARS of title and description text.
+        match gives an item's (found_terms, xml_url, item_id)."""
+        run, chars = [], 0
+        for item in items:
+            embed = self._embed(*match(item))
+            size = len(embed["title"]) + len(embed["description"])
+            if run and (len(run) >= self.MAX_EMBEDS or chars + size > self.MAX_MESSAGE_CHARS):
+                yield run
+                run, chars = [], 0
+            run.append(item)
+            chars += size
+        if run:
+            yield run
+
+    def _payload(self, batch, mentions=()) -> dict:
+        embeds = [self._embed(found_terms, xml_url, item_id) for found_terms, xml_url, item_id in batch]
+        count = len(batch)
+        content = f"{count} new match{'es' if count != 1 else ''}"
+        payload = {"content": content, "embeds": embeds}
+        if mentions:
+            payload["content"] = " ".join(mentions) + " " + content
+            # Only ping the subscribers named here
+            payload["allowed_mentions"] = {"users": [m.strip("<@>") for m in mentions]}
+        return payload
+
+    @staticmethod
+    def _retry_after(response) -> float:
+        header = response.headers.get("Retry-After")
+        if header is not None:
+            return float(header)
+        try:
+            return float(response.json().get("retry_after", 1))
+        except ValueError:
+            return 1.0
+
+    def _deliver(self, batch, webhook_url=None, mentions=()):
+        """POST one coalesced message, retrying rate limits and server errors."""
+        payload = self._payload(batch, mentions)
+        terms_text = "; ".join(", ".join(terms) for terms, _, _ in batch)
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.post(webhook_url or self.webhook_url, json=payload, timeout=10)
+            except requests.RequestException as e:
+                logger.warning(f"Discord webhook request failed ({e}); retrying")
+                time.sleep(min(2 ** attempt, 30))
+                continue
+
+            if response.status_code == 429:
+                wait = self._retry_after(response)
+                logger.warning(f"Discord rate limited; retrying in {wait:.1f}s")
+                time.sleep(wait)
+                continue
+            if response.status_code >= 500:
+                time.sleep(min(2 ** attempt, 30))
+                continue
+            if response.status_code >= 400:
+                logger.error(f"Failed to send Discord notification: {response.status_code}")
+                return False
+
+            logger.info(f"Discord notification sent for terms: {terms_text}")
+            # Bucket exhausted: wait for it to refill before the next message
+            if response.headers.get("X-RateLimit-Remaining") == "0":
+                time.sleep(float(response.headers.get("X-RateLimit-Reset-After", 0)))
+            return True
+
+        logger.error(f"Giving up on Discord notification after {self.max_retries + 1} attempts")
+        return False
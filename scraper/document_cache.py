@@ -0,0 +1,129 @@
+import time
+import zlib
+
+from loguru import logger
+
+from config.settings import DOC_CACHE_FRESH_SECONDS, DOC_CACHE_MAX_BYTES, DOC_CACHE_PATH
+from scraper.sqlite_store import SQLiteStore
+
+
+class CacheEntry:
+    __slots__ = ("url", "etag", "last_modified", "validated_at")
+
+    def __init__(self, url, etag, last_modified, validated_at):
+        self.url = url
+        self.etag = etag
+        self.last_modified = last_modified
+        self.validated_at = validated_at
+
+    def validators(self) -> dict:
+        """Conditional GET headers for revalidating this entry."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class DocumentCache(SQLiteStore):
+    """URL-keyed store of zlib-compressed response bodies in SQLite.
+
+    Entries carry their ETag/Last-Modified validators so they can be
+    revalidated with a conditional GET. An entry validated less than
+    ``fresh_seconds`` ago is served without touching the network. When the
+    stored bytes exceed ``max_bytes``, the least recently used entries are
+    evicted. The database is opened on first use.
+    """
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS documents ("
+        " url TEXT PRIMARY KEY,"
+        " etag TEXT,"
+        " last_modified TEXT,"
+        " body BLOB NOT NULL,"
+        " size INTEGER NOT NULL,"
+        " validated_at REAL NOT NULL,"
+        " accessed_at REAL NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS documents_lru ON documents(accessed_at)",
+    )
+
+    def __init__(self, path=None, max_bytes=None, fresh_seconds=None):
+        super().__init__(path or DOC_CACHE_PATH)
+        self.max_bytes = DOC_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.fresh_seconds = DOC_CACHE_FRESH_SECONDS if fresh_seconds is None else fresh_seconds
+
+    def lookup(self, url):
+        """Return the CacheEntry for url, or None when it is not cached."""
+        with self._lock:
+            row = self._db().execute(
+                "SELECT url, etag, last_modified, validated_at FROM documents WHERE url = ?",
+                (url,),
+            ).fetchone()
+        return CacheEntry(*row) if row else None
+
+    def is_fresh(self, entry) -> bool:
+        return time.time() - entry.validated_at < self.fresh_seconds
+
+    def body(self, url, revalidated=False):
+        """Return the compressed body for url and mark it recently used."""
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            row = db.execute("SELECT body FROM documents WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                return None
+            if revalidated:
+                db.execute("UPDATE documents SET accessed_at = ?, validated_at = ? WHERE url = ?",
+                           (now, now, url))
+            else:
+                db.execute("UPDATE documents SET accessed_at = ? WHERE url = ?", (now, url))
+            db.commit()
+        return row[0]
+
+    def store(self, url, compressed, etag=None, last_modified=None):
+        """Save a zlib-compressed body, then evict down to the byte budget."""
+        if len(compressed) > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT OR REPLACE INTO documents"
+                " (url, etag, last_modified, body, size, validated_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, compressed, len(compressed), now, now),
+            )
+            self._evict(db)
+            db.commit()
+
+    def _evict(self, db):
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM documents").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for url, size in db.execute(
+            "SELECT url, size FROM documents ORDER BY accessed_at"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            db.execute("DELETE FROM documents WHERE url = ?", (url,))
+            total -= size
+            evicted += 1
+        logger.debug(f"Document cache evicted {evicted} entries")
+
+    def size(self) -> int:
+        with self._lock:
+            return self._db().execute("SELECT COALESCE(SUM(size), 0) FROM documents").fetchone()[0]
+
+
+def iter_decompressed(compressed, chunk_size):
+    """Yield the decompressed body in pieces without inflating it all at once."""
+    inflater = zlib.decompressobj()
+    for start in range(0, len(compressed), chunk_size):
+        data = inflater.decompress(compressed[start:start + chunk_size])
+        if data:
+            yield data
+    tail = inflater.flush()
+    if tail:
+        yield tail
@@ -0,0 +1,307 @@
+import time
+
+from config.settings import DOC_INDEX_MAX_DOCUMENTS, DOC_INDEX_PATH
+from scraper.normalize import normalize_term, normalize_text
+from scraper.query import Query, QueryError, is_query, query_source
+from scraper.sqlite_store import SQLiteStore
+
+
+class DocumentIndex(SQLiteStore):
+    """Full-text index of processed documents (SQLite FTS5, trigram tokenizer).
+
+    The trigram tokenizer gives the same case-insensitive substring semantics
+    as TermMatcher, so a rescan can be answered with index queries instead of
+    re-fetching every document. Terms shorter than three characters fall back
+    to LIKE over the stored text. Text and terms are both normalized
+    (scraper.normalize) the same way the matchers see them. Query terms (see scraper.query) use their
+    literals as an FTS prefilter and are then evaluated on the stored text.
+
+    Each search term is registered with an increasing id. A document records
+    ``checked_through``: every registered term with an id up to that value
+    has been checked against it, and its hits are in ``matches``. A term
+    added later has a larger id, so catching up only checks the new term
+    against history. Removing a term just drops its registry row.
+
+    The index keeps the ``max_documents`` most recently indexed documents;
+    older ones are pruned as new ones arrive, so a rescan answered from the
+    index covers that window.
+    """
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS documents ("
+        " rowid INTEGER PRIMARY KEY,"
+        " item_id TEXT UNIQUE NOT NULL,"
+        " url TEXT,"
+        " feed_id INTEGER,"
+        " indexed_at REAL NOT NULL,"
+        " checked_through INTEGER NOT NULL DEFAULT 0)",
+        "CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(body, tokenize='trigram')",
+        "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)",
+        "CREATE TABLE IF NOT EXISTS terms ("
+        " term_id INTEGER PRIMARY KEY AUTOINCREMENT,"
+        " term TEXT UNIQUE NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS matches ("
+        " doc INTEGER NOT NULL,"
+        " term_id INTEGER NOT NULL,"
+        " PRIMARY KEY (doc, term_id))",
+        "CREATE INDEX IF NOT EXISTS matches_term ON matches(term_id)",
+        "CREATE INDEX IF NOT EXISTS documents_indexed_at ON documents(indexed_at)",
+    )
+    PRUNE_EVERY = 100  # documents added between retention checks
+
+    def __init__(self, path=None, max_documents=None):
+        super().__init__(path or DOC_INDEX_PATH)
+        self.max_documents = DOC_INDEX_MAX_DOCUMENTS if max_documents is None else max_documents
+        self._added = 0
+
+    def add(self, item_id, url, feed_id, text, found_terms=(), checked_through=0, normalized=False):
+        """Index (or re-index) the text of one item.
+
+        found_terms are the registered terms that matched it, and
+        checked_through is the value register_terms() returned for the term
+        set it was checked against. The text is stored normalized; pass
+        normalized=True if it already went through normalize_text.
+        """
+        item_id = str(item_id)
+        if not normalized:
+            text = normalize_text(text)
+        found_terms = [str(t) for t in found_terms]
+        with self._lock:
+            db = self._db()
+            row = db.execute("SELECT rowid FROM documents WHERE item_id = ?", (item_id,)).fetchone()
+            if row:
+                rowid = row[0]
+                db.execute(
+                    "UPDATE documents SET url = ?, feed_id = ?, indexed_at = ?, checked_through = ?"
+                    " WHERE rowid = ?",
+                    (url, feed_id, time.time(), checked_through, rowid),
+                )
+                db.execute("DELETE FROM documents_fts WHERE rowid = ?", (rowid,))
+                db.execute("DELETE FROM matches WHERE doc = ?", (rowid,))
+            else:
+                rowid = db.execute(
+                    "INSERT INTO documents (item_id, url, feed_id, indexed_at, checked_through)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (item_id, url, feed_id, time.time(), checked_through),
+                ).lastrowid
+            db.execute("INSERT INTO documents_fts (rowid, body) VALUES (?, ?)", (rowid, text or ""))
+            if found_terms:
+                db.execute(
+                    "INSERT OR IGNORE INTO matches (doc, term_id)"
+                    " SELECT ?, term_id FROM terms WHERE term IN (%s)" % ",".join("?" * len(found_terms)),
+                    [rowid, *found_terms],
+                )
+            db.commit()
+            self._added += 1
+            if self.max_documents and self._added % self.PRUNE_EVERY == 0:
+                self.prune()
+
+    def prune(self) -> int:
+        """Drop the least recently indexed documents beyond max_documents.
+
+        Returns the number of documents removed.
+        """
+        if not self.max_documents:
+            return 0
+        with self._lock:
+            db = self._db()
+            stale = [rowid for (rowid,) in db.execute(
+                "SELECT rowid FROM documents ORDER BY indexed_at DESC, rowid DESC LIMIT -1 OFFSET ?",
+                (self.max_documents,),
+            )]
+            for start in range(0, len(stale), 500):
+                batch = stale[start:start + 500]
+                marks = ",".join("?" * len(batch))
+                db.execute("DELETE FROM matches WHERE doc IN (%s)" % marks, batch)
+                db.execute("DELETE FROM documents_fts WHERE rowid IN (%s)" % marks, batch)
+                db.execute("DELETE FROM documents WHERE rowid IN (%s)" % marks, batch)
+            db.commit()
+        return len(stale)
+
+    def _register(self, db, terms) -> dict:
+        ids = {}
+        for term in terms:
+            term = str(term)
+            db.execute("INSERT OR IGNORE INTO terms (term) VALUES (?)", (term,))
+            ids[term] = db.execute("SELECT term_id FROM terms WHERE term = ?", (term,)).fetchone()[0]
+        return ids
+
+    @staticmethod
+    def _checked_through(db, ids) -> int:
+        """Largest id N such that every registered term with id <= N is in ids."""
+        wanted = set(ids.values())
+        checked = 0
+        for (term_id,) in db.execute("SELECT term_id FROM terms ORDER BY term_id"):
+            if term_id not in wanted:
+                break
+            checked = term_id
+        return checked
+
+    def register_terms(self, terms) -> int:
+        """Make sure terms have ids; returns checked_through for that term set."""
+        with self._lock:
+            db = self._db()
+            ids = self._register(db, terms)
+            db.commit()
+            return self._checked_through(db, ids)
+
+    def forget_term(self, term):
+        """Drop a removed term. Nothing needs re-checking."""
+        with self._lock:
+            db = self._db()
+            row = db.execute("SELECT term_id FROM terms WHERE term = ?", (str(term),)).fetchone()
+            if row:
+                self._drop_terms(db, [row[0]])
+                db.commit()
+
+    @staticmethod
+    def _drop_terms(db, term_ids):
+        db.executemany("DELETE FROM matches WHERE term_id = ?", [(i,) for i in term_ids])
+        db.executemany("DELETE FROM terms WHERE term_id = ?", [(i,) for i in term_ids])
+
+    def catch_up(self, terms) -> int:
+        """Check documents against only the terms they have not seen yet.
+
+        terms is the complete current term set. Registered terms outside it
+        are dropped first: a cycle still running on an older term set can
+        register a removed term again, and it would otherwise hold
+        checked_through below every term added after it. Returns the number
+        of (term, unchecked-documents) passes that were needed, which is 0
+        when nothing changed since the last call.
+        """
+        with self._lock:
+            db = self._db()
+            ids = self._register(db, terms)
+            wanted = set(ids.values())
+            self._drop_terms(db, [term_id for (term_id,) in db.execute("SELECT term_id FROM terms")
+                                  if term_id not in wanted])
+            oldest = db.execute("SELECT MIN(checked_through) FROM documents").fetchone()[0]
+            if oldest is None:
+                db.commit()
+                return 0
+            passes = 0
+            for term, term_id in sorted(ids.items(), key=lambda kv: kv[1]):
+                if term_id <= oldest or not term:
+                    continue
+                passes += 1
+                if is_query(term):
+                    # Checked in Python; plain terms stay a single SQL statement
+                    db.executemany(
+                        "INSERT OR IGNORE INTO matches (doc, term_id)"
+                        " SELECT rowid, ? FROM documents WHERE rowid = ? AND checked_through < ?",
+                        [(term_id, rowid, term_id) for (rowid,) in self._rows_matching(db, term)],
+                    )
+                    continue
+                where, arg = self._term_filter(term)
+                db.execute(
+                    "INSERT OR IGNORE INTO matches (doc, term_id)"
+                    " SELECT rowid, ? FROM documents WHERE checked_through < ?"
+                    " AND rowid IN (SELECT rowid FROM documents_fts WHERE " + where + ")",
+                    (term_id, term_id, arg),
+                )
+            checked = self._checked_through(db, ids)
+            db.execute("UPDATE documents SET checked_through = ? WHERE checked_through < ?",
+                       (checked, checked))
+            db.commit()
+            return passes
+
+    def matches(self, terms) -> list[dict]:
+        """Return the recorded matches for terms, in indexing order.
+
+        Only reflects terms that have been caught up; see catch_up().
+        """
+        order = {str(t): i for i, t in enumerate(terms)}
+        if not order:
+            return []
+        results = {}
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT d.rowid, d.item_id, d.url, t.term FROM matches m"
+                " JOIN documents d ON d.rowid = m.doc"
+                " JOIN terms t ON t.term_id = m.term_id"
+                " WHERE t.term IN (%s) ORDER BY d.rowid" % ",".join("?" * len(order)),
+                list(order),
+            ).fetchall()
+        for rowid, item_id, url, term in rows:
+            results.setdefault(rowid, {"id": item_id, "url": url, "terms": []})["terms"].append(term)
+        for result in results.values():
+            result["terms"].sort(key=order.__getitem__)
+        return list(results.values())
+
+    def __contains__(self, item_id):
+        with self._lock:
+            return self._db().execute(
+                "SELECT 1 FROM documents WHERE item_id = ?", (str(item_id),)
+            ).fetchone() is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._db().execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    @staticmethod
+    def _term_filter(term):
+        """SQL condition (and its argument) selecting FTS rows containing term."""
+        term = normalize_term(term)
+        if len(term) >= 3:
+            return "documents_fts MATCH ?", '"' + term.replace('"', '""') + '"'
+        pattern = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return "body LIKE ? ESCAPE '\\'", f"%{pattern}%"
+
+    def _rows_matching(self, db, term):
+        try:
+            query = Query(term) if is_query(term) else None
+        except QueryError:
+            query, term = None, query_source(term)  # matched as plain text, like QueryMatcher does
+        if query is None:
+            where, arg = self._term_filter(term)
+            return db.execute("SELECT rowid FROM documents_fts WHERE " + where, (arg,))
+        # Narrow with the query's literals in FTS, then check each candidate exactly
+        expression = query.fts()
+        if expression:
+            rows = db.execute("SELECT rowid, body FROM documents_fts WHERE documents_fts MATCH ?",
+                              (expression,))
+        else:
+            rows = db.execute("SELECT rowid, body FROM documents_fts")
+        return [(rowid,) for rowid, body in rows.fetchall() if query.matches(body)]
+
+    def search(self, terms, feed_ids=None) -> list[dict]:
+        """Return indexed documents containing any of terms, in indexing order.
+
+        Each result has the same shape as process_items output:
+        {'id', 'url', 'terms'}.
+        """
+        hits = {}
+        with self._lock:
+            db = self._db()
+            for term in terms:
+                term = str(term)
+                if not term:
+                    continue
+                for (rowid,) in self._rows_matching(db, term):
+                    hits.setdefault(rowid, []).append(term)
+            rowids = sorted(hits)
+            rows = []
+            for start in range(0, len(rowids), 500):
+                batch = rowids[start:start + 500]
+                rows.extend(db.execute(
+                    "SELECT rowid, item_id, url, feed_id FROM documents WHERE rowid IN (%s)"
+                    % ",".join("?" * len(batch)),
+                    batch,
+                ))
+        rows.sort()
+        return [
+            {"id": item_id, "url": url, "terms": hits[rowid]}
+            for rowid, item_id, url, feed_id in rows
+            if feed_ids is None or feed_id in feed_ids
+        ]
+
+    def get_meta(self, key, default=None):
+        with self._lock:
+            row = self._db().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        with self._lock:
+            db = self._db()
+            db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+            db.commit()
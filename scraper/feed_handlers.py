@@ -0,0 +1,207 @@
+import html
+import re
+import threading
+from collections import deque
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+
+from config.settings import FEED_HANDLERS, FETCH_WORKERS
+from scraper.metrics import metrics
+from scraper.normalize import normalize_text
+
+_TAG = re.compile(r"<[^>]+>")
+
+
+class FeedHandler:
+    """Matching strategy for the items of one feed.
+
+    ``match`` returns ``(found_terms, url, text)``. found_terms is None when
+    the item could not be checked (it then stays unread and is retried). url
+    is what gets reported, and text is what gets indexed, already normalized
+    (scraper.normalize) so it is only normalized once. ``workers`` is the
+    size of the feed's own thread pool.
+    """
+
+    kind = None
+    workers = 1
+
+    def __init__(self, feed_id, workers=None):
+        self.feed_id = feed_id
+        if workers:
+            self.workers = workers
+
+    def match(self, searcher, item, matcher):
+        raise NotImplementedError
+
+    def __repr__(self):
+        return f"{type(self).__name__}(feed_id={self.feed_id}, workers={self.workers})"
+
+
+class TitleHandler(FeedHandler):
+    """Match the item title only (e.g. SEC filings)."""
+
+    kind = "title"
+
+    def match(self, searcher, item, matcher):
+        with metrics.timer("match"):
+            text = normalize_text(item.title)
+            return matcher.find_normalized(text), item.url, text
+
+
+class BodyHandler(FeedHandler):
+    """Match the text of the item's own HTML body."""
+
+    kind = "body"
+
+    def match(self, searcher, item, matcher):
+        with metrics.timer("match"):
+            text = normalize_text(html.unescape(_TAG.sub(" ", getattr(item, "body", None) or "")))
+            return matcher.find_normalized(text), item.url, text
+
+
+class LinkedDocumentHandler(FeedHandler):
+    """Fetch the XML document the item links to and match its text
+    (e.g. Federal Register rules)."""
+
+    kind = "linked"
+    workers = FETCH_WORKERS
+
+    def match(self, searcher, item, matcher):
+        if not item.xml_url:
+            raise ValueError(f"item {item.id} has no XML link")
+        found_terms, text = searcher._search_document(item.xml_url, matcher)
+        return found_terms, item.xml_url, text
+
+
+HANDLER_KINDS = {cls.kind: cls for cls in (TitleHandler, BodyHandler, LinkedDocumentHandler)}
+
+
+class HandlerRegistry:
+    """Maps feed ids to the handler that matches their items."""
+
+    def __init__(self, handlers=()):
+        self._handlers = {}
+        for handler in handlers:
+            self.register(handler)
+
+    @classmethod
+    def from_spec(cls, spec=None):
+        """Build from ``"feed:kind[:workers],..."``, e.g. ``"2:linked,3:title"``."""
+        registry = cls()
+        for entry in (FEED_HANDLERS if spec is None else spec).split(","):
+            entry = entry.strip()
+            if not entry:
+                continue
+            feed_id, kind, *rest = entry.split(":")
+            if kind not in HANDLER_KINDS:
+                raise ValueError(f"Unknown feed handler kind {kind!r} in {entry!r}")
+            workers = int(rest[0]) if rest else None
+            registry.register(HANDLER_KINDS[kind](int(feed_id), workers))
+        return registry
+
+    def register(self, handler):
+        self._handlers[handler.feed_id] = handler
+
+    def unregister(self, feed_id):
+        self._handlers.pop(feed_id, None)
+
+    def get(self, feed_id):
+        return self._handlers.get(feed_id)
+
+    def feed_ids(self) -> tuple:
+        return tuple(self._handlers)
+
+    def __iter__(self):
+        return iter(self._handlers.values())
+
+    def __contains__(self, feed_id):
+        return feed_id in self._handlers
+
+
+class FeedPipeline:
+    """A feed's own worker pool, with a cap on how many of its items are in
+    flight. Past the cap, items wait in the pipeline's own queue and start
+    as earlier ones finish, so a slow feed backs up only its own items.
+
+    With ``max_waiting``, submit() blocks while that many items are queued:
+    back-pressure for callers that read their items lazily (rescans page
+    through the history) and must not buffer all of it. Without it submit()
+    never blocks, for callers whose items are already in memory.
+    """
+
+    def __init__(self, handler, backlog_factor=4, max_waiting=None):
+        self.handler = handler
+        self.pool = ThreadPoolExecutor(max_workers=handler.workers,
+                                       thread_name_prefix=f"feed-{handler.feed_id}")
+        self.limit = handler.workers * backlog_factor
+        self.max_waiting = max_waiting
+        self._lock = threading.Lock()
+        self._space = threading.Condition(self._lock)
+        self._waiting = deque()
+        self._running = 0
+        self._closed = False
+
+    @property
+    def backlog(self) -> int:
+        """Items waiting for one of the feed's in-flight slots."""
+        with self._lock:
+            return len(self._waiting)
+
+    def submit(self, fn, *args) -> Future:
+        future = Future()
+        with self._lock:
+            while (self.max_waiting is not None and len(self._waiting) >= self.max_waiting
+                   and not self._closed):
+                self._space.wait()
+            if self._running >= self.limit:
+                self._waiting.append((future, fn, args))
+                return future
+            self._running += 1
+        self._start(future, fn, args)
+        return future
+
+    def _start(self, future, fn, args):
+        """Hand one item to the pool; the slot passes on to the next waiting
+        item if this one was cancelled or the pool is gone."""
+        while True:
+            if future.set_running_or_notify_cancel():
+                try:
+                    inner = self.pool.submit(fn, *args)
+                except Exception as e:
+                    future.set_exception(e)
+                else:
+                    inner.add_done_callback(lambda done: self._finished(future, done))
+                    return
+            with self._lock:
+                if not self._waiting:
+                    self._running -= 1
+                    return
+                future, fn, args = self._waiting.popleft()
+                self._space.notify()
+
+    def _finished(self, future, done):
+        with self._lock:
+            if self._waiting:
+                waiting = self._waiting.popleft()
+                self._space.notify()
+            else:
+                waiting = None
+                self._running -= 1
+        if waiting is not None:
+            self._start(*waiting)
+        if done.cancelled():
+            future.set_exception(CancelledError())
+            return
+        error = done.exception()
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(done.result())
+
+    def shutdown(self):
+        with self._lock:
+            waiting, self._waiting = self._waiting, deque()
+            self._closed = True
+            self._space.notify_all()
+        for future, _, _ in waiting:
+            future.cancel()
+        self.pool.shutdown(wait=False)
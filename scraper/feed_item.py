@@ -0,0 +1,48 @@
+import html
+import re
+
+# Federal Register items link their full text as <a href="...">XML</a>
+_XML_LINK = re.compile(r'<a\s+href="([^"]+)"\s*>\s*XML\s*</a>', re.IGNORECASE)
+
+
+class FeedItem:
+    """Compact record of the FreshRSS item fields the searcher uses.
+
+    Built once per item by FreshRSSManager. The HTML body is scanned once for
+    the XML link and then dropped, unless the feed's handler matches the body
+    itself (``keep_body``).
+    """
+
+    __slots__ = ("id", "feed_id", "url", "title", "published", "xml_url", "body")
+
+    def __init__(self, id, feed_id, url=None, title="", published=None, xml_url=None, body=None):
+        self.id = id
+        self.feed_id = feed_id
+        self.url = url
+        self.title = title
+        self.published = published
+        self.xml_url = xml_url
+        self.body = body
+
+    @classmethod
+    def from_item(cls, item, keep_body=False):
+        """Normalize a freshrss_api Item (or anything with the same fields)."""
+        body = getattr(item, "html", None) or ""
+        match = _XML_LINK.search(body)
+        return cls(
+            id=item.id,
+            feed_id=item.feed_id,
+            url=item.url,
+            title=item.title or "",
+            published=getattr(item, "created_on_time", None),
+            xml_url=html.unescape(match.group(1)) if match else None,
+            body=body if keep_body else None,
+        )
+
+    def __eq__(self, other):
+        if not isinstance(other, FeedItem):
+            return NotImplemented
+        return all(getattr(self, f) == getattr(other, f) for f in self.__slots__)
+
+    def __repr__(self):
+        return f"FeedItem(id={self.id!r}, feed_id={self.feed_id!r}, url={self.url!r}, xml_url={self.xml_url!r})"
@@ -0,0 +1,175 @@
+import threading
+import zlib
+from collections import defaultdict
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config.settings import (
+    FETCH_BACKOFF,
+    FETCH_CONNECT_TIMEOUT,
+    FETCH_PER_HOST,
+    FETCH_RETRIES,
+    FETCH_TIMEOUT,
+    FETCH_WORKERS,
+)
+from scraper.document_cache import iter_decompressed
+from scraper.metrics import metrics
+
+
+class _CachedResponse:
+    """Response stand-in that replays a body from the document cache."""
+
+    status_code = 200
+    from_cache = True
+
+    def __init__(self, compressed):
+        self._compressed = compressed
+
+    def iter_content(self, chunk_size=1):
+        return iter_decompressed(self._compressed, chunk_size)
+
+
+class _RecordingResponse:
+    """Streams a live response to the caller while compressing it for the cache."""
+
+    from_cache = False
+
+    def __init__(self, resp):
+        self._resp = resp
+        self._chunks = None
+        self._deflater = zlib.compressobj()
+        self._parts = []
+        self.status_code = resp.status_code
+
+    def iter_content(self, chunk_size=1):
+        if self._chunks is None:
+            self._chunks = self._resp.iter_content(chunk_size)
+        for chunk in self._chunks:
+            self._parts.append(self._deflater.compress(chunk))
+            yield chunk
+
+    def finish(self) -> bytes:
+        """Read whatever the caller left unread and return the compressed body."""
+        for _ in self.iter_content(64 * 1024):
+            pass
+        self._parts.append(self._deflater.flush())
+        return b"".join(self._parts)
+
+
+class DocumentFetcher:
+    """Pooled HTTP client for linked documents.
+
+    One keep-alive session is shared by every worker thread. Responses are
+    gzip-negotiated, and connect/read timeouts apply. Retries use exponential
+    backoff and honor Retry-After. A semaphore per host caps how many
+    downloads hit the same server at once.
+
+    With a DocumentCache attached, bodies are kept on disk and revalidated with
+    ETag/Last-Modified, so repeat fetches mostly cost a 304 or nothing at all.
+    """
+
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, per_host=None, timeout=None, connect_timeout=None,
+                 retries=None, backoff=None, pool_size=None, cache=None):
+        self.per_host = per_host or FETCH_PER_HOST
+        self.timeout = (connect_timeout or FETCH_CONNECT_TIMEOUT, timeout or FETCH_TIMEOUT)
+
+        retry = Retry(
+            total=FETCH_RETRIES if retries is None else retries,
+            backoff_factor=FETCH_BACKOFF if backoff is None else backoff,
+            status_forcelist=self.RETRY_STATUSES,
+            allowed_methods=frozenset({"GET", "HEAD"}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            max_retries=retry,
+            pool_connections=pool_size or FETCH_WORKERS,
+            pool_maxsize=pool_size or FETCH_WORKERS,
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Accept-Encoding": "gzip, deflate"})
+
+        self.cache = cache
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0}
+
+        self._slots_lock = threading.Lock()
+        self._slots = defaultdict(lambda: threading.BoundedSemaphore(self.per_host))
+
+    def _host_slot(self, url):
+        host = urlsplit(url).netloc.lower()
+        with self._slots_lock:
+            return self._slots[host]
+
+    def _count(self, key):
+        with self._slots_lock:
+            self.stats[key] += 1
+        metrics.inc("document_cache_total", result=key)
+
+    @staticmethod
+    def _count_download(resp):
+        # Bytes read off the wire (before gzip decoding)
+        try:
+            metrics.inc("download_bytes_total", int(resp.raw.tell()))
+        except (AttributeError, TypeError, ValueError):
+            pass
+
+    @contextmanager
+    def open(self, url):
+        """Yield a streamed response for url, holding one of the host's slots.
+
+        The response may be replayed from the cache; callers only rely on
+        iter_content().
+        """
+        entry = self.cache.lookup(url) if self.cache else None
+        if entry and self.cache.is_fresh(entry):
+            body = self.cache.body(url)
+            if body is not None:
+                self._count("hits")
+                yield _CachedResponse(body)
+                return
+
+        with self._host_slot(url):
+            headers = entry.validators() if entry else None
+            resp = self.session.get(url, stream=True, timeout=self.timeout, headers=headers)
+            try:
+                if resp.status_code == 304 and entry:
+                    body = self.cache.body(url, revalidated=True)
+                    if body is not None:
+                        self._count("revalidated")
+                        yield _CachedResponse(body)
+                        return
+                    # Evicted since lookup(); fetch it again unconditionally
+                    resp.close()
+                    resp = self.session.get(url, stream=True, timeout=self.timeout)
+                resp.raise_for_status()
+                self._count("misses")
+                if self.cache is None:
+                    yield resp
+                    return
+                recording = _RecordingResponse(resp)
+                yield recording
+                self.cache.store(
+                    url,
+                    recording.finish(),
+                    etag=resp.headers.get("ETag"),
+                    last_modified=resp.headers.get("Last-Modified"),
+                )
+            finally:
+                self._count_download(resp)
+                resp.close()
+
+    def get(self, url) -> bytes:
+        """Download url and return the decoded body."""
+        with self.open(url) as resp:
+            return b"".join(resp.iter_content(64 * 1024))
+
+    def close(self):
+        self.session.close()
@@ -1,14 +1,33 @@
 from freshrss_api import FreshRSSAPI
-from config.settings import FRESHRSS_HOST, FRESHRSS_USERNAME, FRESHRSS_PASSWORD
+from config.settings import (
+    FRESHRSS_HOST, FRESHRSS_USERNAME, FRESHRSS_PASSWORD,
+    MARK_BATCH_SIZE, MARK_CONCURRENCY, MARK_FEED_BEFORE,
+)
+from scraper.feed_item import FeedItem
+from scraper.metrics import metrics
 from loguru import logger
+from concurrent.futures import ThreadPoolExecutor
 import sys
+import threading
+import time
 
 # Filter out the set_mark logging noise (your original fix)
 logger.remove()
 logger.add(sys.stderr, filter=lambda rec: rec["function"] != "set_mark")
 
 
+# Fever returns at most this many items per with_ids request
+WITH_IDS_MAX = 50
+
+
 class FreshRSSManager:
+    # Feeds whose handler matches the item body; only their records keep it
+    body_feeds = frozenset()
+    # Feeds whose unread items are fetched; None fetches every feed
+    feed_ids = None
+    # TrafficArchive that keeps each unread batch (RECORD_PATH)
+    recorder = None
+
     def __init__(self):
         self.client = FreshRSSAPI(
             host=FRESHRSS_HOST,
@@ -17,22 +36,107 @@ class FreshRSSManager:
             verify_ssl=False,
             verbose=False
         )
+        # item id -> feed id for marks that failed and must be retried
+        self.pending_marks = {}
+        self.unread_fetched_at = None
+        self.history_complete = False
+        self.history_total = None
+        self.last_fetch_failed = False
+        self._item_feeds = {}  # unread item id -> feed id, see _fetch_unread
 
     def get_unread_items(self):
-        """Fetch all unread items from FreshRSS"""
+        """Fetch all unread items from FreshRSS (only feed_ids, when set)"""
         try:
-            return self.client.get_unreads()
+            self.unread_fetched_at = time.time()
+            with metrics.timer("freshrss"):
+                items = [self._record(item) for item in self._fetch_unread()]
+            self.last_fetch_failed = False
+            if self.recorder is not None and items:
+                self._record_batch(items)
+            return items
         except Exception as e:
             logger.error(f"Failed to get unread items: {e}")
+            self.last_fetch_failed = True
             return []
 
-    def get_all_items(self):
-        """Fetch all items from FreshRSS"""
+    def _record_batch(self, items):
         try:
-            return self.client.get_items_from_dates(since="1970-01-01")
+            self.recorder.add_batch(items, self.unread_fetched_at)
         except Exception as e:
-            logger.error(f"Failed to get all items: {e}")
+            logger.error(f"Failed to record unread batch: {e}")
+
+    def _fetch_unread(self):
+        """Unread ids first, then only the ones that can be in feed_ids.
+
+        Fever has no per-feed unread list, so the feed of every unread id is
+        remembered the first time its item is fetched, and later cycles skip
+        ids known to belong to other feeds instead of downloading their bodies
+        again. ``feed_ids`` also goes to FreshRSS with each ``with_ids``
+        batch; an id a batch does not return is remembered as outside those
+        feeds and only asked for again when other feeds are wanted. An empty
+        ``feed_ids`` wants nothing, so nothing is requested.
+        """
+        if self.feed_ids is not None and not self.feed_ids:
             return []
+        response = self.client._call("unread_item_ids")
+        unread = [int(i) for i in str(response.get("unread_item_ids") or "").split(",") if i]
+        wanted = self.feed_ids
+        known = self._item_feeds = {i: self._item_feeds[i] for i in unread if i in self._item_feeds}
+        if wanted is None:
+            fetch = unread
+        else:
+            fetch = [i for i in unread if self._may_be_in(known.get(i), wanted)]
+            metrics.inc("unread_skipped_total", len(unread) - len(fetch))
+        params = {} if wanted is None else {"feed_ids": ",".join(map(str, sorted(wanted)))}
+
+        items = []
+        for start in range(0, len(fetch), WITH_IDS_MAX):
+            batch = fetch[start:start + WITH_IDS_MAX]
+            response = self.client._call("items", with_ids=",".join(map(str, batch)), **params)
+            known.update(dict.fromkeys(batch, wanted or frozenset()))
+            for item in map(self.client._dict_to_item, response.get("items", [])):
+                known[item.id] = item.feed_id
+                if wanted is None or item.feed_id in wanted:
+                    items.append(item)
+        items.sort(key=lambda item: item.id)
+        return items
+
+    @staticmethod
+    def _may_be_in(feed, wanted):
+        """feed is an item's feed id, the feed set FreshRSS excluded it from,
+        or None if the item was never fetched."""
+        if feed is None:
+            return True
+        if isinstance(feed, frozenset):
+            return not wanted <= feed
+        return feed in wanted
+
+    def get_all_items(self, since_id=0):
+        """Yield every item in FreshRSS, oldest first, one Fever page at a time.
+
+        Only the current page is held in memory. If a page request fails the
+        walk stops early and ``history_complete`` stays False. The item count
+        FreshRSS reports is kept in ``history_total``.
+        """
+        self.history_complete = False
+        while True:
+            try:
+                with metrics.timer("freshrss"):
+                    response = self.client._call("items", since_id=str(since_id))
+                    if "total_items" in response:
+                        self.history_total = int(response["total_items"])
+                    page = [self.client._dict_to_item(d) for d in response.get("items", [])]
+            except Exception as e:
+                logger.error(f"Failed to get all items: {e}")
+                return
+            if not page:
+                break
+            page.sort(key=lambda item: item.id)
+            yield from map(self._record, page)
+            if page[-1].id <= since_id:
+                break  # server ignored since_id; avoid looping forever
+            since_id = page[-1].id
+        self.history_complete = True
 
     def mark_as_read(self, item_id):
         """Mark an item as read"""
@@ -41,12 +145,156 @@ class FreshRSSManager:
             return True
         except Exception as e:
             logger.error(f"Failed to mark item {item_id} as read: {e}")
+            metrics.error("mark")
             return False
 
+    def mark_feed_read_before(self, feed_id, before):
+        """Mark every item of a feed added before a unix timestamp as read"""
+        try:
+            # freshrss_api only wraps mark=item; the Fever call is the same shape
+            self.client._call(mark="feed", as_="read", id=feed_id, before=int(before))
+            return True
+        except Exception as e:
+            logger.error(f"Failed to mark feed {feed_id} as read: {e}")
+            metrics.error("mark")
+            return False
+
+    def read_batch(self):
+        """Start collecting mark-as-read calls for one polling cycle"""
+        return ReadBatch(self)
+
+    @staticmethod
+    def normalize(item, keep_body=False):
+        """Convert an API item into a FeedItem record"""
+        return item if isinstance(item, FeedItem) else FeedItem.from_item(item, keep_body)
+
+    def _record(self, item):
+        return self.normalize(item, item.feed_id in self.body_feeds)
+
     def extract_item_id(self, item):
         """Extract the ID from an item object"""
-        return str(item).split("id=")[1].split(",")[0]
+        return str(item.id)
 
     def extract_xml_url(self, item):
         """Extract the XML URL from an item object"""
-        return str(item).split(r'<br>\n <a href="')[1].split('">XML</a>')[0]
+        return self.normalize(item).xml_url
+
+
+class MarkReport:
+    """Outcome of a ReadBatch flush."""
+
+    __slots__ = ("marked", "failed", "calls")
+
+    def __init__(self):
+        self.marked = []
+        self.failed = []
+        self.calls = 0
+
+    def __repr__(self):
+        return f"MarkReport(marked={len(self.marked)}, failed={len(self.failed)}, calls={self.calls})"
+
+
+class ReadBatch:
+    """Collects item ids handled during a cycle and marks them read in bulk.
+
+    Ids are flushed whenever ``batch_size`` is reached and at the end of the
+    cycle. Each flush sends its per-item Fever calls concurrently. In the final
+    flush, a feed where every unread item seen this cycle was handled is
+    marked with a single ``mark=feed&before=<fetch time>`` call instead. That
+    only covers items that existed when the unread list was fetched, so
+    nothing newer is skipped. Ids whose mark fails go to
+    ``manager.pending_marks`` and are retried by the next cycle's batch.
+    """
+
+    def __init__(self, manager, batch_size=None, concurrency=None, feed_before=None):
+        self.manager = manager
+        self.batch_size = batch_size or MARK_BATCH_SIZE
+        self.concurrency = concurrency or MARK_CONCURRENCY
+        self.feed_before = MARK_FEED_BEFORE if feed_before is None else feed_before
+        self.fetched_at = manager.unread_fetched_at
+        self._lock = threading.RLock()  # feed pipelines add from their own threads
+        self._queued = dict(manager.pending_marks)
+        self._seen = {}
+        self._handled = {}
+        self.report = MarkReport()
+
+    def is_pending(self, item_id):
+        """True if the item was handled in an earlier cycle and only needs marking."""
+        return str(item_id) in self.manager.pending_marks
+
+    def seen(self, item_id, feed_id):
+        """Record an unread item this cycle looked at, handled or not."""
+        with self._lock:
+            self._seen.setdefault(feed_id, set()).add(str(item_id))
+
+    def add(self, item_id, feed_id):
+        """Queue a handled item to be marked read."""
+        item_id = str(item_id)
+        with self._lock:
+            self._queued[item_id] = feed_id
+            self._handled.setdefault(feed_id, set()).add(item_id)
+            if len(self._queued) >= self.batch_size:
+                self.flush()
+
+    def _feed_cutoffs(self):
+        """feed id -> largest item id a mark=feed&before call may cover."""
+        if not (self.feed_before and self.fetched_at):
+            return {}
+        before = int(self.fetched_at)
+        cutoffs = {}
+        for feed_id, seen in self._seen.items():
+            if feed_id is None or seen - self._handled.get(feed_id, set()):
+                continue  # something in this feed must stay unread
+            cutoffs[feed_id] = before
+        return cutoffs
+
+    @staticmethod
+    def _covered(item_id, before):
+        # FreshRSS item ids are microsecond timestamps of when the item was added
+        try:
+            return int(item_id) <= before * 1_000_000
+        except ValueError:
+            return False
+
+    def flush(self, final=False) -> MarkReport:
+        """Send queued marks. Returns the cumulative report for the cycle."""
+        with self._lock:
+            if not self._queued:
+                return self.report
+            with metrics.timer("mark"):
+                return self._flush(final)
+
+    def _flush(self, final):
+        queued, self._queued = self._queued, {}
+        individual = []
+
+        cutoffs = self._feed_cutoffs() if final else {}
+        by_feed = {}
+        for item_id, feed_id in queued.items():
+            if feed_id in cutoffs and self._covered(item_id, cutoffs[feed_id]):
+                by_feed.setdefault(feed_id, []).append(item_id)
+            else:
+                individual.append(item_id)
+
+        marked, failed = [], []
+        for feed_id, ids in by_feed.items():
+            self.report.calls += 1
+            if self.manager.mark_feed_read_before(feed_id, cutoffs[feed_id]):
+                marked.extend(ids)
+            else:
+                individual.extend(ids)
+
+        if individual:
+            self.report.calls += len(individual)
+            with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                results = list(pool.map(self.manager.mark_as_read, individual))
+            for item_id, ok in zip(individual, results):
+                (marked if ok else failed).append(item_id)
+
+        for item_id in marked:
+            self.manager.pending_marks.pop(item_id, None)
+        for item_id in failed:
+            self.manager.pending_marks[item_id] = queued[item_id]
+        self.report.marked.extend(marked)
+        self.report.failed.extend(failed)
+        return self.report
@@ -0,0 +1,102 @@
+import os
+import socket
+import time
+import uuid
+
+from config.settings import INSTANCE_ID, LEASE_PATH, LEASE_SECONDS
+from scraper.sqlite_store import SQLiteStore
+
+
+def default_instance_id() -> str:
+    return INSTANCE_ID or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+class LeaseStore(SQLiteStore):
+    """Shares FreshRSS items between instances polling the same account.
+
+    Every instance opens the same SQLite file. Before processing its unread
+    items an instance claims them: an item is granted to one instance at a
+    time, for ``lease_seconds``. A processed item is marked done, so no
+    other instance picks it up again; an item whose lease ran out without
+    being done (its instance died or failed) can be claimed by anyone.
+    """
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS leases ("
+        " item_id TEXT PRIMARY KEY,"
+        " owner TEXT NOT NULL,"
+        " expires_at REAL NOT NULL,"
+        " done_at REAL)",
+        "CREATE INDEX IF NOT EXISTS leases_done_at ON leases(done_at)",
+    )
+    RETENTION = 7 * 24 * 60 * 60  # done items are forgotten after a week
+
+    def __init__(self, path=None, owner=None, lease_seconds=None, clock=time.time):
+        super().__init__(path or LEASE_PATH)
+        self.owner = owner or default_instance_id()
+        self.lease_seconds = lease_seconds or LEASE_SECONDS
+        self.clock = clock
+
+    def claim(self, item_ids):
+        """Try to lease item_ids; returns (acquired, done) as sets of ids.
+
+        Items that are neither were leased by a live instance and should be
+        left alone; done items were finished by someone and only need marking
+        read.
+        """
+        now = self.clock()
+        acquired, done = set(), set()
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")  # one writer across all instances
+            try:
+                db.execute("DELETE FROM leases WHERE done_at < ?", (now - self.RETENTION,))
+                for item_id in dict.fromkeys(map(str, item_ids)):
+                    granted = db.execute(
+                        "INSERT INTO leases (item_id, owner, expires_at) VALUES (?, ?, ?)"
+                        " ON CONFLICT (item_id) DO UPDATE SET"
+                        " owner = excluded.owner, expires_at = excluded.expires_at"
+                        " WHERE leases.done_at IS NULL"
+                        " AND (leases.expires_at < ? OR leases.owner = excluded.owner)",
+                        (item_id, self.owner, now + self.lease_seconds, now),
+                    ).rowcount
+                    if granted:
+                        acquired.add(item_id)
+                    elif db.execute("SELECT done_at IS NOT NULL FROM leases WHERE item_id = ?",
+                                    (item_id,)).fetchone()[0]:
+                        done.add(item_id)
+                db.commit()
+            except BaseException:
+                db.rollback()
+                raise
+        return acquired, done
+
+    def complete(self, item_id) -> bool:
+        """Mark an item this instance holds as done."""
+        with self._lock:
+            db = self._db()
+            updated = db.execute(
+                "UPDATE leases SET done_at = ? WHERE item_id = ? AND owner = ?",
+                (self.clock(), str(item_id), self.owner),
+            ).rowcount
+            db.commit()
+            return bool(updated)
+
+    def release(self, item_id):
+        """Give up an unfinished lease so another instance can retry now."""
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "DELETE FROM leases WHERE item_id = ? AND owner = ? AND done_at IS NULL",
+                (str(item_id), self.owner),
+            )
+            db.commit()
+
+    def holder(self, item_id):
+        """(owner, expires_at, done) for an item, or None if never leased."""
+        with self._lock:
+            row = self._db().execute(
+                "SELECT owner, expires_at, done_at IS NOT NULL FROM leases WHERE item_id = ?",
+                (str(item_id),),
+            ).fetchone()
+        return None if row is None else (row[0], row[1], bool(row[2]))
@@ -0,0 +1,101 @@
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from loguru import logger
+
+from scraper.metrics import metrics
+from scraper.normalize import normalize_text
+from scraper.query import compile_terms
+from scraper.xml_parser import text_from_bytes
+
+# Worker-side state: compiled matchers by term tuple, newest last. Two are
+# kept so a rescan still running on the previous term set does not make the
+# worker recompile for every document.
+_matchers = {}
+_KEEP_MATCHERS = 2
+
+
+def _matcher_for(terms):
+    matcher = _matchers.get(terms)
+    if matcher is None:
+        while len(_matchers) >= _KEEP_MATCHERS:
+            _matchers.pop(next(iter(_matchers)))
+        matcher = _matchers[terms] = compile_terms(terms)
+    return matcher
+
+
+def _prime(terms):
+    _matcher_for(terms)
+
+
+def _scan(body, terms, keep_text):
+    """Runs in a worker: parse, normalize and match one document."""
+    start = time.perf_counter()
+    text = text_from_bytes(body)
+    parsed = time.perf_counter()
+    text = normalize_text(text)
+    found = _matcher_for(terms).find_normalized(text)
+    return found, text if keep_text else None, parsed - start, time.perf_counter() - parsed
+
+
+class MatcherPool:
+    """Parses and matches documents in worker processes.
+
+    lxml parsing and matching are CPU-bound and hold the GIL, so in threads
+    they compete with the Discord event loop and use one core. Here the
+    coordinator only downloads: raw document bytes go to one of ``workers``
+    processes, which returns the terms found (and the normalized text when
+    it is to be indexed). Each worker keeps the matcher it compiled for the
+    current term set and compiles a new one the first time a document
+    arrives with a different set, so term changes need no restart.
+    """
+
+    def __init__(self, workers):
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self, terms):
+        with self._lock:
+            if self._executor is None:
+                # spawn: forking a process that runs the bot and pipeline
+                # threads could copy a lock some thread is holding
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_prime,
+                    initargs=(terms,),
+                )
+            return self._executor
+
+    def scan(self, body, matcher, keep_text=False):
+        """Return (found_terms, normalized text or None) for one document.
+
+        found_terms is None if the document could not be parsed.
+        """
+        terms = tuple(matcher)
+        try:
+            future = self._pool(terms).submit(_scan, body, terms, keep_text)
+            found, text, parse_seconds, match_seconds = future.result()
+        except BrokenProcessPool as e:
+            # A worker died; start a fresh pool for the next document
+            logger.error(f"Matcher pool broke ({e}); restarting it")
+            metrics.error("parse")
+            self.close()
+            return None, None
+        except Exception as e:
+            logger.error(f"Matcher pool failed to process document: {e}")
+            metrics.error("parse")
+            return None, None
+        metrics.observe("stage_seconds", parse_seconds, stage="parse")
+        metrics.observe("stage_seconds", match_seconds, stage="match")
+        return found, text
+
+    def close(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
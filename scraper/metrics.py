@@ -0,0 +1,313 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from loguru import logger
+
+from config.settings import METRICS_HOST, METRICS_PORT
+
+PREFIX = "rssnotifier_"
+# Seconds; covers a title match (microseconds) up to a slow document download
+LATENCY_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+COUNT_BUCKETS = (0, 1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+HELP = {
+    "stage_seconds": "Time spent per pipeline stage",
+    "cycle_items": "Items handled per polling cycle",
+    "items_total": "Items handled, by feed",
+    "matches_total": "Items that matched at least one term",
+    "download_bytes_total": "Bytes of linked documents downloaded",
+    "document_cache_total": "Document fetches by cache result",
+    "notifications_total": "Discord messages by delivery result",
+    "notification_queue_depth": "Notifications waiting to be delivered",
+    "unread_skipped_total": "Unread items not fetched because they belong to unhandled feeds",
+    "duplicates_total": "Items skipped as already seen documents",
+    "leased_elsewhere_total": "Items skipped because another instance holds their lease",
+    "errors_total": "Errors, by stage",
+}
+
+
+class Histogram:
+    """Cumulative-bucket histogram, as Prometheus exposes it."""
+
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q) -> float:
+        """Estimate from the buckets, interpolating linearly within one."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                low = self.buckets[i - 1] if i else 0.0
+                return low + (self.buckets[i] - low) * (rank - seen) / n
+            seen += n
+        return self.buckets[-1]
+
+
+def _labels(labels) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels, extra=()) -> str:
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class Metrics:
+    """In-process counters, gauges and histograms.
+
+    Components record into the shared ``metrics`` instance; ``render()``
+    produces the Prometheus text format served on /metrics and
+    ``summary()`` the short report behind /alerts stats. Gauges that mirror
+    live state (such as the notifier's queue) are registered as callbacks
+    and read at render time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._callbacks = {}
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self._gauges[(name, _labels(labels))] = value
+
+    def gauge(self, name, callback):
+        """Report callback() as gauge name whenever metrics are read."""
+        with self._lock:
+            self._callbacks[name] = callback
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def error(self, stage):
+        self.inc("errors_total", stage=stage)
+
+    @contextmanager
+    def timer(self, stage):
+        """Time a block as one observation of stage_seconds{stage}.
+
+        An exception escaping the block also counts as an error of the stage.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.error(stage)
+            raise
+        finally:
+            self.observe("stage_seconds", time.perf_counter() - start, stage=stage)
+
+    def stopwatch(self):
+        return Stopwatch(self)
+
+    def counter(self, name, **labels):
+        return self._counters.get((name, _labels(labels)), 0)
+
+    def histogram(self, name, **labels):
+        return self._histograms.get((name, _labels(labels)))
+
+    def stage_totals(self) -> dict:
+        """stage -> (observations, total seconds)."""
+        with self._lock:
+            return {dict(labels)["stage"]: (h.count, h.sum)
+                    for (name, labels), h in self._histograms.items() if name == "stage_seconds"}
+
+    def _read_callbacks(self):
+        with self._lock:
+            callbacks = list(self._callbacks.items())
+        values = {}
+        for name, callback in callbacks:
+            try:
+                values[(name, ())] = callback()
+            except Exception as e:
+                logger.warning(f"Metric {name} unavailable: {e}")
+        return values
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        gauges = self._read_callbacks()
+        with self._lock:
+            families = {}
+            for (name, labels), value in self._counters.items():
+                families.setdefault((name, "counter"), []).append((labels, value))
+            for (name, labels), value in {**self._gauges, **gauges}.items():
+                families.setdefault((name, "gauge"), []).append((labels, value))
+            histograms = [(key, h.buckets, list(h.counts), h.count, h.sum)
+                          for key, h in self._histograms.items()]
+        for (name, labels), buckets, counts, count, total in histograms:
+            families.setdefault((name, "histogram"), []).append((labels, (buckets, counts, count, total)))
+
+        lines = []
+        for (name, kind), samples in sorted(families.items()):
+            full = PREFIX + name
+            if name in HELP:
+                lines.append(f"# HELP {full} {HELP[name]}")
+            lines.append(f"# TYPE {full} {kind}")
+            for labels, value in sorted(samples, key=lambda s: s[0]):
+                if kind != "histogram":
+                    lines.append(f"{full}{_format_labels(labels)} {value}")
+                    continue
+                buckets, counts, count, total = value
+                cumulative = 0
+                for bound, n in zip(buckets + ("+Inf",), counts):
+                    cumulative += n
+                    lines.append(f"{full}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{full}_sum{_format_labels(labels)} {total}")
+                lines.append(f"{full}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> str:
+        """Plain-text overview for /alerts stats."""
+        gauges = self._read_callbacks()
+        with self._lock:
+            counters = dict(self._counters)
+            stages = {dict(labels)["stage"]: (h.count, h.sum, h.quantile(0.5), h.quantile(0.95))
+                      for (name, labels), h in self._histograms.items() if name == "stage_seconds"}
+            cycle_items = self._histograms.get(("cycle_items", ()))
+            cycles = (cycle_items.count, cycle_items.sum) if cycle_items else (0, 0)
+
+        def total(name, **labels):
+            if labels:
+                return counters.get((name, _labels(labels)), 0)
+            return sum(v for (n, _), v in counters.items() if n == name)
+
+        lines = [f"Cycles: {cycles[0]}, {cycles[1] / cycles[0] if cycles[0] else 0:.1f} items per cycle on average",
+                 f"Items: {total('items_total')}, matched: {total('matches_total')}"]
+        if stages:
+            lines.append("Stage        calls     avg      p50      p95")
+            for stage, (count, seconds, p50, p95) in sorted(stages.items()):
+                lines.append(f"{stage:<10} {count:>7} {seconds / count:7.3f}s {p50:7.3f}s {p95:7.3f}s")
+        cached = total("document_cache_total", result="hits") + total("document_cache_total", result="revalidated")
+        fetched = total("document_cache_total")
+        hit_rate = f"{100 * cached / fetched:.0f}%" if fetched else "n/a"
+        lines.append(f"Downloaded: {total('download_bytes_total') / 1e6:.1f} MB, cache hit rate: {hit_rate}")
+        lines.append(f"Notifications: {total('notifications_total', result='sent')} sent, "
+                     f"{total('notifications_total', result='failed')} failed, "
+                     f"{gauges.get(('notification_queue_depth', ()), 0)} queued")
+        errors = {dict(labels)["stage"]: v for (n, labels), v in counters.items() if n == "errors_total"}
+        lines.append("Errors: " + (", ".join(f"{s} {n}" for s, n in sorted(errors.items())) or "none"))
+        return "\n".join(lines)
+
+
+class Stopwatch:
+    """Adds up the time spent in several stages of one unit of work (such as
+    one streamed document, where fetching and parsing interleave) and
+    records each stage's total as a single observation."""
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.totals = {}
+
+    @contextmanager
+    def __call__(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.registry.error(stage)
+            raise
+        finally:
+            self.totals[stage] = self.totals.get(stage, 0.0) + time.perf_counter() - start
+
+    def iterate(self, stage, iterable):
+        """Yield from iterable, timing each step as stage."""
+        iterator = iter(iterable)
+        while True:
+            with self(stage):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def record(self):
+        for stage, seconds in self.totals.items():
+            self.registry.observe("stage_seconds", seconds, stage=stage)
+        self.totals.clear()
+
+
+metrics = Metrics()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.server.metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MetricsServer(ThreadingHTTPServer):
+    """Serves ``GET /metrics`` from a daemon thread."""
+
+    daemon_threads = True
+
+    def __init__(self, registry=None, host=None, port=None):
+        super().__init__((host or METRICS_HOST, METRICS_PORT if port is None else port), _MetricsHandler)
+        self.metrics = registry or metrics
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name="metrics", daemon=True).start()
+        return self
+
+
+def start_metrics_server(host=None, port=None):
+    """Start the /metrics endpoint; returns None when disabled (port 0) or
+    when the port cannot be bound."""
+    port = METRICS_PORT if port is None else port
+    if not port:
+        return None
+    try:
+        server = MetricsServer(host=host, port=port).start()
+    except OSError as e:
+        logger.error(f"Could not start metrics endpoint on port {port}: {e}")
+        return None
+    logger.info(f"Metrics at http://{server.server_address[0]}:{server.server_address[1]}/metrics")
+    return server
@@ -0,0 +1,170 @@
+import re
+import unicodedata
+from array import array
+
+# Normalized text is NFKC, casefolded, without soft hyphens or zero-width
+# characters, with hyphenated line wraps inside a word ("min-\ning") joined,
+# and with every whitespace run (NFKC already turned no-break spaces into
+# spaces) collapsed to one space and trimmed at the ends.
+_INVISIBLE = dict.fromkeys(map(ord, "\u00ad\u200b\u200c\u200d\u2060\ufeff"))
+# Starts with the literal hyphen so the regex engine can skip ahead to it
+_WRAP = re.compile(r"-(?<=\w-)[^\S\n]*\n\s*(?=\w)")
+_SEPARATOR = re.compile(r"-(?<=\w-)[^\S\n]*\n\s*(?=\w)|\s+")
+
+# Longest tail held back between chunks
+MAX_CARRY = 4096
+
+
+def _fold(text) -> str:
+    if not text.isascii():
+        text = unicodedata.normalize("NFKC", text).translate(_INVISIBLE)
+    return text.casefold()
+
+
+def _collapse(text) -> str:
+    if "-" in text:
+        text = _WRAP.sub("", text)
+    return " ".join(text.split())
+
+
+def normalize_term(term) -> str:
+    """Normalize a search term the same way document text is normalized."""
+    return _collapse(_fold(str(term)))
+
+
+def normalize_text(text) -> str:
+    """Normalize a whole document in one pass."""
+    return _collapse(_fold(text or ""))
+
+
+def _plain(char) -> bool:
+    """True if char folds to itself (up to case) and is neither whitespace
+    nor a hyphen. Characters NFKC rewrites may turn into either, and the
+    invisible ones vanish, which can bring whitespace on both sides together."""
+    if char.isascii():
+        return not char.isspace() and char != "-"
+    return not char.isspace() and _fold(char) == char.casefold()
+
+
+def _cut_point(text) -> int:
+    """Last offset where the text can be split without changing the result.
+
+    That is between two plain characters (see _plain), the second of which
+    is not a combining mark that NFKC may merge with the character before,
+    since no wrap or whitespace run can span such a point. Returns 0 (hold
+    everything back) if there is none within MAX_CARRY of the end, or
+    len(text) once the tail would grow past MAX_CARRY.
+    """
+    stop = max(0, len(text) - MAX_CARRY)
+    prev_plain = False
+    for i in range(len(text) - 1, stop - 1, -1):
+        char = text[i]
+        plain = _plain(char)
+        if plain and prev_plain and (text[i + 1].isascii() or not unicodedata.combining(text[i + 1])):
+            return i + 1
+        prev_plain = plain
+    return len(text) if stop else 0
+
+
+class TextNormalizer:
+    """Streaming form of normalize_text.
+
+    Feed it the document in chunks; each call returns the normalized text
+    that is final so far, and the pieces add up to normalize_text of the
+    whole document. A short tail is held back until the next chunk shows
+    how it continues. With ``track_offsets`` it also records, for every
+    output character, the offset of the input character it came from
+    (``offsets``).
+    """
+
+    def __init__(self, track_offsets=False):
+        self._pending = ""
+        self._pending_start = 0  # input offset of _pending[0]
+        self._emitted = False
+        self._space_owed = False  # last piece ended in whitespace (MAX_CARRY split)
+        self.offsets = array("q") if track_offsets else None
+
+    def feed(self, chunk) -> str:
+        if not chunk:
+            return ""
+        text = self._pending + chunk
+        cut = _cut_point(text)
+        if cut == 0:
+            self._pending = text
+            return ""
+        head, self._pending = text[:cut], text[cut:]
+        return self._emit(head)
+
+    def preview(self) -> str:
+        """Normalized form of the held-back tail, minus trailing separators
+        whose meaning depends on the next chunk. It is always a prefix of
+        what the tail will eventually produce."""
+        return normalize_text(self._pending.rstrip().rstrip("-"))
+
+    def finish(self) -> str:
+        head, self._pending = self._pending, ""
+        return self._emit(head)
+
+    def _emit(self, head) -> str:
+        start = self._pending_start
+        self._pending_start += len(head)
+        if self.offsets is None:
+            out = normalize_text(head)
+        else:
+            out = self._normalize_tracked(head, start)
+        if not out:
+            self._space_owed = self._space_owed or head[:1].isspace()
+            return ""
+        # Pieces normally start and end on plain characters; only a forced
+        # MAX_CARRY split leaves whitespace at a piece boundary
+        if self._emitted and (self._space_owed or head[:1].isspace()):
+            out = " " + out
+            if self.offsets is not None:
+                self.offsets.insert(len(self.offsets) - len(out) + 1, start)
+        self._emitted = True
+        self._space_owed = head[-1:].isspace()
+        return out
+
+    def _normalize_tracked(self, text, start) -> str:
+        # Fold cluster by cluster (a base character and its combining marks)
+        # so every output character can be traced to its source
+        folded = []
+        source = []
+        i = 0
+        while i < len(text):
+            j = i + 1
+            while j < len(text) and unicodedata.combining(text[j]):
+                j += 1
+            out = _fold(text[i:j])
+            folded.append(out)
+            source.extend([start + i] * len(out))
+            i = j
+        folded = "".join(folded)
+
+        result = []
+        positions = []
+        pos = 0
+        for m in _SEPARATOR.finditer(folded):
+            result.append(folded[pos:m.start()])
+            positions.extend(source[pos:m.start()])
+            if m.group()[0] != "-":
+                result.append(" ")
+                positions.append(source[m.start()])
+            pos = m.end()
+        result.append(folded[pos:])
+        positions.extend(source[pos:])
+        out = "".join(result)
+
+        # Trimmed like normalize_text; _emit restores a boundary space
+        lead = len(out) - len(out.lstrip(" "))
+        trail = len(out) - len(out.rstrip(" "))
+        self.offsets.extend(positions[lead:len(positions) - trail])
+        return out[lead:len(out) - trail]
+
+
+def normalize_with_offsets(text):
+    """Return (normalized text, offsets); offsets[i] is the index in text of
+    the character that produced normalized character i."""
+    normalizer = TextNormalizer(track_offsets=True)
+    normalized = normalizer.feed(text or "") + normalizer.finish()
+    return normalized, normalizer.offsets
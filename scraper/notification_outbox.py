@@ -0,0 +1,131 @@
+import hashlib
+import json
+import time
+from collections import namedtuple
+
+from config.settings import OUTBOX_MAX_ATTEMPTS, OUTBOX_PATH, OUTBOX_RETRY_SECONDS
+from scraper.sqlite_store import SQLiteStore
+
+OutboxEntry = namedtuple("OutboxEntry", "key webhook_url mention item_id url terms attempts")
+
+
+def idempotency_key(webhook_url, item_id, url, mention=None) -> str:
+    """One notification per destination, subscriber and document, however
+    often it is queued. Subscribers sharing a channel webhook each get theirs."""
+    return hashlib.blake2b(f"{webhook_url}\n{mention or ''}\n{item_id or url}".encode("utf-8"),
+                           digest_size=16).hexdigest()
+
+
+class NotificationOutbox(SQLiteStore):
+    """Durable queue of Discord notifications.
+
+    A match is committed here before its item is marked read, so a failed or
+    slow webhook delays the alert instead of losing it. The notifier's
+    sender drains due entries; failed deliveries are retried with
+    exponential backoff starting at ``retry_seconds`` and given up after
+    ``max_attempts``. Entries are keyed by destination, subscriber and
+    document, so queueing the same match again (an item seen twice, a cycle
+    re-run after a crash) never sends it twice.
+    """
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS outbox ("
+        " key TEXT PRIMARY KEY,"
+        " webhook_url TEXT NOT NULL,"
+        " mention TEXT,"
+        " item_id TEXT,"
+        " url TEXT NOT NULL,"
+        " terms TEXT NOT NULL,"
+        " created_at REAL NOT NULL,"
+        " attempts INTEGER NOT NULL DEFAULT 0,"
+        " next_attempt_at REAL NOT NULL,"
+        " sent_at REAL,"
+        " failed_at REAL,"
+        " error TEXT)",
+        "CREATE INDEX IF NOT EXISTS outbox_due ON outbox(next_attempt_at)"
+        " WHERE sent_at IS NULL AND failed_at IS NULL",
+    )
+    RETENTION = 7 * 24 * 60 * 60  # delivered entries are kept a week
+    MAX_BACKOFF = 60 * 60
+
+    def __init__(self, path=None, max_attempts=None, retry_seconds=None, clock=time.time):
+        super().__init__(path or OUTBOX_PATH)
+        self.max_attempts = max_attempts or OUTBOX_MAX_ATTEMPTS
+        self.retry_seconds = OUTBOX_RETRY_SECONDS if retry_seconds is None else retry_seconds
+        self.clock = clock
+
+    def add(self, found_terms, url, item_id, webhook_url, mention=None) -> bool:
+        """Commit one notification; False if it was already queued or sent."""
+        now = self.clock()
+        key = idempotency_key(webhook_url, item_id, url, mention)
+        with self._lock:
+            db = self._db()
+            added = db.execute(
+                "INSERT OR IGNORE INTO outbox"
+                " (key, webhook_url, mention, item_id, url, terms, created_at, next_attempt_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, webhook_url, mention, None if item_id is None else str(item_id), url,
+                 json.dumps(list(found_terms)), now, now),
+            ).rowcount
+            db.commit()
+        return bool(added)
+
+    def due(self, limit=100) -> list[OutboxEntry]:
+        """Undelivered entries whose next attempt is due, oldest first."""
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT key, webhook_url, mention, item_id, url, terms, attempts FROM outbox"
+                " WHERE sent_at IS NULL AND failed_at IS NULL AND next_attempt_at <= ?"
+                " ORDER BY created_at LIMIT ?",
+                (self.clock(), limit),
+            ).fetchall()
+        return [OutboxEntry(*row[:5], json.loads(row[5]), row[6]) for row in rows]
+
+    def sent(self, keys):
+        now = self.clock()
+        with self._lock:
+            db = self._db()
+            db.executemany("UPDATE outbox SET sent_at = ?, attempts = attempts + 1, error = NULL WHERE key = ?",
+                           [(now, key) for key in keys])
+            db.execute("DELETE FROM outbox WHERE sent_at < ?", (now - self.RETENTION,))
+            db.commit()
+
+    def failed(self, keys, error="") -> list[str]:
+        """Schedule a retry for keys; returns those that were given up on."""
+        now = self.clock()
+        given_up = []
+        with self._lock:
+            db = self._db()
+            for key in keys:
+                row = db.execute("SELECT attempts FROM outbox WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    continue
+                attempts = row[0] + 1
+                if attempts >= self.max_attempts:
+                    given_up.append(key)
+                    db.execute("UPDATE outbox SET attempts = ?, failed_at = ?, error = ? WHERE key = ?",
+                               (attempts, now, error, key))
+                else:
+                    delay = min(self.retry_seconds * 2 ** (attempts - 1), self.MAX_BACKOFF)
+                    db.execute("UPDATE outbox SET attempts = ?, next_attempt_at = ?, error = ? WHERE key = ?",
+                               (attempts, now + delay, error, key))
+            db.commit()
+        return given_up
+
+    def pending(self, due_only=False) -> int:
+        """Entries not yet delivered (or given up on); only due ones with due_only."""
+        query = "SELECT COUNT(*) FROM outbox WHERE sent_at IS NULL AND failed_at IS NULL"
+        params = ()
+        if due_only:
+            query += " AND next_attempt_at <= ?"
+            params = (self.clock(),)
+        with self._lock:
+            return self._db().execute(query, params).fetchone()[0]
+
+    def next_due_in(self):
+        """Seconds until the next retry is due, or None if nothing is waiting."""
+        with self._lock:
+            row = self._db().execute(
+                "SELECT MIN(next_attempt_at) FROM outbox WHERE sent_at IS NULL AND failed_at IS NULL"
+            ).fetchone()
+        return None if row[0] is None else max(0.0, row[0] - self.clock())
@@ -0,0 +1,353 @@
+import re
+from bisect import bisect_right
+
+from loguru import logger
+
+from scraper.normalize import TextNormalizer, normalize_term, normalize_text
+from scraper.term_matcher import TermMatcher
+
+# Operators are only recognized in upper case, as whole words
+_TOKEN = re.compile(
+    r'\s*(?:"(?P<phrase>[^"]*)"'
+    r"|(?P<open>\()|(?P<close>\))"
+    r"|NEAR/(?P<near>\d+)(?=[\s()\"]|$)"
+    r"|(?P<op>AND|OR|NOT)(?=[\s()\"]|$)"
+    r'|(?P<word>[^\s"()]+))'
+)
+_WORD = re.compile(r"\w+")
+
+# Query syntax is opt-in: only terms starting with this prefix are parsed,
+# so plain terms containing quotes, parentheses or AND/OR/NOT keep their
+# substring meaning
+QUERY_PREFIX = "q:"
+
+
+class QueryError(ValueError):
+    """Raised for a search term that looks like a query but does not parse."""
+
+
+class _Doc:
+    """Normalized text of one document as seen by the exact checks."""
+
+    __slots__ = ("low", "present", "_word_starts")
+
+    def __init__(self, low, present):
+        self.low = low
+        self.present = present  # prefilter keys seen as substrings
+        self._word_starts = None
+
+    def word_index(self, offset) -> int:
+        if self._word_starts is None:
+            self._word_starts = [m.start() for m in _WORD.finditer(self.low)]
+        return bisect_right(self._word_starts, offset) - 1
+
+
+class Lit:
+    """A literal. Bare words match as substrings (the classic term
+    behaviour); quoted phrases match whole words only."""
+
+    def __init__(self, text, word):
+        self.text = normalize_term(text)
+        self.word = word
+        # Prefilter keys: each word of a phrase, so a cheap substring pass
+        # can rule a phrase out before the word-boundary regex runs
+        self.keys = tuple(dict.fromkeys(self.text.split())) if word else (self.text,)
+        body = re.escape(self.text)
+        self._regex = re.compile(r"(?<!\w)" + body + r"(?!\w)" if word else body)
+
+    def literals(self):
+        yield self
+
+    def could_match(self, present) -> bool:
+        return all(key in present for key in self.keys)
+
+    def evaluate(self, doc) -> bool:
+        if not self.could_match(doc.present):
+            return False
+        return not self.word or self._regex.search(doc.low) is not None
+
+    def spans(self, doc):
+        if self.could_match(doc.present):
+            for m in self._regex.finditer(doc.low):
+                yield doc.word_index(m.start()), doc.word_index(m.end() - 1)
+
+    def fts(self):
+        if any(len(key) < 3 for key in self.keys):
+            return None  # shorter than one trigram
+        return " AND ".join('"' + key.replace('"', '""') + '"' for key in self.keys)
+
+
+class And:
+    def __init__(self, parts):
+        self.parts = parts
+
+    def literals(self):
+        for part in self.parts:
+            yield from part.literals()
+
+    def could_match(self, present) -> bool:
+        return all(part.could_match(present) for part in self.parts)
+
+    def evaluate(self, doc) -> bool:
+        return all(part.evaluate(doc) for part in self.parts)
+
+    def fts(self):
+        parts = [f for f in (part.fts() for part in self.parts) if f]
+        return "(" + " AND ".join(parts) + ")" if parts else None
+
+
+class Or(And):
+    def could_match(self, present) -> bool:
+        return any(part.could_match(present) for part in self.parts)
+
+    def evaluate(self, doc) -> bool:
+        return any(part.evaluate(doc) for part in self.parts)
+
+    def fts(self):
+        parts = [part.fts() for part in self.parts]
+        return "(" + " OR ".join(parts) + ")" if all(parts) else None
+
+
+class Not:
+    def __init__(self, part):
+        self.part = part
+
+    def literals(self):
+        yield from self.part.literals()
+
+    def could_match(self, present) -> bool:
+        return True  # absence cannot be ruled out by a substring prefilter
+
+    def evaluate(self, doc) -> bool:
+        return not self.part.evaluate(doc)
+
+    def fts(self):
+        return None
+
+
+class Near:
+    """Both literals occur with at most ``distance`` words between them."""
+
+    def __init__(self, left, right, distance):
+        if not isinstance(left, Lit) or not isinstance(right, Lit):
+            raise QueryError("NEAR/n only joins words or phrases")
+        self.left = left
+        self.right = right
+        self.distance = distance
+
+    def literals(self):
+        yield self.left
+        yield self.right
+
+    def could_match(self, present) -> bool:
+        return self.left.could_match(present) and self.right.could_match(present)
+
+    def evaluate(self, doc) -> bool:
+        if not self.could_match(doc.present):
+            return False
+        right = list(self.right.spans(doc))
+        for l_start, l_end in self.left.spans(doc):
+            for r_start, r_end in right:
+                gap = r_start - l_end - 1 if r_start > l_end else l_start - r_end - 1
+                if gap <= self.distance:
+                    return True
+        return False
+
+    def fts(self):
+        return And([self.left, self.right]).fts()
+
+
+class _Parser:
+    def __init__(self, source):
+        self.source = source
+        self.tokens = []
+        pos = 0
+        while pos < len(source):
+            m = _TOKEN.match(source, pos)
+            if m is None or m.end() == pos:
+                if source[pos:].strip():
+                    raise QueryError(f"Cannot parse {source!r} at {source[pos:]!r}")
+                break
+            kind = m.lastgroup
+            self.tokens.append((kind, m.group(kind)))
+            pos = m.end()
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def take(self):
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def parse(self):
+        node = self.parse_or()
+        if self.pos != len(self.tokens):
+            raise QueryError(f"Unexpected {self.peek()[1]!r} in {self.source!r}")
+        return node
+
+    def parse_or(self):
+        parts = [self.parse_and()]
+        while self.peek() == ("op", "OR"):
+            self.take()
+            parts.append(self.parse_and())
+        return parts[0] if len(parts) == 1 else Or(parts)
+
+    def parse_and(self):
+        parts = [self.parse_unary()]
+        while True:
+            kind, value = self.peek()
+            if (kind, value) == ("op", "AND"):
+                self.take()
+            elif kind in (None, "close") or (kind, value) == ("op", "OR"):
+                break
+            # anything else is an implicit AND
+            parts.append(self.parse_unary())
+        return parts[0] if len(parts) == 1 else And(parts)
+
+    def parse_unary(self):
+        if self.peek() == ("op", "NOT"):
+            self.take()
+            return Not(self.parse_unary())
+        node = self.parse_primary()
+        while self.peek()[0] == "near":
+            distance = int(self.take()[1])
+            node = Near(node, self.parse_primary(), distance)
+        return node
+
+    def parse_primary(self):
+        kind, value = self.take()
+        if kind == "phrase":
+            if not value.strip():
+                raise QueryError(f"Empty phrase in {self.source!r}")
+            return Lit(value, word=True)
+        if kind == "open":
+            node = self.parse_or()
+            if self.take()[0] != "close":
+                raise QueryError(f"Missing ) in {self.source!r}")
+            return node
+        if kind == "word":
+            # Consecutive bare words form one literal, as in a plain term
+            words = [value]
+            while self.peek()[0] == "word":
+                words.append(self.take()[1])
+            return Lit(" ".join(words), word=False)
+        raise QueryError(f"Expected a word, phrase or ( in {self.source!r}")
+
+
+def is_query(term) -> bool:
+    """True if term opts into the query syntax (starts with QUERY_PREFIX)."""
+    return str(term).startswith(QUERY_PREFIX)
+
+
+def query_source(term) -> str:
+    """The expression of a query term, without QUERY_PREFIX."""
+    term = str(term)
+    return term[len(QUERY_PREFIX):] if term.startswith(QUERY_PREFIX) else term
+
+
+class Query:
+    """One search term compiled into an evaluation plan."""
+
+    def __init__(self, source):
+        self.source = source
+        self.root = _Parser(query_source(source)).parse()
+        self.keys = {key for lit in self.root.literals() for key in lit.keys}
+
+    def matches(self, text) -> bool:
+        """Evaluate against one document on its own (no shared prefilter)."""
+        low = normalize_text(text)
+        present = {key for key in self.keys if key in low}
+        return self.root.evaluate(_Doc(low, present))
+
+    def fts(self):
+        """FTS5 MATCH expression selecting a superset of the matching
+        documents, or None when every document has to be checked."""
+        return self.root.fts()
+
+
+class QueryMatcher:
+    """Matcher for a term list containing queries.
+
+    Every literal of every query goes into one shared TermMatcher, which
+    picks out candidate queries in a single pass over the text. Only those
+    candidates get the word-boundary, NOT and NEAR checks. Same interface as
+    TermMatcher; the scanner buffers the document because NOT and NEAR
+    cannot be decided before the end of the text.
+    """
+
+    def __init__(self, terms=()):
+        self._terms = list(terms)
+        self._queries = []
+        for term in self._terms:
+            try:
+                root = Query(term).root if is_query(term) else Lit(str(term), word=False)
+            except QueryError as e:
+                logger.warning(f"{e}; matching it as plain text")
+                root = Lit(query_source(term), word=False)
+            self._queries.append((term, root))
+        keys = sorted({key for _, root in self._queries for lit in root.literals() for key in lit.keys if key})
+        self._prefilter = TermMatcher(keys)
+
+    def __iter__(self):
+        return iter(self._terms)
+
+    def __len__(self):
+        return len(self._terms)
+
+    def __contains__(self, term):
+        return term in self._terms
+
+    @property
+    def terms(self) -> list[str]:
+        return self._terms.copy()
+
+    def find_all(self, text) -> list[str]:
+        """Return the queries that match text, in term-list order."""
+        if not text:
+            return []
+        return self.find_normalized(normalize_text(text))
+
+    def find_normalized(self, text) -> list[str]:
+        """Like find_all, for text already passed through normalize_text."""
+        if not text:
+            return []
+        present = set(self._prefilter.find_normalized(text))
+        doc = _Doc(text, present)
+        return [term for term, root in self._queries
+                if root.could_match(present) and root.evaluate(doc)]
+
+    def scanner(self, normalized=False):
+        return _QueryScan(self, normalized)
+
+
+class _QueryScan:
+    __slots__ = ("_matcher", "_normalizer", "_chunks")
+
+    def __init__(self, matcher, normalized=False):
+        self._matcher = matcher
+        self._normalizer = None if normalized else TextNormalizer()
+        self._chunks = []
+
+    @property
+    def done(self) -> bool:
+        return False
+
+    def feed(self, chunk) -> bool:
+        if chunk:
+            self._chunks.append(chunk if self._normalizer is None else self._normalizer.feed(chunk))
+        return False
+
+    def found(self) -> list[str]:
+        if self._normalizer is not None:
+            self._chunks.append(self._normalizer.finish())
+        return self._matcher.find_normalized("".join(self._chunks))
+
+
+def compile_terms(terms):
+    """Compile a term list: a plain TermMatcher unless some term is a query."""
+    terms = list(terms)
+    if any(is_query(term) for term in terms):
+        return QueryMatcher(terms)
+    return TermMatcher(terms)
@@ -0,0 +1,140 @@
+import json
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+import requests
+
+from scraper.document_cache import iter_decompressed
+from scraper.feed_item import FeedItem
+from scraper.fetcher import _CachedResponse, _RecordingResponse
+from scraper.sqlite_store import SQLiteStore
+
+
+class TrafficArchive(SQLiteStore):
+    """Recorded FreshRSS traffic for offline replay.
+
+    Holds every unread batch a cycle received (the FeedItem records, as JSON,
+    zlib-compressed, with the time it arrived) and the body of every linked
+    document fetched, compressed once per URL. benchmarks/replay.py feeds an
+    archive back through process_items.
+    """
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS batches ("
+        " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+        " recorded_at REAL NOT NULL,"
+        " items BLOB NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS documents ("
+        " url TEXT PRIMARY KEY,"
+        " body BLOB NOT NULL,"
+        " recorded_at REAL NOT NULL) WITHOUT ROWID",
+    )
+
+    def __init__(self, path):
+        super().__init__(path)
+        self._urls = None  # recorded URLs, loaded on first use
+
+    def add_batch(self, items, recorded_at=None):
+        records = [{field: getattr(item, field) for field in FeedItem.__slots__} for item in items]
+        blob = zlib.compress(json.dumps(records, separators=(",", ":")).encode("utf-8"))
+        with self._lock:
+            db = self._db()
+            db.execute("INSERT INTO batches (recorded_at, items) VALUES (?, ?)",
+                       (time.time() if recorded_at is None else recorded_at, blob))
+            db.commit()
+
+    def batches(self):
+        """Yield (recorded_at, [FeedItem]) in recording order."""
+        with self._lock:
+            rows = self._db().execute("SELECT recorded_at, items FROM batches ORDER BY seq").fetchall()
+        for recorded_at, blob in rows:
+            yield recorded_at, [FeedItem(**record) for record in json.loads(zlib.decompress(blob))]
+
+    def has_document(self, url) -> bool:
+        with self._lock:
+            if self._urls is None:
+                self._urls = {url for (url,) in self._db().execute("SELECT url FROM documents")}
+            return url in self._urls
+
+    def add_document(self, url, compressed):
+        """Store a zlib-compressed body; the first recording of a URL is kept."""
+        with self._lock:
+            if self.has_document(url):
+                return
+            db = self._db()
+            db.execute("INSERT OR IGNORE INTO documents (url, body, recorded_at) VALUES (?, ?, ?)",
+                       (url, compressed, time.time()))
+            db.commit()
+            self._urls.add(url)
+
+    def document(self, url):
+        """The compressed body recorded for url, or None."""
+        with self._lock:
+            row = self._db().execute("SELECT body FROM documents WHERE url = ?", (url,)).fetchone()
+        return None if row is None else row[0]
+
+    def stats(self) -> dict:
+        with self._lock:
+            db = self._db()
+            batches, items = db.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(items)), 0) FROM batches").fetchone()
+            documents, body_bytes = db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(body)), 0) FROM documents"
+            ).fetchone()
+        return {"batches": batches, "batch_bytes": items, "documents": documents, "document_bytes": body_bytes}
+
+
+class RecordingFetcher:
+    """Wraps a DocumentFetcher and copies every body it serves into an archive."""
+
+    def __init__(self, fetcher, archive):
+        self.fetcher = fetcher
+        self.archive = archive
+
+    def __getattr__(self, name):
+        return getattr(self.fetcher, name)
+
+    @contextmanager
+    def open(self, url):
+        with self.fetcher.open(url) as resp:
+            if self.archive.has_document(url):
+                yield resp
+                return
+            recording = _RecordingResponse(resp)
+            yield recording
+            self.archive.add_document(url, recording.finish())
+
+    def get(self, url) -> bytes:
+        with self.open(url) as resp:
+            return b"".join(resp.iter_content(64 * 1024))
+
+
+class ArchiveFetcher:
+    """DocumentFetcher stand-in that serves bodies from a TrafficArchive.
+
+    A URL that was never recorded fails like a 404 would.
+    """
+
+    def __init__(self, archive):
+        self.archive = archive
+        self._lock = threading.Lock()
+        self.stats = {"served": 0, "missing": 0}
+
+    def _body(self, url):
+        body = self.archive.document(url)
+        with self._lock:
+            self.stats["served" if body is not None else "missing"] += 1
+        if body is None:
+            raise requests.HTTPError(f"404 Not recorded: {url}")
+        return body
+
+    @contextmanager
+    def open(self, url):
+        yield _CachedResponse(self._body(url))
+
+    def get(self, url) -> bytes:
+        return b"".join(iter_decompressed(self._body(url), 64 * 1024))
+
+    def close(self):
+        pass
@@ -0,0 +1,127 @@
+import itertools
+import threading
+import time
+
+from loguru import logger
+
+
+class RescanJob:
+    """One rescan running in the background, with live progress counters.
+
+    process_items updates ``scanned``, ``matched`` and ``total`` as it goes
+    and checks ``cancelled`` between items.
+    """
+
+    def __init__(self, job_id, terms):
+        self.id = job_id
+        self.terms = list(terms)
+        self.state = "running"  # running, done, cancelled or failed
+        self.scanned = 0
+        self.matched = 0
+        self.total = None  # unknown until FreshRSS reports it
+        self.started_at = time.time()
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self._cancel = threading.Event()
+        self._finished = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def key(self) -> tuple:
+        """Requests with the same key are answered by the same job."""
+        return tuple(sorted(self.terms))
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    @property
+    def finished(self) -> bool:
+        return self._finished.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def item_done(self, matched=False):
+        """Count one processed item; called from the feed pipelines."""
+        with self._lock:
+            self.scanned += 1
+            if matched:
+                self.matched += 1
+
+    def finish(self, state, result=None, error=None):
+        self.state = state
+        self.result = result
+        self.error = error
+        self.finished_at = time.time()
+        self._finished.set()
+
+    def wait(self, timeout=None) -> bool:
+        return self._finished.wait(timeout)
+
+    def describe(self) -> str:
+        """One-line progress summary."""
+        scanned = f"{self.scanned}/{self.total}" if self.total else str(self.scanned)
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        return (f"Job {self.id} {self.state}: {scanned} items scanned, "
+                f"{self.matched} match(es), {elapsed:.0f}s")
+
+
+class RescanManager:
+    """Starts rescans as background jobs.
+
+    A request for the same terms as a job that is still running joins that
+    job instead of starting another full scan.
+    """
+
+    def __init__(self, searcher, keep_finished=20):
+        self.searcher = searcher
+        self.keep_finished = keep_finished
+        self._jobs = {}  # job id -> RescanJob, oldest first
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def start(self, terms=None):
+        """Return (job, created); created is False when an identical job was joined."""
+        terms = self.searcher.get_search_terms() if terms is None else list(terms)
+        with self._lock:
+            key = tuple(sorted(terms))
+            for job in self._jobs.values():
+                if not job.finished and job.key == key:
+                    return job, False
+            job = RescanJob(next(self._ids), terms)
+            self._jobs[job.id] = job
+            self._prune()
+        threading.Thread(target=self._run, args=(job,), name=f"rescan-{job.id}", daemon=True).start()
+        return job, True
+
+    def _run(self, job):
+        try:
+            result = self.searcher.rescan(job=job)
+        except Exception as e:
+            logger.error(f"Rescan job {job.id} failed: {e}")
+            job.finish("failed", error=e)
+            return
+        job.finish("cancelled" if job.cancelled else "done", result)
+        logger.info(job.describe())
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def running(self) -> list:
+        with self._lock:
+            return [job for job in self._jobs.values() if not job.finished]
+
+    def cancel(self, job_id=None) -> list:
+        """Cancel one job, or every running job when job_id is None."""
+        jobs = self.running() if job_id is None else [self.get(job_id)]
+        jobs = [job for job in jobs if job is not None and not job.finished]
+        for job in jobs:
+            job.cancel()
+        return jobs
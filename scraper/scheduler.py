@@ -0,0 +1,97 @@
+import time
+from datetime import datetime
+
+from config.settings import POLL_MAX_INTERVAL, POLL_MIN_INTERVAL, REFRESH_INTERVAL
+
+
+class FeedSchedule:
+    """Polling state of one feed."""
+
+    __slots__ = ("feed_id", "interval", "next_run", "errors", "hourly_rate")
+
+    def __init__(self, feed_id, interval, next_run):
+        self.feed_id = feed_id
+        self.interval = interval
+        self.next_run = next_run
+        self.errors = 0
+        # Moving average of new items per poll, by local hour of day
+        self.hourly_rate = [0.0] * 24
+
+
+class PollScheduler:
+    """Adaptive per-feed polling schedule.
+
+    A feed that just delivered items is polled again after ``min_interval``.
+    During hours when it has historically been busy (and the hour before), it
+    is polled at least every ``base_interval``. Otherwise the interval grows by
+    ``IDLE_FACTOR`` up to ``max_interval``. FreshRSS errors double it. Runs are
+    planned from when a poll was due rather than when the last cycle finished,
+    so a slow cycle is not followed by a full extra interval of sleep.
+    """
+
+    IDLE_FACTOR = 1.5
+    ERROR_FACTOR = 2
+    RATE_WEIGHT = 0.2
+    ACTIVE_RATE = 0.25  # average new items per poll that marks an hour as busy
+
+    def __init__(self, feed_ids, base_interval=None, min_interval=None, max_interval=None, clock=time.time):
+        self.base_interval = base_interval or REFRESH_INTERVAL
+        self.min_interval = min(min_interval or POLL_MIN_INTERVAL, self.base_interval)
+        self.max_interval = max(max_interval or POLL_MAX_INTERVAL, self.base_interval)
+        self.clock = clock
+        now = clock()
+        self.feeds = {f: FeedSchedule(f, self.base_interval, now) for f in feed_ids}
+
+    @staticmethod
+    def _hour(ts) -> int:
+        return datetime.fromtimestamp(ts).hour
+
+    def due(self, now=None) -> list:
+        """Feeds whose next run has arrived."""
+        now = self.clock() if now is None else now
+        return [f for f, s in self.feeds.items() if s.next_run <= now]
+
+    def is_active(self, feed_id, now=None) -> bool:
+        """True if this hour or the next has historically brought new items."""
+        schedule = self.feeds[feed_id]
+        hour = self._hour(self.clock() if now is None else now)
+        return max(schedule.hourly_rate[hour], schedule.hourly_rate[(hour + 1) % 24]) >= self.ACTIVE_RATE
+
+    def record(self, feed_id, new_items, error=False, now=None):
+        """Update a feed's interval after a poll and plan its next run."""
+        now = self.clock() if now is None else now
+        s = self.feeds[feed_id]
+        if error:
+            s.errors += 1
+            s.interval = min(self.max_interval, max(s.interval, self.base_interval) * self.ERROR_FACTOR)
+            s.next_run = now + s.interval
+            return
+
+        s.errors = 0
+        hour = self._hour(now)
+        s.hourly_rate[hour] += self.RATE_WEIGHT * (new_items - s.hourly_rate[hour])
+        if new_items:
+            s.interval = self.min_interval
+        elif self.is_active(feed_id, now):
+            s.interval = min(self.base_interval, s.interval * self.IDLE_FACTOR)
+        else:
+            s.interval = min(self.max_interval, s.interval * self.IDLE_FACTOR)
+        # Count from when the poll was due, not from when the cycle ended
+        s.next_run = max(s.next_run + s.interval, now)
+
+    def next_run(self):
+        """Return (timestamp, feed ids) of the earliest planned poll."""
+        when = min(s.next_run for s in self.feeds.values())
+        return when, [f for f, s in self.feeds.items() if s.next_run == when]
+
+    def sleep_seconds(self, now=None) -> float:
+        now = self.clock() if now is None else now
+        return max(0.0, self.next_run()[0] - now)
+
+    def describe(self, now=None) -> str:
+        now = self.clock() if now is None else now
+        parts = []
+        for f, s in sorted(self.feeds.items()):
+            state = "backing off" if s.errors else ("active" if self.is_active(f, now) else "idle")
+            parts.append(f"feed {f}: next in {max(0, s.next_run - now):.0f}s (every {s.interval:.0f}s, {state})")
+        return "; ".join(parts)
@@ -1,19 +1,56 @@
 from scraper.freshrss_client import FreshRSSManager
 from scraper.xml_parser import XMLContentParser
 from scraper.discord_notifier import DiscordNotifier
-from config.settings import DEFAULT_SEARCH_TERMS
+from scraper.term_matcher import TermMatcher
+from scraper.query import Query, compile_terms, is_query
+from scraper.document_index import DocumentIndex
+from scraper.feed_handlers import FeedPipeline, HandlerRegistry
+from scraper.subscriptions import SubscriptionStore
+from scraper.metrics import COUNT_BUCKETS, metrics
+from scraper.seen_documents import SeenDocuments, document_keys
+from scraper.matcher_pool import MatcherPool
+from scraper.item_leases import LeaseStore
+from scraper.notification_outbox import NotificationOutbox
+from scraper.recording import RecordingFetcher, TrafficArchive
+from config.settings import (DEFAULT_SEARCH_TERMS, DOC_INDEX_ENABLED, LEASES_ENABLED, MATCHER_PROCESSES,
+                             OUTBOX_ENABLED, RECORD_PATH, SEEN_ENABLED)
 from loguru import logger
+import threading
+import time
+from concurrent.futures import wait
 from pathlib import Path
 from store_terms import StoreTerms
 
 
+# Items a rescan may queue per feed: one Fever history page
+RESCAN_BACKLOG = 50
+
 
 class FederalRegisterSearcher:
-    def __init__(self, search_terms=None):
-        self.freshrss = FreshRSSManager()
+    def __init__(self, search_terms=None, handlers=None, freshrss=None):
+        # By default Federal Register (linked XML) and SEC (title only) feeds
+        self.handlers = handlers if handlers is not None else HandlerRegistry.from_spec()
+        self.freshrss = freshrss if freshrss is not None else FreshRSSManager()
+        body_feeds = frozenset(h.feed_id for h in self.handlers if h.kind == "body")
+        if body_feeds:
+            self.freshrss.body_feeds = body_feeds
         self.xml_parser = XMLContentParser()
-        self.notifier = DiscordNotifier()
+        if RECORD_PATH:
+            archive = TrafficArchive(RECORD_PATH)
+            self.freshrss.recorder = archive
+            self.xml_parser.fetcher = RecordingFetcher(self.xml_parser.fetcher, archive)
+        self.matcher_pool = MatcherPool(MATCHER_PROCESSES) if MATCHER_PROCESSES > 0 else None
+        self.notifier = DiscordNotifier(outbox=NotificationOutbox() if OUTBOX_ENABLED else None)
+        self.index = DocumentIndex() if DOC_INDEX_ENABLED else None
+        self.seen = SeenDocuments() if SEEN_ENABLED else None
+        self.leases = LeaseStore() if LEASES_ENABLED else None
+        self.last_cycle = {}  # feed id -> new unread items in the last poll
+        self._unread_ids = {}  # feed id -> unread item ids the last poll saw
+        self.scheduler = None  # PollScheduler, when main() is polling
+        self._pipelines = {}  # (feed id, rescan) -> FeedPipeline
         self._store = StoreTerms(Path("data/search_terms.json"))
+        self.subscriptions = SubscriptionStore()
+        self._terms = ((), TermMatcher(), self.subscriptions.fanout())
 
         persisted = self._store.load()
 
@@ -24,29 +61,106 @@ class FederalRegisterSearcher:
         else:
             self.search_terms = list(DEFAULT_SEARCH_TERMS)
 
+    @property
+    def search_terms(self):
+        return self._terms[0]
+
+    @search_terms.setter
+    def search_terms(self, terms):
+        self._set_terms(terms, self._terms[2])
+
+    def _set_terms(self, terms, fanout):
+        # Recompile the matcher only when the terms actually change. The
+        # matcher covers the global terms plus every subscribed term. Terms,
+        # matcher and fan-out index are swapped as one tuple, so a cycle
+        # running on another thread never sees them out of step.
+        terms = tuple(terms)
+        matched = terms + tuple(sorted(set(fanout.terms).difference(terms)))
+        matcher = self._terms[1]
+        if tuple(matcher) != matched:
+            matcher = compile_terms(matched)
+        self._terms = (terms, matcher, fanout)
+
+    @property
+    def _matcher(self):
+        return self._terms[1]
+
+    def subscribe(self, kind, discord_id, term, webhook_url=None):
+        """Subscribe a user or channel to term; its matches go to webhook_url."""
+        term = (term or "").strip()
+        if not term:
+            return False
+        self._check_query(term)
+        if not self.subscriptions.subscribe(kind, discord_id, term, webhook_url):
+            return False
+        self._set_terms(self.search_terms, self.subscriptions.fanout())
+        logger.info(f"{kind} {discord_id} subscribed to: {term}")
+        return True
+
+    def unsubscribe(self, kind, discord_id, term):
+        term = (term or "").strip()
+        if not term or not self.subscriptions.unsubscribe(kind, discord_id, term):
+            return False
+        fanout = self.subscriptions.fanout()
+        self._set_terms(self.search_terms, fanout)
+        if self.index is not None and term not in fanout and term not in self.search_terms:
+            self.index.forget_term(term)
+        logger.info(f"{kind} {discord_id} unsubscribed from: {term}")
+        return True
+
+    def get_subscriptions(self, kind, discord_id):
+        return self.subscriptions.terms_of(kind, discord_id)
+
+    @staticmethod
+    def _check_query(term):
+        """Raise QueryError before a malformed query gets stored."""
+        if is_query(term):
+            Query(term)
+
     def add_search_term(self, term):
         term = (term or "").strip()
         if not term:
             return False
+        self._check_query(term)
         if term not in self.search_terms:
-            self.search_terms = self._store.add(term)  # writes file
+            self.search_terms = self._store.add(term)  # appends to the journal
             logger.info(f"Added search term: {term}")
             return True
         return False
 
+    def add_search_terms(self, terms) -> list[str]:
+        """Bulk import: one journal append and one matcher rebuild for all terms.
+
+        Returns the terms that were new.
+        """
+        current = set(self.search_terms)
+        added = []
+        for term in terms:
+            term = (term or "").strip()
+            if term and term not in current:
+                self._check_query(term)
+                current.add(term)
+                added.append(term)
+        if added:
+            self.search_terms = self._store.add_many(added)
+            logger.info(f"Added {len(added)} search terms")
+        return added
+
     def remove_search_term(self, term):
         term = (term or "").strip()
         if not term:
             return False
         if term in self.search_terms:
-            self.search_terms = self._store.remove(term)  # writes file
+            self.search_terms = self._store.remove(term)  # appends to the journal
+            if self.index is not None and term not in self._terms[2]:
+                self.index.forget_term(term)  # no rescan needed
             logger.info(f"Removed search term: {term}")
             return True
         return False
 
     def get_search_terms(self):
         """Get current search terms"""
-        return self.search_terms.copy()
+        return list(self.search_terms)
 
     def set_refresh_interval(self, seconds):
         """Set refresh interval (for future Discord integration)"""
@@ -57,90 +171,314 @@ class FederalRegisterSearcher:
         """Return the search terms that appear in text (case-insensitive)."""
         if not text:
             return []
-        low = text.lower()
-        return [t for t in terms if t.lower() in low]
+        if not hasattr(terms, "find_all"):
+            terms = compile_terms(terms)
+        return terms.find_all(text)
+
+    def _search_document(self, xml_url, matcher):
+        """Fetch and search one linked document; returns (found_terms, text).
+
+        The normalized text is only kept when it is going into the index,
+        otherwise the streaming search can stop as soon as every term has
+        been found.
+        With a matcher pool the document is downloaded whole, then parsed and
+        matched in a worker process.
+        """
+        if self.matcher_pool is not None:
+            try:
+                with metrics.timer("fetch"):
+                    body = self.xml_parser.fetcher.get(xml_url)
+            except Exception as e:
+                logger.error(f"Failed to fetch {xml_url}: {e}")
+                return None, None
+            return self.matcher_pool.scan(body, matcher, keep_text=self.index is not None)
+        if self.index is None:
+            return self.xml_parser.search_xml_url(xml_url, matcher), None
+        return self.xml_parser.stream_search_text(xml_url, matcher)
+
+    def _index_item(self, item_id, url, feed_id, text, found_terms, checked_through):
+        if self.index is None:
+            return
+        try:
+            with metrics.timer("index"):
+                self.index.add(item_id, url, feed_id, text, found_terms, checked_through, normalized=True)
+        except Exception as e:
+            logger.error(f"Failed to index item {item_id}: {e}")
+
+    def find_documents(self, terms=None) -> list[dict]:
+        """Return indexed documents that contain any of terms (default: current terms).
+
+        Answered from the local index only - no FreshRSS or network access.
+        """
+        if self.index is None:
+            return []
+        return self.index.search(self.search_terms if terms is None else terms)
+
+    def index_ready(self) -> bool:
+        """True once a full rescan has backfilled the index with feed history."""
+        return self.index is not None and bool(self.index.get_meta("backfilled_at"))
 
-    def process_items(self, rescan):
-        """Process all unread items and check for search terms - your core logic"""
+    def delta_rescan(self, terms=None) -> list[dict]:
+        """Check history against only the terms it has not been checked for,
+        then return the recorded matches for terms (default: all current terms).
+
+        After /alerts add this costs one index query for the new term; after
+        a removal it costs nothing.
+        """
+        current = list(self._matcher)  # global and subscribed terms
+        self.index.catch_up(current)
+        return self.index.matches(current if terms is None else terms)
+
+    def rescan(self, job=None) -> list[dict]:
+        """Find every processed document matching the current terms.
+
+        Uses the local index once it has been backfilled by a full
+        process_items(True) run; until then (or without an index) it does
+        that full run, which also fills the index. job is an optional
+        RescanJob that receives progress and can cancel the full run.
+        """
+        if self.index_ready():
+            matches = self.delta_rescan()
+            if job is not None:
+                job.total = job.scanned = len(self.index)
+                job.matched = len(matches)
+            return matches
+        return self.process_items(True, job=job)
+
+    @property
+    def FEED_IDS(self) -> tuple:
+        """Feeds that have a handler registered."""
+        return self.handlers.feed_ids()
+
+    def _pipeline(self, handler, rescan=False):
+        """The feed's pipeline, rebuilt if its handler was replaced.
+
+        Rescans get pipelines of their own, so a poll never waits behind the
+        history backlog. They also queue at most one history page per feed,
+        which keeps the lazily paged walk from buffering the whole history.
+        """
+        key = (handler.feed_id, rescan)
+        pipeline = self._pipelines.get(key)
+        if pipeline is None or pipeline.handler is not handler:
+            if pipeline is not None:
+                pipeline.shutdown()
+            pipeline = self._pipelines[key] = FeedPipeline(
+                handler, max_waiting=RESCAN_BACKLOG if rescan else None)
+        return pipeline
+
+    def _notify(self, found_terms, url, item_id, terms):
+        """Send one notification per destination: the default webhook for
+        global terms, and each subscriber's channel for the terms it owns."""
+        global_terms, _, fanout = terms
+        shared = [t for t in found_terms if t in global_terms]
+        if shared:
+            self.notifier.send_notification(shared, url, item_id)
+        for subscriber, owned in fanout.route(found_terms).items():
+            self.notifier.send_notification(owned, url, item_id,
+                                            webhook_url=subscriber.webhook_url,
+                                            mention=subscriber.mention)
+
+    def _remember(self, item):
+        """Record a handled item so its document is not notified again."""
+        if self.seen is None:
+            return
+        try:
+            self.seen.add(item)
+        except Exception as e:
+            logger.error(f"Failed to record item {item.id} as seen: {e}")
+
+    def _settle_lease(self, item, done):
+        """Mark a leased item done, or release it for another attempt."""
+        if self.leases is None:
+            return
+        try:
+            if done:
+                self.leases.complete(item.id)
+            else:
+                self.leases.release(item.id)
+        except Exception as e:
+            logger.error(f"Failed to update the lease on item {item.id}: {e}")
+
+    def _handle_item(self, handler, item, terms, rescan, marks, checked_through, job=None):
+        """Match one item with its feed's handler; runs on the feed's pipeline."""
+        if job is not None and job.cancelled:
+            return None
+        matcher = terms[1]
+        try:
+            item_id = item.id
+            found_terms, url, text = handler.match(self, item, matcher)
+            if found_terms is None:
+                if not rescan:
+                    self._settle_lease(item, done=False)
+                return None
+            self._index_item(item_id, url, item.feed_id, text, found_terms, checked_through)
+
+            article = None
+            if found_terms:
+                logger.info(f"Search string found for feed {item.feed_id} article {item_id}!")
+                logger.info(url)
+
+                # Send Discord notification
+                if not rescan:
+                    self._notify(found_terms, url, item_id, terms)
+
+                article = {
+                    'id': item_id,
+                    'url': url,
+                    'terms': found_terms
+                }
+
+            if not rescan:
+                self._remember(item)
+                self._settle_lease(item, done=True)
+
+            # Queue mark as read
+            if marks is not None:
+                marks.add(item_id, item.feed_id)
+            return article
+
+        except Exception as e:
+            logger.error(f"Error processing item: {e}")
+            metrics.error("item")
+            if not rescan:
+                self._settle_lease(item, done=False)
+            return None
+
+    def process_items(self, rescan, feed_ids=None, job=None):
+        """Process all unread items and check for search terms - your core logic
+
+        Each item goes to its feed's handler on that feed's own pipeline, so a
+        feed whose documents are slow to fetch does not hold up the others.
+        feed_ids limits the cycle to those feeds; other items stay unread.
+        job (a RescanJob) gets progress counts and can stop the run early.
+        Matches are returned in feed order.
+        """
+        started = time.perf_counter()
         if rescan:
+            # Lazily paged: matches start arriving before the history is read
             unread_items = self.freshrss.get_all_items()
         else:
+            # Only feeds with a handler (and in feed_ids) are downloaded
+            wanted = self.FEED_IDS if feed_ids is None else [f for f in feed_ids if f in self.FEED_IDS]
+            self.freshrss.feed_ids = frozenset(wanted)
             unread_items = self.freshrss.get_unread_items()
 
-        if not unread_items:
+        if unread_items is None:
+            if not rescan:
+                self.last_cycle = dict.fromkeys(feed_ids or self.FEED_IDS, 0)
             return []
 
-        found_articles = []
+        found = []
+        found_lock = threading.Lock()
+        in_flight = set()
+        claimed = set()  # document keys dispatched this run
+        terms = self._terms  # one consistent snapshot for the whole cycle
+        checked_through = self.index.register_terms(terms[1]) if self.index is not None else 0
+        marks = None if rescan else self.freshrss.read_batch()
 
-        for item in unread_items:
+        if feed_ids is not None:
+            unread_items = (item for item in unread_items if item.feed_id in feed_ids)
+        leased = done_elsewhere = None
+        if self.leases is not None and not rescan:
+            # Claim this cycle's items in one transaction; items another live
+            # instance holds are left to it (and stay unread here)
+            unread_items = [item for item in unread_items if self.handlers.get(item.feed_id) is not None]
+            try:
+                leased, done_elsewhere = self.leases.claim(item.id for item in unread_items)
+            except Exception as e:
+                logger.error(f"Failed to claim item leases: {e}")
+                self.last_cycle = dict.fromkeys(feed_ids or self.FEED_IDS, 0)
+                return []
+        # New arrivals per feed, for the scheduler: unread ids earlier polls
+        # did not see. Items that stay unread are not counted again.
+        arrivals = dict.fromkeys(feed_ids or self.FEED_IDS, 0)
+        polled = {}  # feed id -> unread ids seen by this poll
+        dispatched = 0
+
+        def collect(seq):
+            def done(future):
+                article = future.result()
+                with found_lock:
+                    in_flight.discard(future)
+                    if article is not None:
+                        found.append((seq, article))
+                if article is not None:
+                    metrics.inc("matches_total")
+                if job is not None:
+                    job.item_done(article is not None)
+            return done
+
+        for seq, item in enumerate(unread_items):
+            if job is not None:
+                if job.cancelled:
+                    logger.info("Rescan cancelled")
+                    break
+                job.total = getattr(self.freshrss, "history_total", None)
             feed_id = item.feed_id
-            if feed_id == 2:
-                try:
-                    item_id = self.freshrss.extract_item_id(item)
-                    xml_url = self.freshrss.extract_xml_url(item)
-
-                    # Parse XML content
-                    xml_content = self.xml_parser.fetch_and_parse_xml(xml_url)
-                    if not xml_content:
-                        continue
-
-                    # Search for terms
-                    found_terms = self.xml_parser.search_xml_content(xml_content, self.search_terms)
-
-                    if found_terms:
-                        logger.info(
-                            f"Search string found for Federal Register article {item_id}!"
-                        )
-                        logger.info(xml_url)
-
-                        # Send Discord notification
-                        if not rescan:
-                            self.notifier.send_notification(found_terms, xml_url, item_id)
-
-                        found_articles.append({
-                            'id': item_id,
-                            'url': xml_url,
-                            'terms': found_terms
-                        })
-
-                    # Mark as read
-                    if not rescan:
-                        self.freshrss.mark_as_read(item_id)
-
-                except Exception as e:
-                    logger.error(f"Error processing item: {e}")
+            handler = self.handlers.get(feed_id)
+            if handler is None:
+                continue
+            if not rescan:
+                polled.setdefault(feed_id, set()).add(item.id)
+                if feed_id in arrivals and item.id not in self._unread_ids.get(feed_id, ()):
+                    arrivals[feed_id] += 1
+            if marks is not None:
+                marks.seen(item.id, feed_id)
+                if marks.is_pending(item.id):
+                    # Already handled; only its mark-as-read failed last cycle
                     continue
-            elif feed_id == 3:
-                try:
-                    url = item.url
-                    item_id = item.id
-                    title = item.title or ""
-
-                    # Match against the SEC item title
-                    found_terms = self._find_terms_in_text(title, self.search_terms)
-
-                    if found_terms:
-                        logger.info(
-                            f"Search string found for SEC article {item_id}!"
-                        )
-                        logger.info(url)
-
-                        # Send Discord notification
-                        if not rescan:
-                            self.notifier.send_notification(found_terms, url, item_id)
-
-                        found_articles.append({
-                            'id': item_id,
-                            'url': url,
-                            'terms': found_terms
-                        })
-
-                    # Mark as read
-                    if not rescan:
-                        self.freshrss.mark_as_read(item_id)
-
-                except Exception as e:
-                    logger.error(f"Error processing item: {e}")
+            if leased is not None and str(item.id) not in leased:
+                if str(item.id) in done_elsewhere:
+                    # Handled by another instance that has not marked it read yet
+                    if marks is not None:
+                        marks.add(item.id, feed_id)
+                else:
+                    metrics.inc("leased_elsewhere_total")
+                continue
+            if self.seen is not None:
+                # The same document under another item id, from another feed,
+                # earlier in this run or (outside rescans) before a restart
+                keys = document_keys(item)
+                if claimed.intersection(keys) or (not rescan and self.seen.contains(keys)):
+                    metrics.inc("duplicates_total")
+                    if marks is not None:
+                        marks.add(item.id, feed_id)
+                    if leased is not None:
+                        self._settle_lease(item, done=True)
                     continue
+                claimed.update(keys)
+            dispatched += 1
+            metrics.inc("items_total", feed=feed_id)
+            future = self._pipeline(handler, rescan).submit(
+                self._handle_item, handler, item, terms, rescan, marks, checked_through, job
+            )
+            with found_lock:
+                in_flight.add(future)
+            future.add_done_callback(collect(seq))
+
+        with found_lock:
+            remaining = list(in_flight)
+        wait(remaining)
+
+        if marks is not None:
+            report = marks.flush(final=True)
+            if report.failed:
+                logger.warning(f"{len(report.failed)} item(s) could not be marked read; retrying next cycle")
+
+        cancelled = job is not None and job.cancelled
+        if (rescan and not cancelled and self.index is not None
+                and getattr(self.freshrss, "history_complete", True)):
+            # Every item in the feed history has now been indexed
+            self.index.set_meta("backfilled_at", time.time())
 
-        return found_articles
+        metrics.observe("stage_seconds", time.perf_counter() - started, stage="rescan" if rescan else "cycle")
+        if not rescan:
+            # Only polls publish counts; a rescan on the bot's thread must not
+            # feed history into the scheduler
+            if not getattr(self.freshrss, "last_fetch_failed", False):
+                for feed_id in arrivals:
+                    self._unread_ids[feed_id] = polled.get(feed_id, set())
+            self.last_cycle = arrivals
+            metrics.observe("cycle_items", dispatched, buckets=COUNT_BUCKETS)
+        found.sort(key=lambda pair: pair[0])
+        return [article for _, article in found]
@@ -0,0 +1,149 @@
+import hashlib
+import math
+import re
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from config.settings import SEEN_BLOOM_CAPACITY, SEEN_PATH
+from scraper.sqlite_store import SQLiteStore
+
+# Federal Register document numbers (2024-01234) and SEC accession numbers
+# (0000320193-24-000006), as they appear in item and document URLs
+_DOC_NUMBER = re.compile(r"(?<![\w-])(\d{4}-\d{5}|\d{10}-\d{2}-\d{6})(?!\d)")
+
+
+def normalize_url(url) -> str:
+    """Scheme-less form of url that treats trivially different links as one:
+    host lower-cased without ``www.``, default ports, fragments, trailing
+    slashes and ``utm_*`` parameters dropped, query parameters sorted."""
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port and port not in (80, 443):
+        host += f":{port}"
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if not k.lower().startswith("utm_"))
+    path = parts.path.rstrip("/") or "/"
+    return host + path + ("?" + urlencode(query) if query else "")
+
+
+def document_keys(item) -> list[str]:
+    """Keys under which an item counts as seen: its id, the normalized URLs
+    it links to, and the document or accession number in those URLs."""
+    keys = [f"item:{item.id}"]
+    for url in (getattr(item, "xml_url", None), getattr(item, "url", None)):
+        if not url:
+            continue
+        keys.append("url:" + normalize_url(url))
+        match = _DOC_NUMBER.search(urlsplit(url).path)
+        if match:
+            keys.append("doc:" + match.group(1))
+    return list(dict.fromkeys(keys))
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings.
+
+    ``key in bloom`` is never wrong when False; when True it is wrong with
+    about ``error_rate`` probability while no more than ``capacity`` keys
+    have been added.
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.capacity = max(1, int(capacity))
+        self.size = max(8, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def __len__(self):
+        return self.count
+
+
+class SeenDocuments(SQLiteStore):
+    """Persistent set of documents a polling cycle has already handled
+    (checked against the terms and, on a match, notified).
+
+    Keys come from document_keys(), so the same rule arriving again under a
+    new item id, through another feed or after a restart is recognized
+    before anything is fetched. A Bloom filter in front of the table answers
+    the common "never seen" case without a query; it is loaded on first use
+    and rebuilt larger when it fills up.
+    """
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS seen ("
+        " key TEXT PRIMARY KEY,"
+        " item_id TEXT NOT NULL,"
+        " seen_at REAL NOT NULL) WITHOUT ROWID",
+    )
+
+    def __init__(self, path=None, capacity=None):
+        super().__init__(path or SEEN_PATH)
+        self.capacity = capacity or SEEN_BLOOM_CAPACITY
+        self._bloom = None
+
+    def _filter(self) -> BloomFilter:
+        if self._bloom is None:
+            db = self._db()
+            count = db.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+            bloom = BloomFilter(max(self.capacity, 2 * count))
+            for (key,) in db.execute("SELECT key FROM seen"):
+                bloom.add(key)
+            self._bloom = bloom
+        return self._bloom
+
+    def contains(self, keys) -> bool:
+        """True if any of keys has been recorded."""
+        with self._lock:
+            bloom = self._filter()
+            candidates = [key for key in keys if key in bloom]
+            if not candidates:
+                return False
+            marks = ",".join("?" * len(candidates))
+            return self._db().execute(
+                f"SELECT 1 FROM seen WHERE key IN ({marks}) LIMIT 1", candidates
+            ).fetchone() is not None
+
+    def is_seen(self, item) -> bool:
+        return self.contains(document_keys(item))
+
+    def add(self, item):
+        """Record every key of item."""
+        keys = document_keys(item)
+        now = time.time()
+        with self._lock:
+            bloom = self._filter()
+            db = self._db()
+            db.executemany(
+                "INSERT OR IGNORE INTO seen (key, item_id, seen_at) VALUES (?, ?, ?)",
+                [(key, str(item.id), now) for key in keys],
+            )
+            db.commit()
+            for key in keys:
+                bloom.add(key)
+            if len(bloom) > bloom.capacity:
+                self._bloom = None  # reloaded at twice the stored key count
+
+    def __len__(self):
+        with self._lock:
+            return self._db().execute("SELECT COUNT(*) FROM seen").fetchone()[0]
@@ -0,0 +1,36 @@
+import sqlite3
+import threading
+from pathlib import Path
+
+
+class SQLiteStore:
+    """Base for the small local SQLite databases kept under data/.
+
+    The connection is opened on first use and shared between threads behind a
+    lock. Subclasses list their DDL in ``SCHEMA``.
+    """
+
+    SCHEMA = ()
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.RLock()
+        self._conn = None
+
+    def _db(self):
+        if self._conn is None:
+            if str(self.path) != ":memory:":
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,153 @@
+from config.settings import SUBSCRIPTIONS_PATH
+from scraper.sqlite_store import SQLiteStore
+
+
+class Subscriber:
+    """A Discord user or channel that owns search terms.
+
+    Matches are posted to ``webhook_url`` (the channel the subscription was
+    made in). User subscribers are mentioned in the message.
+    """
+
+    __slots__ = ("id", "kind", "discord_id", "webhook_url")
+
+    def __init__(self, id, kind, discord_id, webhook_url=None):
+        self.id = id
+        self.kind = kind  # "user" or "channel"
+        self.discord_id = discord_id
+        self.webhook_url = webhook_url
+
+    @property
+    def mention(self):
+        return f"<@{self.discord_id}>" if self.kind == "user" else None
+
+    def __eq__(self, other):
+        return isinstance(other, Subscriber) and self.id == other.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __repr__(self):
+        return f"Subscriber({self.kind}:{self.discord_id})"
+
+
+class FanoutIndex:
+    """Immutable term -> subscribers map, built alongside the matcher.
+
+    route() turns the terms found in one document into a delivery list, so a
+    single matching pass serves every subscription.
+    """
+
+    __slots__ = ("_by_term",)
+
+    def __init__(self, pairs=()):
+        by_term = {}
+        for term, subscriber in pairs:
+            by_term.setdefault(term, []).append(subscriber)
+        self._by_term = {term: tuple(subs) for term, subs in by_term.items()}
+
+    @property
+    def terms(self) -> tuple:
+        return tuple(self._by_term)
+
+    def subscribers(self, term) -> tuple:
+        return self._by_term.get(term, ())
+
+    def route(self, found_terms) -> dict:
+        """Map each subscriber of any found term to its terms, in found order."""
+        routes = {}
+        for term in found_terms:
+            for subscriber in self._by_term.get(term, ()):
+                routes.setdefault(subscriber, []).append(term)
+        return routes
+
+    def __contains__(self, term):
+        return term in self._by_term
+
+    def __len__(self):
+        return sum(len(subs) for subs in self._by_term.values())
+
+
+class SubscriptionStore(SQLiteStore):
+    """Per-user and per-channel term subscriptions."""
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS subscribers ("
+        " id INTEGER PRIMARY KEY,"
+        " kind TEXT NOT NULL,"
+        " discord_id TEXT NOT NULL,"
+        " webhook_url TEXT,"
+        " UNIQUE (kind, discord_id))",
+        "CREATE TABLE IF NOT EXISTS subscriptions ("
+        " subscriber INTEGER NOT NULL,"
+        " term TEXT NOT NULL,"
+        " PRIMARY KEY (subscriber, term))",
+        "CREATE INDEX IF NOT EXISTS subscriptions_term ON subscriptions(term)",
+    )
+
+    def __init__(self, path=None):
+        super().__init__(path or SUBSCRIPTIONS_PATH)
+
+    def subscribe(self, kind, discord_id, term, webhook_url=None) -> bool:
+        """Subscribe; returns False if the subscription already existed.
+
+        The subscriber's webhook is updated to the latest one given.
+        """
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT INTO subscribers (kind, discord_id, webhook_url) VALUES (?, ?, ?)"
+                " ON CONFLICT (kind, discord_id) DO UPDATE SET"
+                " webhook_url = COALESCE(excluded.webhook_url, webhook_url)",
+                (kind, str(discord_id), webhook_url),
+            )
+            subscriber = db.execute(
+                "SELECT id FROM subscribers WHERE kind = ? AND discord_id = ?", (kind, str(discord_id))
+            ).fetchone()[0]
+            added = db.execute(
+                "INSERT OR IGNORE INTO subscriptions (subscriber, term) VALUES (?, ?)", (subscriber, term)
+            ).rowcount
+            db.commit()
+            return bool(added)
+
+    def unsubscribe(self, kind, discord_id, term) -> bool:
+        with self._lock:
+            db = self._db()
+            removed = db.execute(
+                "DELETE FROM subscriptions WHERE term = ? AND subscriber ="
+                " (SELECT id FROM subscribers WHERE kind = ? AND discord_id = ?)",
+                (term, kind, str(discord_id)),
+            ).rowcount
+            db.commit()
+            return bool(removed)
+
+    def terms_of(self, kind, discord_id) -> list[str]:
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT s.term FROM subscriptions s JOIN subscribers u ON u.id = s.subscriber"
+                " WHERE u.kind = ? AND u.discord_id = ? ORDER BY s.term",
+                (kind, str(discord_id)),
+            ).fetchall()
+        return [term for (term,) in rows]
+
+    def is_subscribed(self, term) -> bool:
+        with self._lock:
+            return self._db().execute(
+                "SELECT 1 FROM subscriptions WHERE term = ? LIMIT 1", (term,)
+            ).fetchone() is not None
+
+    def fanout(self) -> FanoutIndex:
+        """Snapshot of every subscription as a FanoutIndex."""
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT s.term, u.id, u.kind, u.discord_id, u.webhook_url"
+                " FROM subscriptions s JOIN subscribers u ON u.id = s.subscriber"
+                " ORDER BY s.term, u.id"
+            ).fetchall()
+        subscribers = {}
+        pairs = []
+        for term, sub_id, kind, discord_id, webhook_url in rows:
+            if sub_id not in subscribers:
+                subscribers[sub_id] = Subscriber(sub_id, kind, discord_id, webhook_url)
+            pairs.append((term, subscribers[sub_id]))
+        return FanoutIndex(pairs)
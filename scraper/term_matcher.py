@@ -0,0 +1,205 @@
+from collections import deque
+
+from scraper.normalize import TextNormalizer, normalize_term, normalize_text
+
+
+class TermMatcher:
+    """Case-insensitive multi-term matcher, compiled once from a term list.
+
+    Terms are normalized (see scraper.normalize) once, when the matcher is
+    built; documents are normalized in the same single pass that scans them.
+
+    Short term lists are checked with plain substring scans (they run in C and
+    win for a handful of terms). Once the list reaches ``AUTOMATON_MIN_TERMS``
+    an Aho-Corasick automaton is used instead, so a single pass over the text
+    reports every term no matter how many are tracked.
+    """
+
+    # Crossover measured with benchmarks/bench_term_matcher.py
+    AUTOMATON_MIN_TERMS = 160
+
+    def __init__(self, terms=()):
+        self._terms = list(terms)
+
+        # normalized pattern -> indexes of the terms that share it
+        self._patterns = {}
+        for index, term in enumerate(self._terms):
+            pattern = normalize_term(term)
+            if pattern:
+                self._patterns.setdefault(pattern, []).append(index)
+
+        self._longest = max((len(p) for p in self._patterns), default=0)
+        self._delta = None
+        self._outputs = None
+        if len(self._patterns) >= self.AUTOMATON_MIN_TERMS:
+            self._build_automaton()
+
+    def __iter__(self):
+        return iter(self._terms)
+
+    def __len__(self):
+        return len(self._terms)
+
+    def __contains__(self, term):
+        return term in self._terms
+
+    @property
+    def terms(self) -> list[str]:
+        return self._terms.copy()
+
+    @property
+    def uses_automaton(self) -> bool:
+        return self._delta is not None
+
+    def _build_automaton(self):
+        """Build the goto/fail trie and flatten it into a DFA."""
+        goto = [{}]
+        fail = [0]
+        outputs = [()]
+
+        for pattern in self._patterns:
+            state = 0
+            for char in pattern:
+                nxt = goto[state].get(char)
+                if nxt is None:
+                    goto.append({})
+                    fail.append(0)
+                    outputs.append(())
+                    nxt = len(goto) - 1
+                    goto[state][char] = nxt
+                state = nxt
+            outputs[state] = (pattern,)
+
+        # Breadth-first so every fail target is finished before it is copied
+        delta = [None] * len(goto)
+        delta[0] = dict(goto[0])
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in goto[state].items():
+                queue.append(nxt)
+                fail[nxt] = delta[fail[state]].get(char, 0)
+                outputs[nxt] = outputs[nxt] + outputs[fail[nxt]]
+            transitions = dict(delta[fail[state]])
+            transitions.update(goto[state])
+            delta[state] = transitions
+
+        self._delta = delta
+        self._outputs = outputs
+
+    def _terms_for(self, patterns) -> list[str]:
+        """Map matched patterns back to the original terms, in list order."""
+        indexes = sorted(i for p in patterns for i in self._patterns[p])
+        return [self._terms[i] for i in indexes]
+
+    def find_all(self, text) -> list[str]:
+        """Return the terms that appear in text, in term-list order."""
+        if not text or not self._patterns:
+            return []
+        return self.find_normalized(normalize_text(text))
+
+    def find_normalized(self, text) -> list[str]:
+        """Like find_all, for text already passed through normalize_text."""
+        if not text or not self._patterns:
+            return []
+        scan = _Scan(self, normalized=True)
+        scan.feed(text)
+        return scan.found()
+
+    def scanner(self, normalized=False):
+        """Return a scanner that matches text fed to it in chunks.
+
+        With normalized=True the chunks must be consecutive pieces of
+        normalized text (e.g. the output of a TextNormalizer).
+        """
+        return _Scan(self, normalized)
+
+
+class _Scan:
+    """Incremental scan state for one document."""
+
+    __slots__ = ("_matcher", "_normalizer", "_state", "_tail", "_remaining", "_hits")
+
+    def __init__(self, matcher, normalized=False):
+        self._matcher = matcher
+        self._normalizer = None if normalized else TextNormalizer()
+        self._state = 0
+        self._tail = ""
+        self._remaining = set(matcher._patterns)
+        self._hits = set()
+
+    @property
+    def done(self) -> bool:
+        """True once every pattern has been seen; further input is pointless."""
+        return not self._remaining
+
+    def feed(self, chunk) -> bool:
+        """Scan the next chunk of text. Returns ``done``."""
+        if not chunk or not self._remaining:
+            return self.done
+        if self._normalizer is None:
+            self._scan(chunk)
+            return self.done
+        self._scan(self._normalizer.feed(chunk))
+        if self._remaining:
+            # Text held back by the normalizer still counts for early exit
+            self._peek(self._normalizer.preview())
+        return self.done
+
+    def _peek(self, text):
+        """Record hits in text that continues the scanned text, without
+        advancing the scan state."""
+        if not text:
+            return
+        remaining = self._remaining
+        if self._matcher._delta is None:
+            window = self._tail + text
+            hits = [p for p in remaining if p in window]
+        else:
+            delta = self._matcher._delta
+            outputs = self._matcher._outputs
+            state = self._state
+            hits = set()
+            for char in text:
+                state = delta[state].get(char, 0)
+                hits.update(outputs[state])
+            hits &= remaining
+        remaining.difference_update(hits)
+        self._hits.update(hits)
+
+    def _scan(self, low):
+        if not low:
+            return
+        if self._matcher._delta is None:
+            self._feed_substrings(low)
+        else:
+            self._feed_automaton(low)
+
+    def _feed_substrings(self, low):
+        # Keep enough of the previous chunk to catch terms split across chunks
+        window = self._tail + low
+        hits = [p for p in self._remaining if p in window]
+        self._remaining.difference_update(hits)
+        self._hits.update(hits)
+        keep = self._matcher._longest - 1
+        self._tail = window[-keep:] if keep > 0 else ""
+
+    def _feed_automaton(self, low):
+        delta = self._matcher._delta
+        outputs = self._matcher._outputs
+        remaining = self._remaining
+        hits = self._hits
+        state = self._state
+        for char in low:
+            state = delta[state].get(char, 0)
+            if outputs[state]:
+                hits.update(outputs[state])
+                remaining.difference_update(outputs[state])
+                if not remaining:
+                    break
+        self._state = state
+
+    def found(self) -> list[str]:
+        if self._normalizer is not None and self._remaining:
+            self._scan(self._normalizer.finish())
+        return self._matcher._terms_for(self._hits)
@@ -1,28 +1,189 @@
-from urllib.request import urlopen
+from contextlib import ExitStack, closing
+
 from lxml import etree
 from loguru import logger
 
+from config.settings import DOC_CACHE_MAX_BYTES, XML_STREAMING
+from scraper.document_cache import DocumentCache
+from scraper.fetcher import DocumentFetcher
+from scraper.metrics import metrics
+from scraper.normalize import TextNormalizer
+from scraper.query import compile_terms
+
+
+# Inline markup (Federal Register emphasis, superscripts, HTML formatting)
+# can sit inside a word; every other element boundary separates text.
+INLINE_TAGS = frozenset({"E", "SU", "FR", "a", "b", "i", "u", "em", "strong", "span", "sub", "sup"})
+
+
+class _TextTarget:
+    """lxml parser target that keeps character data and drops everything else.
+
+    No tree is built, so memory stays bounded by the read chunk size no
+    matter how large the document is. Tag names and attributes never reach
+    the matcher. A space marks the start and end of each block element, so
+    text in adjacent paragraphs does not run together.
+    """
 
-class XMLContentParser:
     def __init__(self):
-        pass
+        self.pending = []
+
+    def start(self, tag, attrib):
+        self._boundary(tag)
+
+    def end(self, tag):
+        self._boundary(tag)
+
+    def _boundary(self, tag):
+        if tag.rpartition("}")[2] not in INLINE_TAGS:
+            self.pending.append(" ")
+
+    def data(self, text):
+        self.pending.append(text)
+
+    def close(self):
+        return None
+
+    def take(self):
+        text = "".join(self.pending)
+        self.pending.clear()
+        return text
+
+
+def text_from_bytes(body) -> str:
+    """Character data of a whole XML document held in memory."""
+    target = _TextTarget()
+    parser = etree.XMLParser(target=target, resolve_entities=False)
+    parser.feed(body)
+    parser.close()
+    return target.take()
+
+
+class XMLContentParser:
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, streaming=None, fetcher=None):
+        self.streaming = XML_STREAMING if streaming is None else streaming
+        if fetcher is None:
+            fetcher = DocumentFetcher(cache=DocumentCache() if DOC_CACHE_MAX_BYTES else None)
+        self.fetcher = fetcher
 
     def fetch_and_parse_xml(self, xml_url):
         """Fetch XML content from URL and return as string"""
         try:
-            with urlopen(xml_url) as resp:
-                tree = etree.parse(resp)
-            root = tree.getroot()
-            return etree.tostring(root, encoding="unicode")
+            with metrics.timer("fetch"):
+                body = self.fetcher.get(xml_url)
+            with metrics.timer("parse"):
+                root = etree.fromstring(body)
+                return etree.tostring(root, encoding="unicode")
         except Exception as e:
             logger.error(f"Failed to parse XML from {xml_url}: {e}")
             return ""
 
     def search_xml_content(self, xml_content, search_terms):
-        """Search for terms in XML content and return found terms."""
-        xml_low = (xml_content or "").lower()
-        found_terms = []
-        for term in search_terms:
-            if term.lower() in xml_low:
-                found_terms.append(term)
-        return found_terms
+        """Search for terms in XML content and return found terms.
+
+        search_terms may be a plain list (terms may use the query syntax of
+        scraper.query) or a prebuilt matcher.
+        """
+        if not hasattr(search_terms, "find_all"):
+            search_terms = compile_terms(search_terms)
+        with metrics.timer("match"):
+            return search_terms.find_all(xml_content)
+
+    def search_xml_url(self, xml_url, search_terms):
+        """Fetch the document at xml_url and return the terms found in it.
+
+        Returns None when the document could not be fetched or parsed.
+        """
+        if not hasattr(search_terms, "find_all"):
+            search_terms = compile_terms(search_terms)
+        if not self.streaming:
+            xml_content = self.fetch_and_parse_xml(xml_url)
+            if not xml_content:
+                return None
+            return self.search_xml_content(xml_content, search_terms)
+        return self.stream_search(xml_url, search_terms)
+
+    def _iter_text(self, xml_url):
+        """Yield the document's character data, one piece per network chunk.
+
+        Time spent waiting for the network and inside lxml is recorded as
+        the document's fetch and parse stages.
+        """
+        target = _TextTarget()
+        parser = etree.XMLParser(target=target, resolve_entities=False)
+        watch = metrics.stopwatch()
+        try:
+            with ExitStack() as stack:
+                with watch("fetch"):
+                    resp = stack.enter_context(self.fetcher.open(xml_url))
+                try:
+                    for chunk in watch.iterate("fetch", resp.iter_content(self.CHUNK_SIZE)):
+                        with watch("parse"):
+                            parser.feed(chunk)
+                        yield target.take()
+                    with watch("parse"):
+                        parser.close()
+                    yield target.take()
+                except GeneratorExit:
+                    # Caller stopped early; leave the response to finish normally
+                    # so the fetcher can still cache it.
+                    pass
+        finally:
+            watch.record()
+
+    def stream_search(self, xml_url, matcher):
+        """Parse the response incrementally, matching text and tail content only.
+
+        Reading stops as soon as every tracked term has been found.
+        """
+        return self._stream(xml_url, matcher, keep_text=False)[0]
+
+    def stream_search_text(self, xml_url, matcher):
+        """Like stream_search, but also return the document's normalized text.
+
+        Each piece is normalized once as it arrives and goes both to the
+        matcher and into the returned text, so indexing a document costs no
+        second pass over it. The whole document is read. Returns
+        (found_terms, text), or (None, None) on failure.
+        """
+        return self._stream(xml_url, matcher, keep_text=True)
+
+    def _stream(self, xml_url, matcher, keep_text):
+        normalizer = TextNormalizer() if keep_text else None
+        scan = matcher.scanner(normalized=keep_text)
+        if scan.done and not keep_text:
+            return [], None
+        kept = []
+        watch = metrics.stopwatch()
+        try:
+            with closing(self._iter_text(xml_url)) as pieces:
+                for text in pieces:
+                    with watch("match"):
+                        if normalizer is not None:
+                            text = normalizer.feed(text)
+                            kept.append(text)
+                        done = scan.feed(text)
+                    if done and normalizer is None:
+                        break
+            with watch("match"):
+                if normalizer is None:
+                    return scan.found(), None
+                kept.append(normalizer.finish())
+                scan.feed(kept[-1])
+                return scan.found(), "".join(kept)
+        except Exception as e:
+            logger.error(f"Failed to parse XML from {xml_url}: {e}")
+            return None, None
+        finally:
+            watch.record()
+
+    def extract_text(self, xml_url):
+        """Return all character data of the document, or None on failure."""
+        try:
+            with closing(self._iter_text(xml_url)) as pieces:
+                return "".join(pieces)
+        except Exception as e:
+            logger.error(f"Failed to parse XML from {xml_url}: {e}")
+            return None
@@ -1,39 +1,137 @@
-import json, threading
+import json, os, threading
 from pathlib import Path
 
+
+class TermSnapshot:
+    """Immutable, versioned view of the term set. Safe to share between threads."""
+
+    __slots__ = ("version", "terms", "_set")
+
+    def __init__(self, version: int, terms):
+        object.__setattr__(self, "version", version)
+        object.__setattr__(self, "terms", tuple(sorted(set(terms))))
+        object.__setattr__(self, "_set", frozenset(self.terms))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("TermSnapshot is immutable")
+
+    def __contains__(self, term):
+        return term in self._set
+
+    def __iter__(self):
+        return iter(self.terms)
+
+    def __len__(self):
+        return len(self.terms)
+
+
 class StoreTerms:
+    """Term set kept in memory, persisted as a JSON snapshot plus a journal.
+
+    Edits append one JSON line per change to ``<path>.journal`` instead of
+    rewriting the whole file. The journal is folded back into the snapshot
+    file once it holds more entries than the snapshot has terms, so the
+    cost of rewrites stays proportional to the edits. Readers take
+    ``snapshot()``, which never changes once handed out.
+    """
+
     def __init__(self, path):
         self.path = Path(path)
         self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.journal_path = self.path.with_suffix(self.path.suffix + ".journal")
         self._lock = threading.RLock()   # ← reentrant
-        if not self.path.exists():
-            self._write([])
+        self._journal_entries = 0
+        terms = self._read_snapshot()
+        replayed = self._replay(terms)
+        self._snapshot = TermSnapshot(0, terms)
+        self._compacted_size = len(terms)
+        if replayed or not self.path.exists():
+            self.compact()
 
-    def load(self) -> list[str]:
-        with self._lock:
+    def _read_snapshot(self) -> set:
+        try:
+            return set(json.loads(self.path.read_text(encoding="utf-8")))
+        except FileNotFoundError:
+            return set()
+        except Exception as e:
+            print(f"[StoreTerms] load failed ({e}); returning []")
+            return set()
+
+    def _replay(self, terms: set) -> int:
+        """Apply journal entries to terms; returns how many were read."""
+        try:
+            data = self.journal_path.read_bytes()
+        except FileNotFoundError:
+            return 0
+        if data and not data.endswith(b"\n"):
+            # Torn final line from a crash mid-append: cut it off, or the next
+            # append would be joined onto it and lost along with it
+            data = data[:data.rfind(b"\n") + 1]
+            with open(self.journal_path, "r+b") as journal:
+                journal.truncate(len(data))
+        count = 0
+        for line in data.decode("utf-8", errors="replace").splitlines():
             try:
-                return json.loads(self.path.read_text(encoding="utf-8"))
-            except FileNotFoundError:
-                return []
-            except Exception as e:
-                print(f"[StoreTerms] load failed ({e}); returning []")
-                return []
-
-    def _write(self, terms: list[str]) -> None:
+                op, term = json.loads(line)
+            except ValueError:
+                continue  # unreadable entry
+            (terms.add if op == "+" else terms.discard)(term)
+            count += 1
+        return count
+
+    def snapshot(self) -> TermSnapshot:
+        """Current immutable term set; reading it takes no lock."""
+        return self._snapshot
+
+    def load(self) -> list[str]:
+        return list(self._snapshot.terms)
+
+    def _write(self, terms) -> None:
         tmp = self.path.with_suffix(self.path.suffix + ".tmp")
         tmp.write_text(json.dumps(sorted(set(terms)), ensure_ascii=False, indent=2), encoding="utf-8")
         tmp.replace(self.path)
 
-    def add(self, term: str) -> list[str]:
+    def compact(self) -> None:
+        """Write the current terms as the snapshot file and clear the journal."""
         with self._lock:
-            terms = self.load()
-            if term not in terms:
-                terms.append(term)
-                self._write(terms)
-            return terms
+            terms = self._snapshot.terms
+            self._write(terms)
+            self.journal_path.unlink(missing_ok=True)
+            self._journal_entries = 0
+            self._compacted_size = len(terms)
 
-    def remove(self, term: str) -> list[str]:
+    def update(self, add=(), remove=()) -> list[str]:
+        """Apply a batch of edits with one journal append; returns the terms."""
         with self._lock:
-            terms = [t for t in self.load() if t != term]
-            self._write(terms)
-            return terms
+            terms = set(self._snapshot.terms)
+            changes = []
+            for term in remove:
+                if term in terms:
+                    terms.discard(term)
+                    changes.append(("-", term))
+            for term in add:
+                if term not in terms:
+                    terms.add(term)
+                    changes.append(("+", term))
+            if not changes:
+                return self.load()
+
+            with open(self.journal_path, "a", encoding="utf-8") as journal:
+                journal.write("".join(json.dumps(c, ensure_ascii=False) + "\n" for c in changes))
+                journal.flush()
+                os.fsync(journal.fileno())
+            self._journal_entries += len(changes)
+            self._snapshot = TermSnapshot(self._snapshot.version + 1, terms)
+
+            if self._journal_entries > self._compacted_size:
+                self.compact()
+            return self.load()
+
+    def add(self, term: str) -> list[str]:
+        return self.update(add=[term])
+
+    def add_many(self, terms) -> list[str]:
+        return self.update(add=terms)
+
+    def remove(self, term: str) -> list[str]:
+        return self.update(remove=[term])
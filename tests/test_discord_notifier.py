@@ -21,10 +21,92 @@ def test_send_notification(monkeypatch):
     monkeypatch.setattr('scraper.discord_notifier.DiscordWebhook', WebhookStub)
 
     from scraper.discord_notifier import DiscordNotifier
-    notifier = DiscordNotifier('hook')
+    notifier = DiscordNotifier('hook', background=False)
     notifier.send_notification(['alpha'], 'http://example.com', '123')
 
     assert captured['url'] == 'hook'
     assert 'alpha' in captured['content']
     assert 'http://example.com' in captured['content']
 
+
+class Response:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def json(self):
+        return {}
+
+
+class SessionStub:
+    def __init__(self, responses=()):
+        self.responses = list(responses)
+        self.posts = []
+
+    def post(self, url, json, timeout):
+        self.posts.append((url, json))
+        return self.responses.pop(0) if self.responses else Response(204)
+
+
+def test_queue_coalesces_matches_into_embeds():
+    from scraper.discord_notifier import DiscordNotifier
+    notifier = DiscordNotifier('hook', background=True, linger=0.5)
+    notifier.session = SessionStub()
+
+    for i in range(12):
+        notifier.send_notification(['alpha'], f'http://example.com/{i}', str(i))
+    assert notifier.flush(timeout=5)
+
+    assert [len(payload['embeds']) for _, payload in notifier.session.posts] == [10, 2]
+    first = notifier.session.posts[0][1]['embeds'][0]
+    assert first['url'] == 'http://example.com/0'
+    assert 'alpha' in first['title']
+    assert notifier.pending == 0
+
+
+def test_messages_stay_under_discords_embed_text_limit():
+    from scraper.discord_notifier import DiscordNotifier
+    notifier = DiscordNotifier('hook', background=True, linger=0.5)
+    notifier.session = SessionStub()
+
+    terms = [f'term number {n}' for n in range(60)]
+    for i in range(10):
+        notifier.send_notification(terms, f'http://example.com/{i}', str(i))
+    assert notifier.flush(timeout=5)
+
+    posts = [payload for _, payload in notifier.session.posts]
+    assert sum(len(payload['embeds']) for payload in posts) == 10
+    assert len(posts) > 1
+    for payload in posts:
+        assert sum(len(e['title']) + len(e['description']) for e in payload['embeds']) <= 6000
+
+
+def test_queue_honors_retry_after(monkeypatch):
+    from scraper.discord_notifier import DiscordNotifier
+    sleeps = []
+    monkeypatch.setattr('scraper.discord_notifier.time.sleep', sleeps.append)
+    notifier = DiscordNotifier('hook', background=True, linger=0)
+    notifier.session = SessionStub([Response(429, {'Retry-After': '1.5'}), Response(204)])
+
+    assert notifier._deliver([(['alpha'], 'http://example.com', '1')]) is True
+    assert sleeps == [1.5]
+    assert len(notifier.session.posts) == 2
+
+
+
+def test_queue_routes_matches_per_webhook():
+    from scraper.discord_notifier import DiscordNotifier
+    notifier = DiscordNotifier('http://default', background=True, linger=0.2)
+    notifier.session = SessionStub()
+
+    notifier.send_notification(['alpha'], 'http://example.com/1', '1')
+    notifier.send_notification(['beta'], 'http://example.com/2', '2', webhook_url='http://team', mention='<@5>')
+    notifier.send_notification(['beta'], 'http://example.com/3', '3', webhook_url='http://team', mention='<@5>')
+    assert notifier.flush(timeout=5)
+
+    by_url = dict(notifier.session.posts)
+    assert sorted(by_url) == ['http://default', 'http://team']
+    assert len(by_url['http://team']['embeds']) == 2
+    assert by_url['http://team']['content'].startswith('<@5> 2 new matches')
+    assert by_url['http://team']['allowed_mentions'] == {'users': ['5']}
+    assert 'allowed_mentions' not in by_url['http://default']
@@ -0,0 +1,43 @@
+import zlib
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from scraper.document_cache import DocumentCache, iter_decompressed
+
+
+def test_store_and_lookup(tmp_path):
+    cache = DocumentCache(tmp_path / "c.sqlite3", max_bytes=1000, fresh_seconds=60)
+    assert cache.lookup("http://a") is None
+
+    cache.store("http://a", zlib.compress(b"alpha"), etag='"1"', last_modified="Mon")
+    entry = cache.lookup("http://a")
+    assert entry.validators() == {"If-None-Match": '"1"', "If-Modified-Since": "Mon"}
+    assert cache.is_fresh(entry)
+    assert zlib.decompress(cache.body("http://a")) == b"alpha"
+
+
+def test_evicts_least_recently_used(tmp_path, monkeypatch):
+    clock = iter(range(100))
+    monkeypatch.setattr("scraper.document_cache.time.time", lambda: next(clock))
+    cache = DocumentCache(tmp_path / "c.sqlite3", max_bytes=25)
+
+    cache.store("a", b"x" * 10)
+    cache.store("b", b"x" * 10)
+    cache.body("a")              # a is now more recent than b
+    cache.store("c", b"x" * 10)  # over budget: b goes
+
+    assert cache.lookup("b") is None
+    assert cache.lookup("a") and cache.lookup("c")
+    assert cache.size() == 20
+
+    cache.store("huge", b"x" * 26)  # larger than the whole budget
+    assert cache.lookup("huge") is None
+
+
+def test_iter_decompressed_round_trips():
+    body = b"<root>" + b"text " * 1000 + b"</root>"
+    chunks = list(iter_decompressed(zlib.compress(body), 16))
+    assert len(chunks) > 1
+    assert b"".join(chunks) == body
@@ -0,0 +1,116 @@
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from scraper.document_index import DocumentIndex
+
+
+def test_search_is_case_insensitive_substring(tmp_path):
+    index = DocumentIndex(tmp_path / "i.sqlite3")
+    index.add("1", "http://a", 2, "The Deep Sea Mining rule")
+    index.add(2, "http://b", 3, "Undermining 10% of EU filings")
+
+    assert index.search(["deep sea", "MINING", "eu", "10%", "zzz"]) == [
+        {"id": "1", "url": "http://a", "terms": ["deep sea", "MINING"]},
+        {"id": "2", "url": "http://b", "terms": ["MINING", "eu", "10%"]},
+    ]
+    assert index.search(["mining"], feed_ids={3}) == [
+        {"id": "2", "url": "http://b", "terms": ["mining"]},
+    ]
+
+
+def test_reindex_replaces_text(tmp_path):
+    index = DocumentIndex(tmp_path / "i.sqlite3")
+    index.add("1", "http://a", 2, "alpha")
+    index.add("1", "http://a2", 2, "beta")
+
+    assert len(index) == 1
+    assert "1" in index
+    assert index.search(["alpha"]) == []
+    assert index.search(["beta"]) == [{"id": "1", "url": "http://a2", "terms": ["beta"]}]
+
+
+def test_oldest_documents_are_pruned_past_max_documents(tmp_path):
+    index = DocumentIndex(tmp_path / "i.sqlite3", max_documents=3)
+    index.PRUNE_EVERY = 1
+    index.register_terms(["alpha"])
+    for n in range(5):
+        index.add(str(n), f"http://{n}", 1, f"alpha {n}", ["alpha"])
+
+    assert len(index) == 3
+    assert "0" not in index and "1" not in index
+    assert [r["id"] for r in index.search(["alpha"])] == ["2", "3", "4"]
+    assert [r["id"] for r in index.matches(["alpha"])] == ["2", "3", "4"]
+    assert index.prune() == 0
+
+
+def test_catch_up_checks_only_new_terms(tmp_path):
+    index = DocumentIndex(tmp_path / "i.sqlite3")
+    checked = index.register_terms(["alpha", "beta"])
+    index.add("1", "http://a", 2, "alpha gamma", ["alpha"], checked)
+    index.add("2", "http://b", 2, "beta gamma", ["beta"], checked)
+
+    assert index.catch_up(["alpha", "beta"]) == 0
+    assert index.matches(["beta", "alpha"]) == [
+        {"id": "1", "url": "http://a", "terms": ["alpha"]},
+        {"id": "2", "url": "http://b", "terms": ["beta"]},
+    ]
+
+    # one new term -> one pass, then nothing left to do
+    assert index.catch_up(["alpha", "beta", "gamma"]) == 1
+    assert index.catch_up(["alpha", "beta", "gamma"]) == 0
+    assert index.matches(["gamma"]) == [
+        {"id": "1", "url": "http://a", "terms": ["gamma"]},
+        {"id": "2", "url": "http://b", "terms": ["gamma"]},
+    ]
+
+    # removal needs no rescan
+    index.forget_term("alpha")
+    assert index.catch_up(["beta", "gamma"]) == 0
+    assert index.matches(["alpha"]) == []
+
+
+def test_checked_through_ignores_terms_outside_the_set(tmp_path):
+    index = DocumentIndex(tmp_path / "i.sqlite3")
+    index.register_terms(["alpha"])
+    index.register_terms(["beta"])  # added elsewhere in the meantime
+    checked = index.register_terms(["alpha", "gamma"])
+    index.add("1", "http://a", 2, "alpha beta gamma", ["alpha", "gamma"], checked)
+
+    # beta was never checked against document 1, so catch_up must do it
+    assert index.catch_up(["alpha", "beta", "gamma"]) >= 1
+    assert index.matches(["alpha", "beta", "gamma"]) == [
+        {"id": "1", "url": "http://a", "terms": ["alpha", "beta", "gamma"]},
+    ]
+
+
+def test_removed_term_does_not_hold_back_later_terms(tmp_path):
+    index = DocumentIndex(tmp_path / "i.sqlite3")
+    index.add("1", "http://a", 2, "alpha beta gamma", ["alpha", "beta"], index.register_terms(["alpha", "beta"]))
+    index.forget_term("beta")
+    index.register_terms(["alpha", "beta"])  # a cycle still running on the old terms
+
+    assert index.catch_up(["alpha", "gamma"]) == 1
+    assert index.catch_up(["alpha", "gamma"]) == 0
+    assert index.matches(["alpha", "beta", "gamma"]) == [
+        {"id": "1", "url": "http://a", "terms": ["alpha", "gamma"]},
+    ]
+    checked = index.register_terms(["alpha", "gamma"])
+    index.add("2", "http://b", 2, "gamma", ["gamma"], checked)
+    assert index.catch_up(["alpha", "gamma"]) == 0
+
+
+def test_query_terms_are_answered_from_the_index(tmp_path):
+    index = DocumentIndex(tmp_path / "index.sqlite3")
+    index.add("1", "http://x/1", 2, "Deep sea mining permit approved")
+    index.add("2", "http://x/2", 2, "Undermining the permit process")
+    index.add("3", "http://x/3", 2, "Deep sea research, no mining")
+
+    query = 'q:"mining" AND "permit"'
+    assert [r["id"] for r in index.search([query])] == ["1"]
+    assert [r["id"] for r in index.search(['q:"mining" AND NOT "permit"'])] == ["3"]
+    assert [r["id"] for r in index.search(['q:"deep sea" NEAR/1 "permit"'])] == ["1"]
+
+    index.catch_up([query])
+    assert [m["id"] for m in index.matches([query])] == ["1"]
@@ -0,0 +1,90 @@
+from pathlib import Path
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from scraper.feed_handlers import (
+    BodyHandler, FeedPipeline, HandlerRegistry, LinkedDocumentHandler, TitleHandler,
+)
+from scraper.feed_item import FeedItem
+from scraper.term_matcher import TermMatcher
+
+
+class SearcherStub:
+    def _find_terms_in_text(self, text, matcher):
+        return matcher.find_all(text)
+
+    def _search_document(self, xml_url, matcher):
+        return matcher.find_all("alpha in the document"), "alpha in the document"
+
+
+def test_registry_from_spec():
+    registry = HandlerRegistry.from_spec("2:linked, 3:title,7:body:3")
+    assert registry.feed_ids() == (2, 3, 7)
+    assert isinstance(registry.get(2), LinkedDocumentHandler)
+    assert isinstance(registry.get(3), TitleHandler)
+    assert isinstance(registry.get(7), BodyHandler)
+    assert registry.get(7).workers == 3
+    assert 9 not in registry
+
+    registry.unregister(3)
+    assert registry.feed_ids() == (2, 7)
+
+    with pytest.raises(ValueError):
+        HandlerRegistry.from_spec("2:unknown")
+
+
+def test_handlers_match_their_field():
+    matcher = TermMatcher(["alpha"])
+    searcher = SearcherStub()
+    item = FeedItem("1", 7, url="http://x/1", title="nothing",
+                    xml_url="http://x/1.xml", body="<p>Alpha &amp; omega</p>")
+
+    assert TitleHandler(3).match(searcher, item, matcher)[0] == []
+    found, url, text = BodyHandler(7).match(searcher, item, matcher)
+    assert found == ["alpha"] and url == "http://x/1" and "alpha & omega" in text
+    assert LinkedDocumentHandler(2).match(searcher, item, matcher)[:2] == (["alpha"], "http://x/1.xml")
+
+    with pytest.raises(ValueError):
+        LinkedDocumentHandler(2).match(searcher, FeedItem("2", 2), matcher)
+
+
+def test_pipeline_bounds_in_flight_items_without_blocking_submit():
+    release = threading.Event()
+    started = []
+    pipeline = FeedPipeline(TitleHandler(3), backlog_factor=2)
+
+    def job(n):
+        started.append(n)
+        return release.wait(5)
+
+    futures = [pipeline.submit(job, n) for n in range(4)]  # returns at once
+    time.sleep(0.1)
+    assert started == [0] and pipeline.backlog == 2  # one running, one queued in the pool
+
+    release.set()
+    assert all(f.result(2) for f in futures)
+    assert sorted(started) == [0, 1, 2, 3] and pipeline.backlog == 0
+    pipeline.shutdown()
+
+
+def test_pipeline_max_waiting_blocks_submit():
+    release = threading.Event()
+    pipeline = FeedPipeline(TitleHandler(3, workers=1), backlog_factor=1, max_waiting=2)
+    futures = [pipeline.submit(release.wait, 5) for _ in range(3)]  # one running, two queued
+    assert pipeline.backlog == 2
+
+    blocked = threading.Thread(target=lambda: futures.append(pipeline.submit(release.wait, 5)), daemon=True)
+    blocked.start()
+    blocked.join(0.1)
+    assert blocked.is_alive()  # the queue is full
+
+    release.set()
+    blocked.join(2)
+    assert not blocked.is_alive()
+    assert all(f.result(2) for f in futures) and len(futures) == 4
+    pipeline.shutdown()
@@ -0,0 +1,123 @@
+import gzip
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import pytest
+import requests
+
+from scraper.document_cache import DocumentCache
+from scraper.fetcher import DocumentFetcher
+
+BODY = b"<root><p>Deep Sea Mining</p></root>"
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    hits = {}
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.hits[self.path] = cls.hits.get(self.path, 0) + 1
+            cls.active += 1
+            cls.peak = max(cls.peak, cls.active)
+        try:
+            if self.path == "/flaky" and cls.hits[self.path] == 1:
+                self.send_response(503)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            if self.path == "/etag" and self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            if self.path == "/slow":
+                time.sleep(0.05)
+            body = BODY
+            self.send_response(200)
+            if self.path == "/etag":
+                self.send_header("ETag", '"v1"')
+            if "gzip" in self.headers.get("Accept-Encoding", ""):
+                body = gzip.compress(BODY)
+                self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    Handler.hits = {}
+    Handler.peak = 0
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_get_decodes_gzip_and_retries(server):
+    fetcher = DocumentFetcher(retries=2, backoff=0)
+    assert fetcher.get(server + "/doc") == BODY
+    assert fetcher.get(server + "/flaky") == BODY
+    assert Handler.hits["/flaky"] == 2
+
+
+def test_open_raises_for_http_errors(server):
+    fetcher = DocumentFetcher(retries=0)
+    with pytest.raises(requests.HTTPError):
+        fetcher.get(server + "/flaky")
+
+
+def test_per_host_limit(server):
+    fetcher = DocumentFetcher(per_host=2)
+    threads = [threading.Thread(target=fetcher.get, args=(server + "/slow",)) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert Handler.hits["/slow"] == 6
+    assert Handler.peak <= 2
+
+
+def test_cache_revalidates_with_etag(server, tmp_path):
+    cache = DocumentCache(tmp_path / "cache.sqlite3", max_bytes=1 << 20, fresh_seconds=0)
+    fetcher = DocumentFetcher(cache=cache)
+
+    assert fetcher.get(server + "/etag") == BODY
+    assert fetcher.get(server + "/etag") == BODY
+    assert Handler.hits["/etag"] == 2
+    assert fetcher.stats == {"hits": 0, "revalidated": 1, "misses": 1}
+
+    # a restart keeps the cache
+    fetcher = DocumentFetcher(cache=DocumentCache(tmp_path / "cache.sqlite3", fresh_seconds=0))
+    with fetcher.open(server + "/etag") as resp:
+        assert resp.from_cache
+
+
+def test_fresh_cache_entry_skips_network(server, tmp_path):
+    cache = DocumentCache(tmp_path / "cache.sqlite3", max_bytes=1 << 20, fresh_seconds=3600)
+    fetcher = DocumentFetcher(cache=cache)
+
+    # stop reading early; the rest of the body is still cached
+    with fetcher.open(server + "/doc") as resp:
+        next(resp.iter_content(4))
+    assert fetcher.get(server + "/doc") == BODY
+    assert Handler.hits["/doc"] == 1
+    assert fetcher.stats["hits"] == 1
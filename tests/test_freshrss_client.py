@@ -0,0 +1,200 @@
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from scraper.freshrss_client import FreshRSSManager, ReadBatch
+
+FETCHED_AT = 1_700_000_000
+
+
+class ManagerStub:
+    def __init__(self, failing=()):
+        self.pending_marks = {}
+        self.unread_fetched_at = FETCHED_AT + 0.5
+        self.failing = set(failing)
+        self.item_calls = []
+        self.feed_calls = []
+
+    def mark_as_read(self, item_id):
+        self.item_calls.append(item_id)
+        return item_id not in self.failing
+
+    def mark_feed_read_before(self, feed_id, before):
+        self.feed_calls.append((feed_id, before))
+        return True
+
+
+def old_id(n):
+    return str((FETCHED_AT - 100) * 1_000_000 + n)
+
+
+def test_fully_handled_feed_uses_one_before_call():
+    manager = ManagerStub()
+    batch = ReadBatch(manager, batch_size=100, concurrency=2, feed_before=True)
+    late = str(FETCHED_AT * 1_000_000 + 1)  # added after the whole second we fetched in
+    for item_id in [old_id(1), old_id(2), late]:
+        batch.seen(item_id, 2)
+        batch.add(item_id, 2)
+
+    report = batch.flush(final=True)
+    assert manager.feed_calls == [(2, FETCHED_AT)]
+    assert manager.item_calls == [late]
+    assert sorted(report.marked) == sorted([old_id(1), old_id(2), late])
+    assert report.calls == 2
+
+
+def test_feed_with_unhandled_items_is_marked_per_item():
+    manager = ManagerStub()
+    batch = ReadBatch(manager, batch_size=100, concurrency=2, feed_before=True)
+    batch.seen(old_id(1), 2)
+    batch.seen(old_id(2), 2)  # e.g. its XML fetch failed
+    batch.add(old_id(1), 2)
+
+    batch.flush(final=True)
+    assert manager.feed_calls == []
+    assert manager.item_calls == [old_id(1)]
+
+
+def test_threshold_flush_and_failed_marks_are_retried():
+    manager = ManagerStub(failing={old_id(2)})
+    batch = ReadBatch(manager, batch_size=2, concurrency=2, feed_before=False)
+    batch.add(old_id(1), 3)
+    assert manager.item_calls == []
+    batch.add(old_id(2), 3)  # hits the threshold
+    assert sorted(manager.item_calls) == [old_id(1), old_id(2)]
+
+    report = batch.flush(final=True)
+    assert report.failed == [old_id(2)]
+    assert manager.pending_marks == {old_id(2): 3}
+
+    # next cycle starts with the failed id queued
+    manager.failing.clear()
+    retry = ReadBatch(manager, batch_size=100, feed_before=False)
+    assert retry.is_pending(old_id(2))
+    assert retry.flush(final=True).marked == [old_id(2)]
+    assert manager.pending_marks == {}
+
+
+class ClientStub:
+    """Fever client serving `total` items, 50 per page."""
+
+    def __init__(self, total, fail_after=None):
+        self.ids = list(range(1, total + 1))
+        self.calls = []
+        self.fail_after = fail_after
+
+    def _call(self, endpoint, since_id):
+        self.calls.append(int(since_id))
+        if self.fail_after is not None and len(self.calls) > self.fail_after:
+            raise RuntimeError("boom")
+        page = [i for i in self.ids if i > int(since_id)][:50]
+        return {"items": [{"id": i} for i in reversed(page)]}
+
+    def _dict_to_item(self, d):
+        return type("Item", (), {"id": d["id"], "feed_id": 2, "url": None, "title": None})()
+
+
+def make_manager(client):
+    manager = FreshRSSManager.__new__(FreshRSSManager)
+    manager.client = client
+    manager.history_complete = False
+    manager._item_feeds = {}
+    return manager
+
+
+def test_get_all_items_pages_lazily():
+    client = ClientStub(120)
+    manager = make_manager(client)
+    items = manager.get_all_items()
+
+    first = next(items)
+    assert first.id == 1
+    assert client.calls == [0]  # only the first page fetched so far
+
+    assert [i.id for i in items] == list(range(2, 121))
+    assert client.calls == [0, 50, 100, 120]
+    assert manager.history_complete
+
+
+def test_get_all_items_stops_on_error():
+    manager = make_manager(ClientStub(120, fail_after=1))
+    assert len(list(manager.get_all_items())) == 50
+    assert not manager.history_complete
+
+
+def test_normalize_reads_structured_fields():
+    from freshrss_api import Item
+
+    item = Item(
+        id=42, feed_id=2, title="Deep Sea Mining", author="", url="https://fr.gov/d/1",
+        html='<p>Summary</p><br>\n <a href="https://fr.gov/xml/1.xml?a=1&amp;b=2">XML</a>',
+        is_saved=False, is_read=False, created_on_time=1700000000,
+    )
+    record = FreshRSSManager.normalize(item)
+    assert (record.id, record.feed_id, record.title, record.published) == (42, 2, "Deep Sea Mining", 1700000000)
+    assert record.xml_url == "https://fr.gov/xml/1.xml?a=1&b=2"
+    assert FreshRSSManager.normalize(record) is record
+
+    # matches what the old repr-splitting produced for the same item
+    legacy = str(item).split(r'<br>\n <a href="')[1].split('">XML</a>')[0]
+    assert legacy.replace("&amp;", "&") == record.xml_url
+    assert FreshRSSManager.extract_item_id(None, record) == str(item).split("id=")[1].split(",")[0]
+
+
+class FeverStub:
+    """Fever client with unread items spread over feeds; optionally honours feed_ids."""
+
+    def __init__(self, feeds, filters=False):
+        self.feeds = dict(feeds)  # item id -> feed id
+        self.filters = filters
+        self.batches = []
+
+    def _call(self, endpoint, with_ids=None, feed_ids=None):
+        if endpoint == "unread_item_ids":
+            return {"unread_item_ids": ",".join(map(str, self.feeds))}
+        ids = [int(i) for i in with_ids.split(",")]
+        self.batches.append(ids)
+        allowed = {int(f) for f in feed_ids.split(",")} if self.filters and feed_ids else None
+        return {"items": [{"id": i} for i in ids if allowed is None or self.feeds[i] in allowed]}
+
+    def _dict_to_item(self, d):
+        return type("Item", (), {"id": d["id"], "feed_id": self.feeds[d["id"]], "url": None, "title": None})()
+
+
+def test_unread_items_are_fetched_by_id_for_handled_feeds():
+    client = FeverStub({i: (2, 3, 7)[i % 3] for i in range(1, 121)})
+    manager = make_manager(client)
+    manager.feed_ids = frozenset({2, 3})
+
+    items = manager.get_unread_items()
+    assert [i.id for i in items] == [i for i in range(1, 121) if i % 3 != 2]
+    assert [len(b) for b in client.batches] == [50, 50, 20]
+
+    # Known feed-7 items are not downloaded again; a new one is
+    client.batches.clear()
+    client.feeds[121] = 7
+    items = manager.get_unread_items()
+    assert len(items) == 80
+    assert sum(map(len, client.batches)) == 81 and 121 in client.batches[-1]
+
+
+def test_items_filtered_by_the_server_are_fetched_when_their_feed_is_wanted():
+    client = FeverStub({1: 2, 2: 3}, filters=True)
+    manager = make_manager(client)
+    manager.feed_ids = frozenset({2})
+    assert [i.id for i in manager.get_unread_items()] == [1]
+    assert [i.id for i in manager.get_unread_items()] == [1]
+    assert client.batches == [[1, 2], [1]]
+
+    manager.feed_ids = frozenset({2, 3})
+    assert [i.id for i in manager.get_unread_items()] == [1, 2]
+    assert client.batches[-1] == [1, 2]
+
+
+def test_no_wanted_feeds_fetches_nothing():
+    client = FeverStub({1: 2, 2: 3})
+    manager = make_manager(client)
+    manager.feed_ids = frozenset()
+    assert manager.get_unread_items() == []
+    assert client.batches == []
@@ -0,0 +1,49 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from scraper.item_leases import LeaseStore
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_items_are_leased_to_one_instance(tmp_path):
+    clock = Clock()
+    a = LeaseStore(tmp_path / "leases.sqlite3", owner="a", lease_seconds=60, clock=clock)
+    b = LeaseStore(tmp_path / "leases.sqlite3", owner="b", lease_seconds=60, clock=clock)
+    assert a.claim([1, 2]) == ({"1", "2"}, set())
+    assert b.claim([2, 3]) == ({"3"}, set())
+    # Claiming again renews the instance's own lease
+    assert a.claim([2]) == ({"2"}, set())
+    assert a.holder(2) == ("a", 1060.0, False)
+
+
+def test_done_items_are_not_leased_again(tmp_path):
+    clock = Clock()
+    a = LeaseStore(tmp_path / "leases.sqlite3", owner="a", lease_seconds=60, clock=clock)
+    b = LeaseStore(tmp_path / "leases.sqlite3", owner="b", lease_seconds=60, clock=clock)
+    a.claim([1])
+    assert a.complete(1)
+    assert not b.complete(1)
+    clock.now += 3600
+    assert b.claim([1]) == (set(), {"1"})
+
+
+def test_expired_and_released_leases_are_taken_over(tmp_path):
+    clock = Clock()
+    dead = LeaseStore(tmp_path / "leases.sqlite3", owner="dead", lease_seconds=60, clock=clock)
+    alive = LeaseStore(tmp_path / "leases.sqlite3", owner="alive", lease_seconds=60, clock=clock)
+    dead.claim([1, 2])
+    dead.release(2)
+    assert alive.claim([1, 2]) == ({"2"}, set())
+    clock.now += 61
+    assert alive.claim([1]) == ({"1"}, set())
+    # The old holder can no longer finish it
+    assert not dead.complete(1)
+    assert alive.complete(1)
@@ -0,0 +1,33 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import pytest
+
+from scraper.matcher_pool import MatcherPool
+from scraper.query import compile_terms
+from scraper.term_matcher import TermMatcher
+
+DOC = b"<rule><p>Deep Sea\nMining permits for the\n  seabed</p></rule>"
+
+
+@pytest.fixture
+def pool():
+    pool = MatcherPool(1)
+    yield pool
+    pool.close()
+
+
+def test_scan_matches_in_worker_process(pool):
+    found, text = pool.scan(DOC, TermMatcher(["deep sea mining", "arctic"]), keep_text=True)
+    assert found == ["deep sea mining"]
+    assert text == "deep sea mining permits for the seabed"
+
+
+def test_scan_follows_term_changes(pool):
+    assert pool.scan(DOC, TermMatcher(["arctic"])) == ([], None)
+    assert pool.scan(DOC, compile_terms(['q:"seabed" NEAR/3 "permits"'])) == (['q:"seabed" NEAR/3 "permits"'], None)
+
+
+def test_unparsable_document_returns_none(pool):
+    assert pool.scan(b"<rule><p>broken", TermMatcher(["broken"])) == (None, None)
@@ -0,0 +1,115 @@
+import sys
+import urllib.request
+from contextlib import contextmanager
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import pytest
+
+from scraper.metrics import Histogram, Metrics, MetricsServer, metrics
+from scraper.xml_parser import XMLContentParser
+
+
+def test_histogram_quantile_interpolates_within_bucket():
+    h = Histogram((1, 2, 4))
+    for value in (0.5, 1.5, 1.5, 3):
+        h.observe(value)
+    assert h.count == 4 and h.sum == 6.5
+    assert h.quantile(0.5) == pytest.approx(1.5)
+    assert h.quantile(1.0) == 4
+
+
+def test_timer_counts_errors_and_still_observes():
+    registry = Metrics()
+    with pytest.raises(RuntimeError):
+        with registry.timer("fetch"):
+            raise RuntimeError("boom")
+    assert registry.counter("errors_total", stage="fetch") == 1
+    assert registry.histogram("stage_seconds", stage="fetch").count == 1
+
+
+def test_stopwatch_records_one_observation_per_stage():
+    registry = Metrics()
+    watch = registry.stopwatch()
+    assert list(watch.iterate("fetch", [1, 2, 3])) == [1, 2, 3]
+    with watch("parse"):
+        pass
+    with watch("parse"):
+        pass
+    watch.record()
+    assert registry.histogram("stage_seconds", stage="fetch").count == 1
+    assert registry.histogram("stage_seconds", stage="parse").count == 1
+
+
+def test_render_prometheus_text():
+    registry = Metrics()
+    registry.inc("items_total", 3, feed=2)
+    registry.gauge("notification_queue_depth", lambda: 7)
+    registry.observe("stage_seconds", 0.002, stage="match")
+    text = registry.render()
+    assert "# TYPE rssnotifier_items_total counter" in text
+    assert 'rssnotifier_items_total{feed="2"} 3' in text
+    assert "rssnotifier_notification_queue_depth 7" in text
+    assert 'rssnotifier_stage_seconds_bucket{stage="match",le="0.005"} 1' in text
+    assert 'rssnotifier_stage_seconds_bucket{stage="match",le="+Inf"} 1' in text
+    assert 'rssnotifier_stage_seconds_count{stage="match"} 1' in text
+
+
+def test_summary_reports_stages_cache_and_errors():
+    registry = Metrics()
+    registry.observe("stage_seconds", 0.2, stage="fetch")
+    registry.inc("document_cache_total", result="hits")
+    registry.inc("document_cache_total", result="misses")
+    registry.error("notify")
+    summary = registry.summary()
+    assert "fetch" in summary
+    assert "cache hit rate: 50%" in summary
+    assert "Errors: notify 1" in summary
+
+
+def test_metrics_server_serves_endpoint():
+    registry = Metrics()
+    registry.inc("matches_total")
+    server = MetricsServer(registry, host="127.0.0.1", port=0).start()
+    try:
+        host, port = server.server_address[:2]
+        with urllib.request.urlopen(f"http://{host}:{port}/metrics") as resp:
+            body = resp.read().decode()
+        assert resp.headers["Content-Type"].startswith("text/plain")
+        assert "rssnotifier_matches_total 1" in body
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+class _Response:
+    def __init__(self, body):
+        self.body = body
+
+    def iter_content(self, size):
+        for i in range(0, len(self.body), size):
+            yield self.body[i:i + size]
+
+
+class _FetcherStub:
+    def __init__(self, body):
+        self.body = body
+
+    @contextmanager
+    def open(self, url):
+        yield _Response(self.body)
+
+
+def test_stream_search_records_document_stages():
+    metrics.reset()
+    parser = XMLContentParser(streaming=True, fetcher=_FetcherStub(b"<r><p>Deep Sea Mining</p></r>"))
+    assert parser.search_xml_url("http://x/doc.xml", ["deep sea"]) == ["deep sea"]
+    for stage in ("fetch", "parse", "match"):
+        assert metrics.histogram("stage_seconds", stage=stage).count == 1
+
+
+def test_parse_error_is_counted():
+    metrics.reset()
+    parser = XMLContentParser(streaming=True, fetcher=_FetcherStub(b"<r><p>broken"))
+    assert parser.search_xml_url("http://x/doc.xml", ["deep sea"]) is None
+    assert metrics.counter("errors_total", stage="parse") == 1
@@ -0,0 +1,60 @@
+from pathlib import Path
+import random
+import sys
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from scraper.normalize import TextNormalizer, normalize_term, normalize_text, normalize_with_offsets
+from scraper.term_matcher import TermMatcher
+
+SAMPLE = "Deep Sea  MIN-\n   ING per­mit ﬁle STRASSE Straße café a -\n b"
+
+
+def test_normalize_text():
+    assert normalize_text(SAMPLE) == "deep sea mining permit file strasse strasse café a - b"
+    assert normalize_term("  Deep\nSea ") == "deep sea"
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 8, 64])
+def test_streaming_matches_one_shot(size):
+    normalizer = TextNormalizer(track_offsets=True)
+    pieces = [normalizer.feed(SAMPLE[i:i + size]) for i in range(0, len(SAMPLE), size)]
+    out = "".join(pieces) + normalizer.finish()
+    assert out == normalize_text(SAMPLE)
+    assert len(normalizer.offsets) == len(out)
+
+
+def test_offsets_point_back_to_the_original():
+    text, offsets = normalize_with_offsets(SAMPLE)
+    start = text.index("mining")
+    end = text.index("mining") + len("mining") - 1
+    assert SAMPLE[offsets[start]:offsets[end] + 1] == "MIN-\n   ING"
+    assert SAMPLE[offsets[text.index("file")]] == "ﬁ"
+
+
+def test_matcher_finds_wrapped_and_folded_phrases():
+    matcher = TermMatcher(["deep sea mining", "Permit", "straße"])
+    assert matcher.find_all(SAMPLE) == ["deep sea mining", "Permit", "straße"]
+
+    scan = matcher.scanner()
+    for i in range(0, len(SAMPLE), 4):
+        scan.feed(SAMPLE[i:i + 4])
+    assert scan.found() == ["deep sea mining", "Permit", "straße"]
+
+
+def test_streaming_matches_one_shot_on_random_text():
+    rng = random.Random(17)
+    alphabet = "ab \u00c9-  \n\t\u00a0\u00ad\u200b\u200c\u200d\u2060\ufeff\u0301\ufb01\uff0d"
+    for _ in range(500):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randrange(1, 40)))
+        normalizer = TextNormalizer(track_offsets=True)
+        pieces, i = [], 0
+        while i < len(text):
+            size = rng.randrange(1, 6)
+            pieces.append(normalizer.feed(text[i:i + size]))
+            i += size
+        out = "".join(pieces) + normalizer.finish()
+        assert out == normalize_text(text), repr(text)
+        assert len(normalizer.offsets) == len(out)
@@ -0,0 +1,99 @@
+import sys
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from scraper.discord_notifier import DiscordNotifier
+from scraper.notification_outbox import NotificationOutbox
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_same_match_is_queued_once(tmp_path):
+    outbox = NotificationOutbox(tmp_path / "outbox.sqlite3")
+    assert outbox.add(["alpha"], "http://x/1", "1", "hook")
+    assert not outbox.add(["alpha", "beta"], "http://x/1", "1", "hook")
+    assert outbox.add(["alpha"], "http://x/1", "1", "other-hook")
+    assert outbox.pending() == 2
+
+    entries = outbox.due()
+    assert [(e.webhook_url, e.terms) for e in entries] == [("hook", ["alpha"]), ("other-hook", ["alpha"])]
+    outbox.sent([e.key for e in entries])
+    assert outbox.pending() == 0
+    # Already delivered: queueing it again does nothing
+    assert not outbox.add(["alpha"], "http://x/1", "1", "hook")
+
+
+def test_subscribers_sharing_a_webhook_each_get_their_alert(tmp_path):
+    outbox = NotificationOutbox(tmp_path / "outbox.sqlite3")
+    assert outbox.add(["alpha"], "http://x/1", 42, "hook", "<@111>")
+    assert outbox.add(["beta"], "http://x/1", 42, "hook", "<@222>")
+    assert not outbox.add(["beta"], "http://x/1", 42, "hook", "<@222>")
+    assert [(e.mention, e.terms) for e in outbox.due()] == [("<@111>", ["alpha"]), ("<@222>", ["beta"])]
+
+    notifier = DiscordNotifier("default", linger=0, outbox=outbox)
+    notifier.session = SessionStub()
+    notifier.start()
+    assert notifier.flush(timeout=5)
+    [(url, payload)] = notifier.session.posts
+    assert url == "hook"
+    assert payload["content"].startswith("<@111> <@222> ")
+    assert [e["title"] for e in payload["embeds"]] == ["alpha", "beta"]
+
+
+def test_failed_entries_back_off_then_give_up(tmp_path):
+    clock = Clock()
+    outbox = NotificationOutbox(tmp_path / "outbox.sqlite3", max_attempts=3, retry_seconds=10, clock=clock)
+    outbox.add(["alpha"], "http://x/1", "1", "hook")
+    key = outbox.due()[0].key
+
+    assert outbox.failed([key], "503") == []
+    assert outbox.due() == [] and outbox.next_due_in() == 10
+    clock.now += 10
+    assert outbox.failed([key], "503") == []
+    assert outbox.next_due_in() == 20
+    clock.now += 20
+    assert outbox.failed([key], "503") == [key]
+    assert outbox.pending() == 0 and outbox.next_due_in() is None
+
+
+class Response:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.headers = {}
+
+
+class SessionStub:
+    def __init__(self, statuses=()):
+        self.statuses = list(statuses)
+        self.posts = []
+
+    def post(self, url, json, timeout):
+        self.posts.append((url, json))
+        return Response(self.statuses.pop(0) if self.statuses else 204)
+
+
+def test_notifier_retries_from_the_outbox_across_restarts(tmp_path):
+    path = tmp_path / "outbox.sqlite3"
+    notifier = DiscordNotifier("hook", linger=0, max_retries=0,
+                               outbox=NotificationOutbox(path, retry_seconds=60))
+    notifier.session = SessionStub([400])
+    notifier.send_notification(["alpha"], "http://x/1", "1")
+    notifier.send_notification(["alpha"], "http://x/1", "1")  # same match again
+    assert notifier.flush(timeout=5)  # the retry is not due for a minute
+    assert len(notifier.session.posts) == 1 and notifier.pending == 1
+
+    # A new process delivers what is left once the retry is due, exactly once
+    later = NotificationOutbox(path, clock=lambda: time.time() + 60)
+    restarted = DiscordNotifier("hook", linger=0, outbox=later)
+    restarted.session = SessionStub()
+    restarted.start()
+    assert restarted.flush(timeout=5)
+    assert restarted.pending == 0
+    assert [len(p["embeds"]) for _, p in restarted.session.posts] == [1]
@@ -0,0 +1,77 @@
+from pathlib import Path
+import sys
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from scraper.query import Query, QueryError, QueryMatcher, compile_terms, is_query
+from scraper.term_matcher import TermMatcher
+
+
+def test_plain_terms_keep_substring_semantics():
+    assert not is_query("Deep Sea Mining")
+    assert not is_query("ANDROID mining")
+    assert isinstance(compile_terms(["mining", "Deep Sea"]), TermMatcher)
+    assert isinstance(compile_terms(["mining", 'q:"mining"']), QueryMatcher)
+
+
+def test_query_syntax_needs_the_prefix():
+    legacy = ['"Oil" (gas)', "Oil AND gas", '("broken']
+    assert not any(is_query(term) for term in legacy)
+    matcher = compile_terms(legacy)
+    assert isinstance(matcher, TermMatcher)
+    assert matcher.find_all('Re: "oil" (gas) and Oil AND gas; ("broken') == legacy
+    assert compile_terms(['q:"oil" AND gas']).find_all("oil and gas") == ['q:"oil" AND gas']
+
+
+def test_phrases_match_whole_words():
+    text = "Concerns about undermining the deep-sea MINING permit."
+    assert Query("mining").matches(text)
+    assert Query('"mining"').matches(text)
+    assert not Query('"undermine"').matches(text)
+    assert not Query('"deep sea"').matches(text)
+    assert Query('"mining permit"').matches("mining\n  permit")
+    assert not Query('"mine"').matches("undermining")
+
+
+def test_boolean_operators():
+    text = "Offshore drilling permit issued for the Gulf"
+    assert Query('"drilling" AND permit').matches(text)
+    assert Query('drilling permit').matches(text)  # bare words form one literal
+    assert Query('"permit" "gulf"').matches(text)  # implicit AND
+    assert not Query('"drilling" AND NOT "gulf"').matches(text)
+    assert Query('"drilling" AND NOT "arctic"').matches(text)
+    assert Query('("arctic" OR "gulf") AND permit').matches(text)
+    assert not Query('"arctic" OR "pacific"').matches(text)
+
+
+def test_near_counts_words_between():
+    text = "The deep sea mining company applied for a new exploration permit today"
+    assert Query('"deep sea" NEAR/7 "permit"').matches(text)
+    assert not Query('"deep sea" NEAR/6 "permit"').matches(text)
+    assert Query('"permit" NEAR/7 "deep sea"').matches(text)
+    assert Query('"mining" NEAR/0 "company"').matches(text)
+
+
+def test_invalid_queries():
+    for bad in ['"open', '("a" AND "b"', 'AND "x"', '("a" OR "b") NEAR/3 "c"', '""']:
+        with pytest.raises(QueryError):
+            Query(bad)
+
+
+def test_query_matcher_reports_matching_terms_in_order():
+    matcher = QueryMatcher(['q:"mining" AND NOT "undermining"', "sea", 'q:"deep sea" NEAR/2 "permit"', 'q:"absent"'])
+    text = "Deep sea mining: permit granted."
+    assert matcher.find_all(text) == ['q:"mining" AND NOT "undermining"', "sea", 'q:"deep sea" NEAR/2 "permit"']
+    assert matcher.find_all("nothing here") == []
+
+    scan = matcher.scanner()
+    for chunk in ("Deep sea mi", "ning: perm", "it granted."):
+        assert not scan.feed(chunk)
+    assert scan.found() == matcher.find_all(text)
+
+
+def test_malformed_persisted_query_falls_back_to_plain_text():
+    matcher = QueryMatcher(['q:("broken', "zzz"])
+    assert matcher.find_all('a ("broken thing') == ['q:("broken']
@@ -0,0 +1,86 @@
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import pytest
+import requests
+
+from scraper.feed_item import FeedItem
+from scraper.recording import ArchiveFetcher, RecordingFetcher, TrafficArchive
+
+
+class _Response:
+    status_code = 200
+
+    def __init__(self, body):
+        self.body = body
+
+    def iter_content(self, size):
+        for i in range(0, len(self.body), size):
+            yield self.body[i:i + size]
+
+
+class FetcherStub:
+    def __init__(self, documents):
+        self.documents = documents
+        self.opened = []
+
+    @contextmanager
+    def open(self, url):
+        self.opened.append(url)
+        yield _Response(self.documents[url])
+
+
+def test_batches_round_trip(tmp_path):
+    archive = TrafficArchive(tmp_path / "traffic.sqlite3")
+    items = [FeedItem(1, 2, url="http://x/1", title="Rule", published=1700000000, xml_url="http://x/1.xml"),
+             FeedItem(2, 3, url="http://x/2", title="Filing", body="<p>body</p>")]
+    archive.add_batch(items, recorded_at=10.0)
+    archive.add_batch(items[1:], recorded_at=70.0)
+    archive.close()
+
+    replayed = list(TrafficArchive(tmp_path / "traffic.sqlite3").batches())
+    assert replayed == [(10.0, items), (70.0, items[1:])]
+
+
+def test_recorded_documents_replay_offline(tmp_path):
+    archive = TrafficArchive(tmp_path / "traffic.sqlite3")
+    body = b"<r><p>Deep Sea Mining</p></r>" * 100
+    live = FetcherStub({"http://x/1.xml": body})
+    recording = RecordingFetcher(live, archive)
+
+    # A caller that stops reading early still records the whole body
+    with recording.open("http://x/1.xml") as resp:
+        next(resp.iter_content(16))
+    assert recording.get("http://x/1.xml") == body
+    assert archive.stats()["documents"] == 1
+
+    replay = ArchiveFetcher(archive)
+    assert replay.get("http://x/1.xml") == body
+    with replay.open("http://x/1.xml") as resp:
+        assert b"".join(resp.iter_content(64)) == body
+    with pytest.raises(requests.HTTPError):
+        replay.get("http://x/2.xml")
+    assert replay.stats == {"served": 2, "missing": 1}
+
+
+def test_manager_records_unread_batches(tmp_path):
+    from scraper.freshrss_client import FreshRSSManager
+
+    class Client:
+        def _call(self, endpoint, with_ids=None, **params):
+            if endpoint == "unread_item_ids":
+                return {"unread_item_ids": "1"}
+            return {"items": [{"id": 1}]}
+
+        def _dict_to_item(self, d):
+            return FeedItem(d["id"], 2, url="http://x/1")
+
+    manager = FreshRSSManager.__new__(FreshRSSManager)
+    manager.client = Client()
+    manager._item_feeds = {}
+    manager.recorder = TrafficArchive(tmp_path / "traffic.sqlite3")
+    items = manager.get_unread_items()
+    [(recorded_at, batch)] = manager.recorder.batches()
+    assert batch == items and recorded_at == manager.unread_fetched_at
@@ -0,0 +1,80 @@
+from pathlib import Path
+import sys
+import threading
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from scraper.rescan_jobs import RescanManager
+
+
+class SearcherStub:
+    def __init__(self, items=5):
+        self.items = items
+        self.release = threading.Event()
+        self.calls = 0
+
+    def get_search_terms(self):
+        return ["alpha", "beta"]
+
+    def rescan(self, job=None):
+        self.calls += 1
+        job.total = self.items
+        found = []
+        for i in range(self.items):
+            if job.cancelled:
+                break
+            job.item_done(matched=i % 2 == 0)
+            if i % 2 == 0:
+                found.append({"id": str(i), "url": f"http://x/{i}", "terms": ["alpha"]})
+            self.release.wait(1)
+        return found
+
+
+def test_identical_requests_share_one_job():
+    searcher = SearcherStub()
+    jobs = RescanManager(searcher)
+
+    first, created = jobs.start()
+    second, joined = jobs.start(["beta", "alpha"])
+    assert created and not joined
+    assert second is first
+
+    other, created = jobs.start(["gamma"])
+    assert created and other is not first
+
+    searcher.release.set()
+    assert first.wait(2) and other.wait(2)
+    assert first.state == "done"
+    assert (first.scanned, first.total, first.matched) == (5, 5, 3)
+    assert len(first.result) == 3
+    assert searcher.calls == 2
+
+    # A finished job is not joined again
+    third, created = jobs.start()
+    assert created and third is not first
+    third.wait(2)
+
+
+def test_cancel_stops_running_job():
+    searcher = SearcherStub(items=1000)
+    jobs = RescanManager(searcher)
+    job, _ = jobs.start()
+
+    assert jobs.cancel(job.id) == [job]
+    assert job.wait(2)
+    assert job.state == "cancelled"
+    assert job.scanned < 1000
+    assert jobs.running() == []
+    assert jobs.cancel() == []
+    assert "cancelled" in job.describe()
+
+
+def test_failed_job_records_error():
+    class Failing(SearcherStub):
+        def rescan(self, job=None):
+            raise RuntimeError("boom")
+
+    job, _ = RescanManager(Failing()).start()
+    assert job.wait(2)
+    assert job.state == "failed"
+    assert str(job.error) == "boom"
@@ -0,0 +1,62 @@
+from datetime import datetime
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from scraper.scheduler import PollScheduler
+
+T0 = datetime(2026, 3, 2, 3, 0).timestamp()  # 03:00 local, a quiet hour
+
+
+def make(clock_start=T0):
+    return PollScheduler([2, 3], base_interval=60, min_interval=20, max_interval=600,
+                         clock=lambda: clock_start)
+
+
+def test_all_feeds_due_at_start():
+    scheduler = make()
+    assert scheduler.due() == [2, 3]
+    assert scheduler.sleep_seconds() == 0
+
+
+def test_idle_feed_backs_off_and_busy_feed_speeds_up():
+    scheduler = make()
+    now = T0
+    for _ in range(10):
+        scheduler.record(2, 0, now=now)
+        now = scheduler.feeds[2].next_run
+    assert scheduler.feeds[2].interval == 600
+
+    scheduler.record(3, 5, now=T0)
+    assert scheduler.feeds[3].interval == 20
+    assert scheduler.next_run() == (T0 + 20, [3])
+
+
+def test_errors_back_off_exponentially():
+    scheduler = make()
+    scheduler.record(2, 0, error=True, now=T0)
+    assert scheduler.feeds[2].interval == 120
+    scheduler.record(2, 0, error=True, now=T0)
+    assert scheduler.feeds[2].interval == 240
+    assert scheduler.feeds[2].next_run == T0 + 240
+    assert "backing off" in scheduler.describe(now=T0)
+
+
+def test_active_hour_caps_interval_at_base():
+    scheduler = make()
+    morning = datetime(2026, 3, 2, 9, 0).timestamp()
+    for _ in range(5):
+        scheduler.record(2, 3, now=morning)  # a burst of arrivals at 09:xx
+    assert scheduler.is_active(2, now=morning - 3600)  # the hour before counts too
+
+    scheduler.feeds[2].interval = 600
+    scheduler.record(2, 0, now=morning + 86400)
+    assert scheduler.feeds[2].interval == 60
+
+
+def test_slow_cycle_does_not_add_a_full_interval():
+    scheduler = make()
+    scheduler.record(2, 0, now=T0 + 200)  # the cycle took 200s
+    # was due at T0; next due at T0 + 90 has already passed, so run right away
+    assert scheduler.feeds[2].next_run == T0 + 200
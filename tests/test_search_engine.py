@@ -1,21 +1,33 @@
 import json
 import importlib
+import pytest
 from pathlib import Path
 import sys
+import threading
+import time
 
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
+from scraper.feed_handlers import HandlerRegistry, LinkedDocumentHandler, TitleHandler
+from scraper.normalize import normalize_text
+
 
 def create_searcher(tmp_path, monkeypatch):
     monkeypatch.setenv("GUILD_ID", "1")
     import scraper.search_engine as se
     importlib.reload(se)
     # replace heavy dependencies with stubs
+    terms_cls = se.StoreTerms
+    monkeypatch.setattr(se, "StoreTerms", lambda path: terms_cls(tmp_path / "terms.json"))
+    store_cls = se.SubscriptionStore
+    monkeypatch.setattr(se, "SubscriptionStore", lambda: store_cls(tmp_path / "subscriptions.sqlite3"))
+    seen_cls = se.SeenDocuments
+    monkeypatch.setattr(se, "SeenDocuments", lambda: seen_cls(tmp_path / "seen.sqlite3"))
     monkeypatch.setattr(se, "FreshRSSManager", lambda: None)
     monkeypatch.setattr(se, "XMLContentParser", lambda: None)
-    monkeypatch.setattr(se, "DiscordNotifier", lambda: None)
+    monkeypatch.setattr(se, "DiscordNotifier", lambda **kw: None)
     searcher = se.FederalRegisterSearcher()
-    searcher._store = se.StoreTerms(tmp_path / "terms.json")
+    searcher.index = None
     searcher.search_terms = []
     return searcher
 
@@ -53,19 +65,38 @@ def create_searcher_with_items(tmp_path, monkeypatch, items, xml_map):
             low = xml_content.lower()
             return [t for t in terms if t.lower() in low]
 
+        def stream_search_text(self, url, matcher):
+            text = xml_map.get(url)
+            if not text:
+                return None, None
+            text = normalize_text(text)
+            return matcher.find_normalized(text), text
+
+        def search_xml_url(self, url, terms):
+            xml_content = self.fetch_and_parse_xml(url)
+            if not xml_content:
+                return None
+            return self.search_xml_content(xml_content, terms)
+
     class NotifyStub:
-        def __init__(self, webhook_url=None):
+        def __init__(self, webhook_url=None, outbox=None):
             pass
 
         def send_notification(self, *a, **kw):
             raise AssertionError("send_notification should not be called during rescan")
 
+    terms_cls = se.StoreTerms
+    monkeypatch.setattr(se, "StoreTerms", lambda path: terms_cls(tmp_path / "terms.json"))
+    store_cls = se.SubscriptionStore
+    monkeypatch.setattr(se, "SubscriptionStore", lambda: store_cls(tmp_path / "subscriptions.sqlite3"))
+    seen_cls = se.SeenDocuments
+    monkeypatch.setattr(se, "SeenDocuments", lambda: seen_cls(tmp_path / "seen.sqlite3"))
     monkeypatch.setattr(se, "FreshRSSManager", FRStub)
     monkeypatch.setattr(se, "XMLContentParser", XMLStub)
     monkeypatch.setattr(se, "DiscordNotifier", NotifyStub)
 
     searcher = se.FederalRegisterSearcher()
-    searcher._store = se.StoreTerms(tmp_path / "terms.json")
+    searcher.index = se.DocumentIndex(tmp_path / "index.sqlite3")
     searcher.search_terms = ["alpha", "beta"]
     return searcher
 
@@ -89,13 +120,25 @@ def test_add_search_term(monkeypatch, tmp_path):
     assert searcher.add_search_term(None) is False
 
 
+def test_matcher_is_only_recompiled_when_terms_change(monkeypatch, tmp_path):
+    searcher = create_searcher(tmp_path, monkeypatch)
+    searcher.search_terms = ["alpha", "beta"]
+    matcher = searcher._matcher
+
+    searcher.search_terms = ["alpha", "beta"]
+    assert searcher._matcher is matcher
+    searcher.search_terms = ["alpha", "gamma"]
+    assert searcher._matcher is not matcher
+    assert list(searcher._matcher) == ["alpha", "gamma"]
+
+
 def test_process_items_rescan(monkeypatch, tmp_path):
     class Item:
         def __init__(self, **kw):
             for k, v in kw.items():
                 setattr(self, k, v)
 
-    fr_item = Item(feed_id=2, id="a", url="http://example.com/a.xml")
+    fr_item = Item(feed_id=2, id="a", url="http://example.com/a", xml_url="http://example.com/a.xml")
     sec_item = Item(feed_id=3, id="b", url="http://example.com/b", title="Beta update")
 
     xml_map = {"http://example.com/a.xml": "alpha beta content"}
@@ -110,7 +153,7 @@ def test_process_items_rescan(monkeypatch, tmp_path):
     ]
 
 
-def test_init_respects_passed_terms(monkeypatch):
+def test_init_respects_passed_terms(monkeypatch, tmp_path):
     monkeypatch.setenv("GUILD_ID", "1")
     import scraper.search_engine as se
     import importlib
@@ -123,15 +166,17 @@ def test_init_respects_passed_terms(monkeypatch):
             return ["persisted"]
 
     monkeypatch.setattr(se, "StoreTerms", StoreStub)
+    store_cls = se.SubscriptionStore
+    monkeypatch.setattr(se, "SubscriptionStore", lambda: store_cls(tmp_path / "subscriptions.sqlite3"))
     monkeypatch.setattr(se, "FreshRSSManager", lambda: None)
     monkeypatch.setattr(se, "XMLContentParser", lambda: None)
-    monkeypatch.setattr(se, "DiscordNotifier", lambda: None)
+    monkeypatch.setattr(se, "DiscordNotifier", lambda **kw: None)
 
     searcher = se.FederalRegisterSearcher(search_terms=["x", "y"])
     assert searcher.get_search_terms() == ["x", "y"]
 
 
-def test_init_uses_persisted_terms(monkeypatch):
+def test_init_uses_persisted_terms(monkeypatch, tmp_path):
     monkeypatch.setenv("GUILD_ID", "1")
     import scraper.search_engine as se
     import importlib
@@ -144,10 +189,393 @@ def test_init_uses_persisted_terms(monkeypatch):
             return ["persisted"]
 
     monkeypatch.setattr(se, "StoreTerms", StoreStub)
+    store_cls = se.SubscriptionStore
+    monkeypatch.setattr(se, "SubscriptionStore", lambda: store_cls(tmp_path / "subscriptions.sqlite3"))
     monkeypatch.setattr(se, "FreshRSSManager", lambda: None)
     monkeypatch.setattr(se, "XMLContentParser", lambda: None)
-    monkeypatch.setattr(se, "DiscordNotifier", lambda: None)
+    monkeypatch.setattr(se, "DiscordNotifier", lambda **kw: None)
 
     searcher = se.FederalRegisterSearcher()
     assert searcher.get_search_terms() == ["persisted"]
 
+
+def test_matcher_tracks_term_changes(monkeypatch, tmp_path):
+    searcher = create_searcher(tmp_path, monkeypatch)
+    matcher = searcher._matcher
+
+    searcher.add_search_term("alpha")
+    assert searcher._matcher is not matcher
+    assert searcher._find_terms_in_text("ALPHA notice", searcher._matcher) == ["alpha"]
+
+    searcher.remove_search_term("alpha")
+    assert searcher._find_terms_in_text("ALPHA notice", searcher._matcher) == []
+
+
+def test_rescan_answers_from_index_after_backfill(monkeypatch, tmp_path):
+    class Item:
+        def __init__(self, **kw):
+            for k, v in kw.items():
+                setattr(self, k, v)
+
+    items = [
+        Item(feed_id=2, id="a", url="http://example.com/a", xml_url="http://example.com/a.xml"),
+        Item(feed_id=3, id="b", url="http://example.com/b", title="Beta update"),
+    ]
+    xml_map = {"http://example.com/a.xml": "alpha beta content"}
+    searcher = create_searcher_with_items(tmp_path, monkeypatch, items, xml_map)
+
+    # no backfill yet: rescan walks the feed and fills the index
+    assert searcher.rescan() == searcher.find_documents()
+    assert len(searcher.index) == 2
+
+    searcher.freshrss.get_all_items = lambda: pytest.fail("rescan should use the index")
+    assert searcher.rescan() == [
+        {"id": "a", "url": "http://example.com/a.xml", "terms": ["alpha", "beta"]},
+        {"id": "b", "url": "http://example.com/b", "terms": ["beta"]},
+    ]
+    assert searcher.find_documents(["CONTENT", "update", "x"]) == [
+        {"id": "a", "url": "http://example.com/a.xml", "terms": ["CONTENT"]},
+        {"id": "b", "url": "http://example.com/b", "terms": ["update"]},
+    ]
+
+
+def test_delta_rescan_after_adding_a_term(monkeypatch, tmp_path):
+    class Item:
+        def __init__(self, **kw):
+            for k, v in kw.items():
+                setattr(self, k, v)
+
+    items = [Item(feed_id=3, id="b", url="http://example.com/b", title="Beta gamma update")]
+    searcher = create_searcher_with_items(tmp_path, monkeypatch, items, {})
+    searcher.rescan()
+    assert searcher.index_ready()
+
+    searcher.freshrss.get_all_items = lambda: pytest.fail("delta rescan should use the index")
+    searcher.add_search_term("gamma")
+    assert searcher.delta_rescan(["gamma"]) == [
+        {"id": "b", "url": "http://example.com/b", "terms": ["gamma"]},
+    ]
+    searcher.remove_search_term("beta")
+    assert searcher.rescan() == [
+        {"id": "b", "url": "http://example.com/b", "terms": ["gamma"]},
+    ]
+
+
+def test_process_items_batches_marks(monkeypatch, tmp_path):
+    class Item:
+        def __init__(self, **kw):
+            for k, v in kw.items():
+                setattr(self, k, v)
+
+    items = [Item(feed_id=3, id=i, url=f"http://example.com/{i}", title="nothing") for i in (1, 2, 3)]
+    searcher = create_searcher_with_items(tmp_path, monkeypatch, items, {})
+
+    import scraper.freshrss_client as fc
+    flushed = []
+
+    class Batch(fc.ReadBatch):
+        def flush(self, final=False):
+            flushed.append((sorted(self._queued), final))
+            return fc.MarkReport()
+
+    searcher.freshrss.pending_marks = {}
+    searcher.freshrss.unread_fetched_at = None
+    searcher.freshrss.read_batch = lambda: Batch(searcher.freshrss, batch_size=100)
+
+    assert searcher.process_items(False) == []
+    assert flushed == [(["1", "2", "3"], True)]
+
+
+def test_slow_feed_does_not_block_other_feeds(monkeypatch, tmp_path):
+    class Item:
+        def __init__(self, **kw):
+            for k, v in kw.items():
+                setattr(self, k, v)
+
+    items = [Item(feed_id=2, id="slow", url="http://x/slow", xml_url="http://x/slow.xml")]
+    items += [Item(feed_id=3, id=f"sec{i}", url=f"http://x/{i}", title="Alpha filing") for i in range(5)]
+    searcher = create_searcher_with_items(tmp_path, monkeypatch, items, {})
+
+    titles_done = threading.Event()
+    handled = []
+
+    class SlowHandler(LinkedDocumentHandler):
+        def match(self, searcher, item, matcher):
+            # Would time out if the title feed were waiting behind this item
+            assert titles_done.wait(2)
+            return ["alpha"], item.xml_url, "alpha"
+
+    class CountingTitles(TitleHandler):
+        def match(self, searcher, item, matcher):
+            result = super().match(searcher, item, matcher)
+            handled.append(item.id)
+            if len(handled) == 5:
+                titles_done.set()
+            return result
+
+    searcher.handlers = HandlerRegistry([SlowHandler(2, workers=1), CountingTitles(3)])
+    results = searcher.process_items(True)
+
+    assert [r["id"] for r in results] == ["slow", "sec0", "sec1", "sec2", "sec3", "sec4"]
+
+
+def test_slow_feed_backlog_does_not_block_dispatch(monkeypatch, tmp_path):
+    class Item:
+        def __init__(self, **kw):
+            for k, v in kw.items():
+                setattr(self, k, v)
+
+    # More slow items than the feed's in-flight cap (1 worker x 4)
+    items = [Item(feed_id=2, id=f"slow{i}", url=f"http://x/s{i}", xml_url=f"http://x/s{i}.xml") for i in range(6)]
+    items += [Item(feed_id=3, id=f"sec{i}", url=f"http://x/{i}", title="Alpha filing") for i in range(3)]
+    searcher = create_searcher_with_items(tmp_path, monkeypatch, items, {})
+
+    titles_done = threading.Event()
+    handled = []
+
+    class SlowHandler(LinkedDocumentHandler):
+        def match(self, searcher, item, matcher):
+            # Times out if the title items could not even be dispatched
+            assert titles_done.wait(2)
+            return ["alpha"], item.xml_url, "alpha"
+
+    class CountingTitles(TitleHandler):
+        def match(self, searcher, item, matcher):
+            result = super().match(searcher, item, matcher)
+            handled.append(item.id)
+            if len(handled) == 3:
+                titles_done.set()
+            return result
+
+    searcher.handlers = HandlerRegistry([SlowHandler(2, workers=1), CountingTitles(3)])
+    results = searcher.process_items(True)
+
+    assert [r["id"] for r in results] == [f"slow{i}" for i in range(6)] + ["sec0", "sec1", "sec2"]
+
+
+def test_poll_does_not_wait_behind_a_rescan(monkeypatch, tmp_path):
+    class Item:
+        def __init__(self, **kw):
+            for k, v in kw.items():
+                setattr(self, k, v)
+
+    history = [Item(feed_id=2, id=f"old{i}", url=f"http://x/o{i}", xml_url=f"http://x/o{i}.xml") for i in range(20)]
+    unread = [Item(feed_id=2, id="new", url="http://x/new", xml_url="http://x/new.xml")]
+    searcher = create_searcher_with_items(tmp_path, monkeypatch, unread, {})
+    searcher.freshrss.get_all_items = lambda: history
+    searcher.freshrss.read_batch = lambda: None
+    searcher.notifier.send_notification = lambda *a, **kw: None
+
+    polled = threading.Event()
+
+    class Handler(LinkedDocumentHandler):
+        def match(self, searcher, item, matcher):
+            if item.id.startswith("old"):
+                # History stays stuck until the poll has finished
+                assert polled.wait(1)
+            return ["alpha"], item.xml_url, "alpha"
+
+    searcher.handlers = HandlerRegistry([Handler(2, workers=1)])
+    rescan = threading.Thread(target=searcher.process_items, args=(True,), daemon=True)
+    rescan.start()
+    time.sleep(0.1)
+    start = time.perf_counter()
+    assert [r["id"] for r in searcher.process_items(False)] == ["new"]
+    assert time.perf_counter() - start < 0.9
+    polled.set()
+    rescan.join(5)
+    assert not rescan.is_alive()
+
+
+def test_process_items_reports_progress_and_cancels(monkeypatch, tmp_path):
+    from scraper.rescan_jobs import RescanJob
+
+    class Item:
+        def __init__(self, **kw):
+            for k, v in kw.items():
+                setattr(self, k, v)
+
+    items = [Item(feed_id=3, id=str(i), url=f"http://x/{i}", title="alpha" if i % 2 else "other")
+             for i in range(6)]
+    searcher = create_searcher_with_items(tmp_path, monkeypatch, items, {})
+
+    job = RescanJob(1, searcher.search_terms)
+    results = searcher.process_items(True, job=job)
+    assert (job.scanned, job.matched) == (6, 3)
+    assert [r["id"] for r in results] == ["1", "3", "5"]
+    assert searcher.index_ready()
+
+    searcher.index.set_meta("backfilled_at", "")
+    job = RescanJob(2, searcher.search_terms)
+    job.cancel()
+    assert searcher.process_items(True, job=job) == []
+    assert job.scanned == 0
+    assert not searcher.index_ready()  # a cancelled run is not a full backfill
+
+
+def test_add_search_terms_bulk(monkeypatch, tmp_path):
+    searcher = create_searcher(tmp_path, monkeypatch)
+    matcher = searcher._matcher
+
+    assert searcher.add_search_terms(["beta", " alpha ", "", "beta"]) == ["beta", "alpha"]
+    assert searcher.get_search_terms() == ["alpha", "beta"]
+    assert searcher._matcher is not matcher
+    assert searcher.add_search_terms(["alpha"]) == []
+    assert searcher._store.snapshot().terms == ("alpha", "beta")
+
+
+def test_matches_fan_out_to_subscribers(monkeypatch, tmp_path):
+    class Item:
+        def __init__(self, **kw):
+            for k, v in kw.items():
+                setattr(self, k, v)
+
+    items = [Item(feed_id=3, id="1", url="http://x/1", title="Alpha and gamma and delta")]
+    searcher = create_searcher_with_items(tmp_path, monkeypatch, items, {})
+    sent = []
+    searcher.notifier.send_notification = lambda terms, url, item_id, **kw: sent.append((terms, kw))
+    searcher.freshrss.read_batch = lambda: None
+
+    assert searcher.subscribe("user", 42, "gamma", "http://hook/a")
+    assert searcher.subscribe("channel", 7, "gamma", "http://hook/b")
+    assert searcher.subscribe("channel", 7, "delta")
+    assert not searcher.subscribe("channel", 7, "delta")
+    assert searcher.get_search_terms() == ["alpha", "beta"]  # subscriptions are not global terms
+    assert list(searcher._matcher) == ["alpha", "beta", "delta", "gamma"]
+
+    results = searcher.process_items(False)
+    assert results[0]["terms"] == ["alpha", "delta", "gamma"]
+    assert sent == [
+        (["alpha"], {}),
+        (["delta", "gamma"], {"webhook_url": "http://hook/b", "mention": None}),
+        (["gamma"], {"webhook_url": "http://hook/a", "mention": "<@42>"}),
+    ]
+
+    assert searcher.unsubscribe("channel", 7, "delta")
+    assert searcher.get_subscriptions("channel", 7) == ["gamma"]
+    assert "delta" not in searcher._matcher
+
+
+def test_duplicate_documents_are_notified_once(monkeypatch, tmp_path):
+    class Item:
+        def __init__(self, **kw):
+            for k, v in kw.items():
+                setattr(self, k, v)
+
+    url = "https://www.federalregister.gov/documents/2024/01/16/2024-00693/alpha"
+    items = [Item(feed_id=3, id="1", url=url, title="Alpha rule"),
+             Item(feed_id=3, id="2", url=url + "/", title="Alpha rule (republished)")]
+    searcher = create_searcher_with_items(tmp_path, monkeypatch, items, {})
+    sent = []
+    marked = []
+    searcher.notifier.send_notification = lambda terms, url, item_id, **kw: sent.append(item_id)
+
+    class Batch:
+        def seen(self, item_id, feed_id):
+            pass
+
+        def is_pending(self, item_id):
+            return False
+
+        def add(self, item_id, feed_id):
+            marked.append(item_id)
+
+        def flush(self, final=False):
+            return type("Report", (), {"failed": []})()
+
+    searcher.freshrss.read_batch = Batch
+    assert [r["id"] for r in searcher.process_items(False)] == ["1"]
+    assert sent == ["1"] and sorted(marked) == ["1", "2"]
+
+    # After a restart the same rule under a new id is skipped before matching
+    restarted = create_searcher_with_items(tmp_path, monkeypatch, [
+        Item(feed_id=3, id="3", url=url, title="Alpha rule (correction)"),
+    ], {})
+    restarted.notifier.send_notification = lambda terms, url, item_id, **kw: sent.append(item_id)
+    restarted.freshrss.read_batch = Batch
+    assert restarted.process_items(False) == []
+    assert sent == ["1"] and "3" in marked
+
+
+def test_instances_share_items_through_leases(monkeypatch, tmp_path):
+    class Item:
+        def __init__(self, **kw):
+            for k, v in kw.items():
+                setattr(self, k, v)
+
+    from scraper.item_leases import LeaseStore
+
+    items = [Item(feed_id=3, id=str(i), url=f"http://x/{i}", title=f"Alpha {i}") for i in range(4)]
+    # An instance that stopped while holding items 2 and 3
+    LeaseStore(tmp_path / "leases.sqlite3", owner="dead", lease_seconds=1, clock=lambda: 0).claim(["2", "3"])
+
+    sent = []
+    searchers = []
+    for name in ("a", "b"):
+        searcher = create_searcher_with_items(tmp_path, monkeypatch, items, {})
+        searcher.seen = None  # leases alone must prevent duplicates
+        searcher.leases = LeaseStore(tmp_path / "leases.sqlite3", owner=name)
+        searcher.notifier.send_notification = lambda terms, url, item_id, **kw: sent.append(item_id)
+        searcher.freshrss.read_batch = lambda: None
+        searchers.append(searcher)
+
+    assert [r["id"] for r in searchers[0].process_items(False)] == ["0", "1", "2", "3"]
+    assert searchers[1].process_items(False) == []
+    assert sorted(sent) == ["0", "1", "2", "3"]
+
+
+def test_item_is_not_marked_read_when_its_match_is_not_committed(monkeypatch, tmp_path):
+    class Item:
+        def __init__(self, **kw):
+            for k, v in kw.items():
+                setattr(self, k, v)
+
+    items = [Item(feed_id=3, id="1", url="http://x/1", title="Alpha rule")]
+    searcher = create_searcher_with_items(tmp_path, monkeypatch, items, {})
+    marked = []
+
+    def commit_fails(*a, **kw):
+        raise OSError("disk full")
+
+    class Batch:
+        def seen(self, item_id, feed_id):
+            pass
+
+        def is_pending(self, item_id):
+            return False
+
+        def add(self, item_id, feed_id):
+            marked.append(item_id)
+
+        def flush(self, final=False):
+            return type("Report", (), {"failed": []})()
+
+    searcher.notifier.send_notification = commit_fails
+    searcher.freshrss.read_batch = Batch
+    assert searcher.process_items(False) == []
+    assert marked == []
+    assert not searcher.seen.is_seen(items[0])  # retried next cycle
+
+
+def test_last_cycle_counts_only_new_unread_items_from_polls(monkeypatch, tmp_path):
+    class Item:
+        def __init__(self, **kw):
+            for k, v in kw.items():
+                setattr(self, k, v)
+
+    # "stuck" has no XML link, so it stays unread on every poll
+    items = [Item(feed_id=2, id="stuck", url="http://x/stuck", xml_url=None),
+             Item(feed_id=3, id="1", url="http://x/1", title="Gamma filing")]
+    searcher = create_searcher_with_items(tmp_path, monkeypatch, items, {})
+    searcher.freshrss.read_batch = lambda: None
+
+    searcher.process_items(False)
+    assert searcher.last_cycle == {2: 1, 3: 1}
+
+    items.append(Item(feed_id=3, id="2", url="http://x/2", title="Gamma filing"))
+    searcher.process_items(False)
+    assert searcher.last_cycle == {2: 0, 3: 1}
+
+    # A rescan leaves the poll counts alone
+    searcher.process_items(True)
+    assert searcher.last_cycle == {2: 0, 3: 1}
@@ -0,0 +1,56 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from scraper.feed_item import FeedItem
+from scraper.seen_documents import BloomFilter, SeenDocuments, document_keys, normalize_url
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1000, error_rate=0.01)
+    keys = [f"item:{i}" for i in range(1000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+    false_positives = sum(f"other:{i}" in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+def test_normalize_url():
+    assert normalize_url("HTTPS://WWW.Example.com:443/a/b/?utm_source=x&z=1&a=2#frag") == "example.com/a/b?a=2&z=1"
+    assert normalize_url("http://example.com/a/b") == normalize_url("https://www.example.com/a/b/")
+    assert normalize_url("http://example.com:8080/") == "example.com:8080/"
+
+
+def test_document_keys_share_the_document_number():
+    html = FeedItem(1, 2, url="https://www.federalregister.gov/documents/2024/01/16/2024-00693/deep-sea")
+    xml = FeedItem(9, 5, url="https://example.org/mirror",
+                   xml_url="https://www.federalregister.gov/documents/full_text/xml/2024/01/16/2024-00693.xml")
+    assert "doc:2024-00693" in document_keys(html)
+    assert "doc:2024-00693" in document_keys(xml)
+    sec = FeedItem(3, 3, url="https://www.sec.gov/Archives/edgar/data/320193/000032019324000006/0000320193-24-000006-index.htm")
+    assert "doc:0000320193-24-000006" in document_keys(sec)
+
+
+def test_seen_documents_persist_across_instances(tmp_path):
+    path = tmp_path / "seen.sqlite3"
+    item = FeedItem(1, 2, url="https://www.federalregister.gov/d/2024-00693")
+    seen = SeenDocuments(path)
+    assert not seen.is_seen(item)
+    seen.add(item)
+    assert seen.is_seen(item)
+    seen.close()
+
+    reopened = SeenDocuments(path)
+    # A republished copy under a new item id in another feed
+    assert reopened.is_seen(FeedItem(77, 3, url="http://federalregister.gov/d/2024-00693/"))
+    assert not reopened.is_seen(FeedItem(78, 3, url="https://www.federalregister.gov/d/2024-00694"))
+
+
+def test_bloom_filter_is_rebuilt_when_full(tmp_path):
+    seen = SeenDocuments(tmp_path / "seen.sqlite3", capacity=4)
+    for i in range(10):
+        seen.add(FeedItem(i, 3, url=f"http://x/{i}"))
+    assert all(seen.is_seen(FeedItem(i, 3)) for i in range(10))
+    assert not seen.is_seen(FeedItem(10, 3))
+    assert len(seen) == 20  # item id and URL keys
@@ -1,4 +1,5 @@
 import json
+import pytest
 from pathlib import Path
 import sys
 
@@ -35,3 +36,68 @@ def test_add_and_remove(tmp_path):
     # removing missing term keeps list
     terms = store.remove("missing")
     assert terms == ["beta"]
+
+
+def test_journal_replay_and_compaction(tmp_path):
+    path = tmp_path / "terms.json"
+    store = StoreTerms(path)
+    store.add_many(["alpha", "beta", "gamma", "delta"])
+    store.add("epsilon")
+    store.remove("beta")
+
+    # Changes since the last compaction live only in the journal
+    assert json.loads(path.read_text()) == ["alpha", "beta", "delta", "gamma"]
+    assert store.journal_path.read_text().count("\n") == 2
+
+    # A torn final line (crash mid-append) is ignored on replay
+    with open(store.journal_path, "a", encoding="utf-8") as journal:
+        journal.write('["+", "zet')
+
+    reopened = StoreTerms(path)
+    assert reopened.load() == ["alpha", "delta", "epsilon", "gamma"]
+    assert json.loads(path.read_text()) == ["alpha", "delta", "epsilon", "gamma"]
+    assert not reopened.journal_path.exists()
+
+
+def test_append_after_a_torn_line_is_not_lost(tmp_path):
+    path = tmp_path / "terms.json"
+    StoreTerms(path).add_many(["beta", "gamma"])
+    (tmp_path / "terms.json.journal").write_text('["+", "zet', encoding="utf-8")
+
+    store = StoreTerms(path)
+    store.add("alpha")
+    assert store.journal_path.read_text(encoding="utf-8") == '["+", "alpha"]\n'
+    assert StoreTerms(path).load() == ["alpha", "beta", "gamma"]
+
+
+def test_snapshots_are_immutable_and_versioned(tmp_path):
+    store = StoreTerms(tmp_path / "terms.json")
+    before = store.snapshot()
+    store.add("alpha")
+    after = store.snapshot()
+
+    assert before.terms == () and "alpha" not in before
+    assert after.terms == ("alpha",) and "alpha" in after
+    assert after.version == before.version + 1
+    with pytest.raises(AttributeError):
+        after.terms = ()
+
+    # A no-op edit does not create a new version
+    store.add("alpha")
+    assert store.snapshot() is after
+
+
+def test_bulk_import_compacts_a_bounded_number_of_times(tmp_path, monkeypatch):
+    store = StoreTerms(tmp_path / "terms.json")
+    writes = []
+    original = store._write
+    monkeypatch.setattr(store, "_write", lambda terms: (writes.append(len(terms)), original(terms)))
+
+    for i in range(500):
+        store.add(f"term {i}")
+
+    # Compaction happens when the journal outgrows the snapshot, so the
+    # total bytes rewritten stay linear in the number of edits
+    assert sum(writes) < 4 * 500
+    assert len(store.load()) == 500
+    assert StoreTerms(store.path).load() == store.load()
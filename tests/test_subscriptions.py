@@ -0,0 +1,31 @@
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from scraper.subscriptions import SubscriptionStore
+
+
+def test_subscriptions_build_fanout_index(tmp_path):
+    store = SubscriptionStore(tmp_path / "subs.sqlite3")
+    assert store.subscribe("user", 1, "alpha", "http://hook/1")
+    assert store.subscribe("user", 1, "beta")
+    assert store.subscribe("channel", 9, "alpha", "http://hook/9")
+    assert not store.subscribe("user", 1, "alpha")
+
+    fanout = store.fanout()
+    assert sorted(fanout.terms) == ["alpha", "beta"]
+    assert len(fanout) == 3
+
+    routes = fanout.route(["beta", "alpha", "gamma"])
+    by_id = {(s.kind, s.discord_id): (terms, s.webhook_url, s.mention) for s, terms in routes.items()}
+    assert by_id == {
+        ("user", "1"): (["beta", "alpha"], "http://hook/1", "<@1>"),
+        ("channel", "9"): (["alpha"], "http://hook/9", None),
+    }
+
+    assert store.terms_of("user", 1) == ["alpha", "beta"]
+    assert store.unsubscribe("user", 1, "alpha")
+    assert not store.unsubscribe("user", 1, "alpha")
+    assert store.is_subscribed("alpha")  # the channel still has it
+    assert [s.kind for s in store.fanout().subscribers("alpha")] == ["channel"]
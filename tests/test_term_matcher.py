@@ -0,0 +1,52 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import pytest
+
+from scraper.term_matcher import TermMatcher
+
+
+@pytest.fixture(params=["substring", "automaton"])
+def mode(request, monkeypatch):
+    if request.param == "automaton":
+        monkeypatch.setattr(TermMatcher, "AUTOMATON_MIN_TERMS", 1)
+    return request.param
+
+
+def test_find_all_case_insensitive_in_term_order(mode):
+    matcher = TermMatcher(["Gamma", "alpha", "BETA"])
+    assert matcher.uses_automaton == (mode == "automaton")
+    assert matcher.find_all("<root>Alpha Beta</root>") == ["alpha", "BETA"]
+
+
+def test_overlapping_and_nested_terms(mode):
+    matcher = TermMatcher(["sea", "deep sea mining", "deep sea", "mining", "ea m"])
+    assert matcher.find_all("The Deep Sea Mining act") == [
+        "sea", "deep sea mining", "deep sea", "mining", "ea m",
+    ]
+    assert matcher.find_all("deep seabed") == ["sea", "deep sea"]
+
+
+def test_duplicate_terms_differing_in_case(mode):
+    matcher = TermMatcher(["Alpha", "alpha", "", "beta"])
+    assert matcher.find_all("ALPHA") == ["Alpha", "alpha"]
+    assert matcher.find_all("") == []
+
+
+def test_scanner_matches_across_chunks(mode):
+    matcher = TermMatcher(["deep sea", "permit"])
+    scan = matcher.scanner()
+    assert scan.feed("a Deep S") is False
+    assert scan.feed("ea area") is False
+    assert scan.found() == ["deep sea"]
+    assert scan.feed("permit") is True
+    assert scan.found() == ["deep sea", "permit"]
+
+
+def test_matcher_iterates_like_a_term_list():
+    matcher = TermMatcher(["a", "b"])
+    assert list(matcher) == ["a", "b"]
+    assert len(matcher) == 2
+    assert "a" in matcher
+    assert matcher.terms == ["a", "b"]
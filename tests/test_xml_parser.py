@@ -1,8 +1,11 @@
 import sys
+from contextlib import contextmanager
 from pathlib import Path
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
-from scraper.xml_parser import XMLContentParser
+from scraper.normalize import normalize_text
+from scraper.query import compile_terms
+from scraper.xml_parser import XMLContentParser, text_from_bytes
 
 
 def test_search_xml_content_case_insensitive():
@@ -10,3 +13,85 @@ def test_search_xml_content_case_insensitive():
     xml_content = "<root><item>Alpha Beta</item></root>"
     terms = ["alpha", "BETA", "Gamma"]
     assert parser.search_xml_content(xml_content, terms) == ["alpha", "BETA"]
+
+
+class _Response:
+    """Streamed-response stand-in that counts the chunks handed out."""
+
+    def __init__(self, body):
+        self.body = body
+        self.reads = 0
+
+    def iter_content(self, size):
+        while self.body:
+            self.reads += 1
+            chunk, self.body = self.body[:size], self.body[size:]
+            yield chunk
+
+
+class _FetcherStub:
+    def __init__(self, body):
+        self.resp = _Response(body)
+
+    @contextmanager
+    def open(self, url):
+        yield self.resp
+
+
+def _streaming_parser(body, chunk_size=7):
+    parser = XMLContentParser(streaming=True, fetcher=_FetcherStub(body))
+    parser.CHUNK_SIZE = chunk_size
+    return parser
+
+
+def test_stream_search_matches_text_not_markup():
+    body = (
+        b'<?xml version="1.0"?>'
+        b'<RULE><HD SOURCE="alpha">Deep <E T="03">Sea</E> Mining</HD>'
+        b'<P>Beta &amp; gamma</P></RULE>'
+    )
+    parser = _streaming_parser(body)
+
+    found = parser.search_xml_url("http://x", ["alpha", "rule", "deep sea mining", "beta & gamma"])
+    assert found == ["deep sea mining", "beta & gamma"]
+
+
+def test_adjacent_paragraphs_do_not_run_together():
+    body = b"<RULE><P>deep sea mining</P><P>permit</P><P>Ex<E T='03'>ample</E></P></RULE>"
+    parser = _streaming_parser(body)
+
+    found = parser.search_xml_url("http://x", ["miningpermit", "mining permit", "example"])
+    assert found == ["mining permit", "example"]
+    assert normalize_text(text_from_bytes(body)) == "deep sea mining permit example"
+
+
+def test_stream_search_stops_once_all_terms_found():
+    body = b"<root><p>alpha</p>" + b"<p>filler</p>" * 1000 + b"</root>"
+    parser = _streaming_parser(body, chunk_size=16)
+
+    assert parser.search_xml_url("http://x", ["alpha"]) == ["alpha"]
+    assert parser.fetcher.resp.reads < 5
+
+
+def test_stream_search_text_returns_normalized_text_for_indexing():
+    body = b"<root><p>alpha</p>" + b"<p>Deep\xc2\xad Sea   Mining</p>" * 50 + b"</root>"
+    parser = _streaming_parser(body, chunk_size=16)
+
+    found, text = parser.stream_search_text("http://x", compile_terms(["alpha", "deep sea", "zzz"]))
+    assert found == ["alpha", "deep sea"]
+    assert text == normalize_text(text_from_bytes(body))
+    assert text.endswith("deep sea mining")
+
+
+def test_stream_search_reports_parse_failure():
+    parser = _streaming_parser(b"<root><p>alpha</root>")
+    assert parser.search_xml_url("http://x", ["beta"]) is None
+    assert parser.stream_search_text("http://x", compile_terms(["beta"])) == (None, None)
+
+
+def test_non_streaming_mode_uses_full_parse(monkeypatch):
+    parser = XMLContentParser(streaming=False)
+    monkeypatch.setattr(parser, "fetch_and_parse_xml", lambda url: "<root>Alpha</root>")
+    assert parser.search_xml_url("http://x", ["alpha", "beta"]) == ["alpha"]
+    monkeypatch.setattr(parser, "fetch_and_parse_xml", lambda url: "")
+    assert parser.search_xml_url("http://x", ["alpha"]) is None